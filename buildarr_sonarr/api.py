@@ -18,28 +18,842 @@ Sonarr plugin API functions.
 
 from __future__ import annotations
 
+import asyncio
+import atexit
+import codecs
+import contextvars
+import copy
+import functools
+import json
 import re
+import threading
+import time
 
+from contextlib import contextmanager
+from dataclasses import dataclass
 from http import HTTPStatus
-from logging import getLogger
-from typing import TYPE_CHECKING
+from logging import DEBUG, FileHandler, Formatter, getLogger
+from typing import TYPE_CHECKING, Dict, Tuple, TypeVar, cast
 
 import json5  # type: ignore[import]
 import requests
 
 from buildarr.state import state
-
-from .exceptions import SonarrAPIError
+from requests.adapters import HTTPAdapter
+
+from .cassette import get_cassette
+from .codec import json_dumps, json_loads
+from .exceptions import SonarrAPIError, SonarrPlanError
+from .journal import get_journal
+from .limiter import get_limiter
+from .metrics import get_metrics
+from .plan import (
+    SonarrListDigest,
+    get_digest,
+    get_plan,
+    resolve_placeholder_api_url,
+    resolve_placeholder_ids,
+)
+from .profiler import profile, profile_request, record_profile_transfer
+from .retry import get_circuit_breaker, get_retry_policy
+from .scheduler import run_graph
+from .secrets_cache import invalidate_cached_secrets
+from .snapshot import get_snapshot
+from .sync_state import get_active_section_sync, get_config_hash, get_section_sync
 
 if TYPE_CHECKING:
-    from typing import Any, Dict, Optional, Union
+    from os import PathLike
+    from typing import (
+        Any,
+        Awaitable,
+        Callable,
+        Collection,
+        Generator,
+        Iterable,
+        Iterator,
+        List,
+        Optional,
+        Union,
+    )
 
+    from pydantic import BaseModel
+
+    from .plan import SonarrPlan
     from .secrets import SonarrSecrets
 
 
 logger = getLogger(__name__)
+api_trace_logger = getLogger(f"{__name__}.trace")
+
+T = TypeVar("T")
 
 INITIALIZE_JS_RES_PATTERN = re.compile(r"(?s)^window\.Sonarr = ({.*});$")
+RESOURCE_ID_PATTERN = re.compile(r"/(\d+)$")
+
+DEFAULT_SESSION_POOL_SIZE = 10
+DEFAULT_MAX_CONCURRENCY = 8
+STREAM_CHUNK_SIZE = 65536
+NO_BODY = object()
+DEFAULT_API_TRACE_MAX_BYTES = 16384
+
+_session_pool_size = DEFAULT_SESSION_POOL_SIZE
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+_api_trace_max_bytes = DEFAULT_API_TRACE_MAX_BYTES
+_api_trace_handler: Optional[FileHandler] = None
+
+
+class SonarrAPICache:
+    """
+    Cache for Sonarr API `GET` responses, scoped to a single Buildarr run (or part of one).
+
+    Responses are keyed by instance host URL and API path.
+    Writes sent to a resource through the API functions invalidate all cached responses
+    for that resource, so cached responses always reflect changes made by Buildarr.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host_url: str, api_url: str) -> Tuple[bool, Any]:
+        """
+        Get a cached response, and record the cache hit or miss.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+            api_url (str): API command.
+
+        Returns:
+            Tuple of whether a cached response was found, and a copy of the response
+        """
+
+        with self._lock:
+            try:
+                res_json = self._entries[(host_url, _normalize_api_url(api_url))]
+            except KeyError:
+                self.misses += 1
+                return (False, None)
+            self.hits += 1
+        return (True, copy.deepcopy(res_json))
+
+    def set(self, host_url: str, api_url: str, res_json: Any) -> None:
+        """
+        Cache the response for an API command.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+            api_url (str): API command.
+            res_json (Any): Response object.
+        """
+
+        res_json = copy.deepcopy(res_json)
+        with self._lock:
+            self._entries[(host_url, _normalize_api_url(api_url))] = res_json
+
+    def invalidate(self, host_url: str, api_url: str) -> None:
+        """
+        Remove all cached responses under the resource collection
+        the given API command belongs to.
+
+        For example, `/api/v3/indexer/1` invalidates `/api/v3/indexer`,
+        `/api/v3/indexer/1` and `/api/v3/indexer/schema`.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+            api_url (str): API command that modified the resource.
+        """
+
+        resource = _get_api_resource(api_url)
+        with self._lock:
+            for key in [
+                key
+                for key in self._entries
+                if key[0] == host_url and _get_api_resource(key[1]) == resource
+            ]:
+                del self._entries[key]
+
+
+_api_cache: contextvars.ContextVar[Optional[SonarrAPICache]] = contextvars.ContextVar(
+    "_api_cache",
+    default=None,
+)
+
+
+@contextmanager
+def api_cache() -> Generator[SonarrAPICache, None, None]:
+    """
+    Cache `GET` responses from Sonarr instances for the duration of the context.
+
+    If a cache is already active, it is reused, and left open when the context exits.
+
+    Yields:
+        Active API response cache
+    """
+
+    cache = _api_cache.get()
+    if cache is not None:
+        yield cache
+        return
+    cache = SonarrAPICache()
+    token = _api_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _api_cache.reset(token)
+        logger.debug("API response cache: %i hits, %i misses", cache.hits, cache.misses)
+
+
+def _normalize_api_url(api_url: str) -> str:
+    return f"/{api_url.lstrip('/')}"
+
+
+def _get_api_resource(api_url: str) -> str:
+    # Return the resource collection an API command belongs to,
+    # e.g. `/api/v3/indexer/1` -> `indexer`, `/api/v3/config/host` -> `config/host`.
+    segments = _normalize_api_url(api_url).split("?", 1)[0].strip("/").split("/")
+    if segments[:2] == ["api", "v3"]:
+        segments = segments[2:]
+    if not segments:
+        return ""
+    if segments[0] == "config":
+        return "/".join(segments[:2])
+    return segments[0]
+
+
+def _invalidate_api_cache(host_url: str, api_url: str) -> None:
+    cache = _api_cache.get()
+    if cache is not None:
+        cache.invalidate(host_url, api_url)
+
+
+def _is_recording_section_reads(host_url: str) -> bool:
+    # Check whether the resources read by settings sections on an instance are being recorded.
+    return get_active_section_sync() is not None and bool(_api_section.get())
+
+
+def _record_section_read(host_url: str, api_url: str, get_res_digest: Callable[[], str]) -> None:
+    # Record the digests of the resources read by each settings section,
+    # if incremental sync is active, so that the section can be skipped
+    # on the next run if none of them have changed.
+    # Resources read from other instances (e.g. by import lists linked to another instance)
+    # are recorded using their full URL.
+    # The digest is only computed if the read is being recorded.
+    section_sync = get_active_section_sync()
+    section = _api_section.get()
+    if section_sync is not None and section:
+        section_sync.record_read(
+            section,
+            (api_url if section_sync.host_url == host_url else f"{host_url}/{api_url.lstrip('/')}"),
+            get_res_digest(),
+        )
+
+
+def get_read_digest(secrets: SonarrSecrets, api_url: str) -> Optional[str]:
+    """
+    Get the current digest of a resource read by a settings section,
+    as recorded by the incremental sync status of an instance.
+
+    Resources read from other instances (e.g. by import lists linked to another instance)
+    are recorded using their full URL, and are fetched using the secrets
+    of that instance in this Buildarr run.
+
+    Args:
+        secrets (SonarrSecrets): Secrets metadata of the instance the section is for.
+        api_url (str): API command, or full URL, the resource was read from.
+
+    Returns:
+        Resource digest, or `None` if the resource is on an instance not in this run
+    """
+
+    if "://" not in api_url:
+        return get_digest(api_get(secrets, api_url))
+    for instance_secrets in (state.instance_secrets or {}).get("sonarr", {}).values():
+        host_url = cast("SonarrSecrets", instance_secrets).host_url
+        if api_url.startswith(f"{host_url}/"):
+            return get_digest(
+                api_get(
+                    cast("SonarrSecrets", instance_secrets),
+                    api_url[len(host_url) :],
+                ),
+            )
+    return None
+
+
+def _record_journal_write(host_url: str, method: str, api_url: str, res_json: Any) -> None:
+    # Append a successful write to the checkpoint journal, if enabled,
+    # and record it against the section that made it, so that the resources
+    # the section wrote to are read again when checkpointing the section.
+    journal = get_journal()
+    if journal is None:
+        return
+    section = _api_section.get()
+    section_sync = get_section_sync(host_url)
+    if section_sync is not None and section:
+        section_sync.record_write(section, api_url)
+    match = RESOURCE_ID_PATTERN.search(api_url)
+    if match:
+        resource_id: Optional[int] = int(match.group(1))
+    elif isinstance(res_json, dict) and isinstance(res_json.get("id"), int):
+        resource_id = res_json["id"]
+    else:
+        resource_id = None
+    journal.record_write(
+        host_url,
+        section,
+        _api_definition.get(),
+        method,
+        api_url,
+        resource_id,
+    )
+
+
+def record_section_checkpoint(
+    secrets: SonarrSecrets,
+    section_name: str,
+    section_config: BaseModel,
+) -> None:
+    """
+    Append a checkpoint for a settings section that has been updated
+    to the checkpoint journal, if enabled.
+
+    The checkpoint contains a fingerprint of the section: a hash of its local configuration,
+    and digests of the remote resources it read, as recorded by the active incremental
+    sync status for the instance. The digests recorded when the resources were read
+    are reused, except for resources the section has since written to.
+    Resources held in the remote snapshot are kept up to date with the writes
+    sent to the instance, so only resources written to outside of the snapshot
+    are fetched again. Nothing is recorded if changes are being planned instead of applied.
+
+    Args:
+        secrets (SonarrSecrets): Sonarr secrets metadata.
+        section_name (str): Name of the updated section (e.g. `indexers`).
+        section_config (BaseModel): Local configuration of the section.
+    """
+
+    journal = get_journal()
+    section_sync = get_section_sync(secrets.host_url)
+    if journal is None or section_sync is None or get_plan(secrets.host_url) is not None:
+        return
+    reads = section_sync.reads.get(section_name, {})
+    if not reads:
+        return
+    written = {_get_api_resource(api_url) for api_url in section_sync.writes.get(section_name, ())}
+    snapshot = get_snapshot(secrets.host_url)
+    remote: Dict[str, str] = {}
+    try:
+        for api_url, digest in sorted(reads.items()):
+            if _get_api_resource(api_url) not in written:
+                remote[api_url] = digest
+            elif snapshot is not None and snapshot.get_resource(api_url):
+                remote[api_url] = snapshot.get_digest(
+                    api_url,
+                    functools.partial(api_get, secrets, api_url),
+                )
+            else:
+                remote[api_url] = get_digest(api_get(secrets, api_url))
+    except SonarrAPIError as err:
+        logger.debug("Unable to checkpoint section '%s': %s", section_name, err)
+        return
+    journal.record_checkpoint(
+        secrets.host_url,
+        secrets.version,
+        section_name,
+        get_config_hash(section_config, secrets.api_key.get_secret_value()),
+        remote,
+    )
+
+
+def _update_snapshot(host_url: str, method: str, api_url: str, res_json: Any = NO_BODY) -> None:
+    # Apply a write to the active remote snapshot for the instance, if any.
+    # Failed writes (no response object) discard the resource instead,
+    # as the state of the resource on the instance is not known.
+    snapshot = get_snapshot(host_url)
+    if snapshot is not None:
+        if res_json is NO_BODY:
+            snapshot.discard(api_url)
+        else:
+            snapshot.apply(method, api_url, res_json)
+
+
+@dataclass
+class SonarrTransferStats:
+    """
+    Data transfer statistics for a group of Sonarr API requests.
+    """
+
+    requests: int = 0
+    """
+    Number of requests sent.
+    """
+
+    sent_bytes: int = 0
+    """
+    Total size of the request bodies sent.
+    """
+
+    received_bytes: int = 0
+    """
+    Total size of the response bodies received, as transferred (i.e. compressed).
+    """
+
+    decoded_bytes: int = 0
+    """
+    Total size of the response bodies received, after decompression.
+    """
+
+    @property
+    def compression_ratio(self) -> float:
+        """
+        Ratio of decompressed to transferred response bytes.
+        """
+        return self.decoded_bytes / self.received_bytes if self.received_bytes else 1.0
+
+    def add(self, sent_bytes: int, received_bytes: int, decoded_bytes: int) -> None:
+        self.requests += 1
+        self.sent_bytes += sent_bytes
+        self.received_bytes += received_bytes
+        self.decoded_bytes += decoded_bytes
+
+
+class SonarrTransferAccounting:
+    """
+    Accounting of data transferred to and from Sonarr instances,
+    grouped by the configuration section that sent the requests.
+    """
+
+    def __init__(self) -> None:
+        self.sections: Dict[str, SonarrTransferStats] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> SonarrTransferStats:
+        """
+        Transfer statistics for all requests.
+        """
+        total = SonarrTransferStats()
+        with self._lock:
+            for stats in self.sections.values():
+                total.requests += stats.requests
+                total.sent_bytes += stats.sent_bytes
+                total.received_bytes += stats.received_bytes
+                total.decoded_bytes += stats.decoded_bytes
+        return total
+
+    def record(
+        self, section: str, sent_bytes: int, received_bytes: int, decoded_bytes: int
+    ) -> None:
+        """
+        Record the data transferred by a request.
+
+        Args:
+            section (str): Configuration section the request was sent for.
+            sent_bytes (int): Size of the request body.
+            received_bytes (int): Size of the response body, as transferred.
+            decoded_bytes (int): Size of the response body, after decompression.
+        """
+        with self._lock:
+            try:
+                stats = self.sections[section]
+            except KeyError:
+                stats = self.sections[section] = SonarrTransferStats()
+            stats.add(sent_bytes, received_bytes, decoded_bytes)
+
+
+_api_section: contextvars.ContextVar[str] = contextvars.ContextVar("_api_section", default="")
+_api_definition: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "_api_definition",
+    default="",
+)
+_transfer_accounting: contextvars.ContextVar[Optional[SonarrTransferAccounting]] = (
+    contextvars.ContextVar("_transfer_accounting", default=None)
+)
+
+
+@contextmanager
+def api_section(tree: str) -> Generator[None, None, None]:
+    """
+    Attribute all API requests sent within the context to the given configuration section.
+
+    Args:
+        tree (str): Configuration tree of the section (e.g. `sonarr.settings.indexers`).
+    """
+
+    token = _api_section.set(tree)
+    try:
+        with profile(tree):
+            yield
+    finally:
+        _api_section.reset(token)
+
+
+@contextmanager
+def api_definition(tree: str) -> Generator[None, None, None]:
+    """
+    Attribute all API requests sent within the context to the given definition
+    within a configuration section.
+
+    Args:
+        tree (str): Configuration tree of the definition
+            (e.g. `sonarr.settings.indexers.definitions['Nyaa']`).
+    """
+
+    token = _api_definition.set(tree)
+    try:
+        with profile(tree):
+            yield
+    finally:
+        _api_definition.reset(token)
+
+
+@contextmanager
+def transfer_accounting() -> Generator[SonarrTransferAccounting, None, None]:
+    """
+    Record the data transferred by API requests sent within the context.
+
+    If accounting is already active, it is reused.
+
+    Yields:
+        Active transfer accounting object
+    """
+
+    accounting = _transfer_accounting.get()
+    if accounting is not None:
+        yield accounting
+        return
+    accounting = SonarrTransferAccounting()
+    token = _transfer_accounting.set(accounting)
+    try:
+        yield accounting
+    finally:
+        _transfer_accounting.reset(token)
+
+
+def _record_transfer(
+    method: str,
+    url: str,
+    res: requests.Response,
+    decoded_bytes: int,
+) -> None:
+    # Record the compressed and decompressed size of a response,
+    # once the response body has been fully read.
+    req_body = res.request.body
+    sent_bytes = len(req_body) if req_body else 0
+    received_bytes = res.raw.tell() if res.raw is not None else decoded_bytes
+    logger.debug(
+        "%s %s -> sent=%i received=%i decoded=%i (encoding: %s)",
+        method,
+        url,
+        sent_bytes,
+        received_bytes,
+        decoded_bytes,
+        res.headers.get("Content-Encoding", "identity"),
+    )
+    section = _api_section.get()
+    get_metrics().record_transfer(section, method, url, sent_bytes, received_bytes)
+    accounting = _transfer_accounting.get()
+    if accounting is not None:
+        accounting.record(section, sent_bytes, received_bytes, decoded_bytes)
+    record_profile_transfer(sent_bytes, received_bytes)
+
+
+def get_session(host_url: str) -> requests.Session:
+    """
+    Get the pooled HTTP session for the given Sonarr instance, creating it if required.
+
+    Sessions are kept for the lifetime of the Buildarr run, so that connections
+    (and TLS sessions) to the same instance are reused between API requests.
+
+    Args:
+        host_url (str): Sonarr instance URL.
+
+    Returns:
+        HTTP session for the instance
+    """
+
+    with _sessions_lock:
+        try:
+            return _sessions[host_url]
+        except KeyError:
+            pass
+        logger.debug(
+            "Creating HTTP session for '%s' (pool size: %i)",
+            host_url,
+            _session_pool_size,
+        )
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_session_pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _sessions[host_url] = session
+        return session
+
+
+def set_session_pool_size(pool_size: int) -> None:
+    """
+    Set the maximum number of keep-alive connections held open to each Sonarr instance.
+
+    Any existing sessions are closed, so that the new pool size takes effect
+    on the next API request.
+
+    Args:
+        pool_size (int): Maximum number of pooled connections per instance.
+    """
+
+    global _session_pool_size  # noqa: PLW0603
+
+    if pool_size < 1:
+        raise ValueError(f"Invalid session pool size (must be at least 1): {pool_size}")
+
+    close_sessions()
+    _session_pool_size = pool_size
+
+
+def close_sessions() -> None:
+    """
+    Close all pooled HTTP sessions, and the connections held open by them.
+
+    This should be called at the end of a Buildarr run.
+    """
+
+    with _sessions_lock:
+        for host_url, session in _sessions.items():
+            logger.debug("Closing HTTP session for '%s'", host_url)
+            session.close()
+        _sessions.clear()
+
+
+atexit.register(close_sessions)
+
+
+def set_api_trace_max_bytes(max_bytes: int) -> None:
+    """
+    Set the maximum size of request and response payloads output in API logs and traces.
+
+    Payloads larger than this are truncated.
+
+    Args:
+        max_bytes (int): Maximum payload size, in bytes.
+    """
+
+    global _api_trace_max_bytes  # noqa: PLW0603
+
+    if max_bytes < 0:
+        raise ValueError(f"Invalid API trace payload size (must not be negative): {max_bytes}")
+
+    _api_trace_max_bytes = max_bytes
+
+
+def enable_api_trace(path: Union[str, PathLike]) -> None:
+    """
+    Write a trace of all Sonarr API requests to the given file.
+
+    The trace is written as one JSON object per line, each containing the HTTP method,
+    URL, response status, latency, payload sizes and the (truncated) payloads themselves.
+
+    Traces are emitted on the `buildarr_sonarr.api.trace` logger at the `DEBUG` level,
+    so they can also be captured by configuring that logger directly.
+    Payloads are only formatted when the logger is enabled.
+
+    Args:
+        path (Union[str, PathLike]): Trace file path. The file is appended to if it exists.
+    """
+
+    global _api_trace_handler  # noqa: PLW0603
+
+    disable_api_trace()
+    handler = FileHandler(path, encoding="utf-8")
+    handler.setFormatter(Formatter("%(message)s"))
+    api_trace_logger.addHandler(handler)
+    api_trace_logger.setLevel(DEBUG)
+    _api_trace_handler = handler
+
+
+def disable_api_trace() -> None:
+    """
+    Stop writing the Sonarr API trace file, if it was enabled using `enable_api_trace`.
+    """
+
+    global _api_trace_handler  # noqa: PLW0603
+
+    if _api_trace_handler is not None:
+        api_trace_logger.removeHandler(_api_trace_handler)
+        _api_trace_handler.close()
+        _api_trace_handler = None
+        api_trace_logger.setLevel(0)
+
+
+def _trace(
+    method: str,
+    url: str,
+    res: requests.Response,
+    latency: float,
+    streamed: bool = False,
+) -> None:
+    # Output an API trace record for a request, if API tracing is enabled.
+    # This is checked first so that payloads are not processed at all when it isn't.
+    if not api_trace_logger.isEnabledFor(DEBUG):
+        return
+    req_body = res.request.body
+    if isinstance(req_body, str):
+        req_body = req_body.encode("utf-8")
+    record: Dict[str, Any] = {
+        "method": method,
+        "url": url,
+        "status": res.status_code,
+        "latency_ms": round(latency * 1000, 3),
+        "req_bytes": len(req_body) if req_body else 0,
+        "res_bytes": None if streamed else len(res.content),
+        "res_wire_bytes": (
+            None if streamed else res.raw.tell() if res.raw is not None else len(res.content)
+        ),
+    }
+    if req_body:
+        record["req"] = _truncate(req_body)
+    if not streamed:
+        record["res"] = _truncate(res.content)
+    api_trace_logger.debug(json.dumps(record, ensure_ascii=False))
+
+
+def _truncate(payload: bytes) -> str:
+    if len(payload) <= _api_trace_max_bytes:
+        return payload.decode("utf-8", errors="replace")
+    return (
+        f"{payload[:_api_trace_max_bytes].decode('utf-8', errors='ignore')}"
+        f"...({len(payload) - _api_trace_max_bytes} bytes truncated)"
+    )
+
+
+class _LazyRepr:
+    """
+    Wrapper for logging the `repr` of a payload, only evaluated if the log record is emitted.
+    """
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any) -> None:
+        self.obj = obj
+
+    def __str__(self) -> str:
+        return _truncate(repr(self.obj).encode("utf-8"))
+
+
+def _send(
+    method: str,
+    host_url: str,
+    url: str,
+    api_key: Optional[str],
+    session: Optional[requests.Session],
+    req: Any = NO_BODY,
+    **kwargs,
+) -> requests.Response:
+    # Send an HTTP request to a Sonarr instance using the given session,
+    # or the pooled session for the instance if not provided.
+    # If a request object is given, it is encoded to JSON using the active codec.
+    # If an API cassette is active, the request and response are recorded to it,
+    # or the response is served from it without touching the network.
+    if not session:
+        session = get_session(host_url)
+    headers: Dict[str, str] = {}
+    if api_key:
+        headers["X-Api-Key"] = api_key
+    if req is not NO_BODY:
+        headers["Content-Type"] = "application/json"
+        kwargs["data"] = json_dumps(req)
+    streamed = kwargs.get("stream", False)
+    cassette = get_cassette()
+    with profile_request(method, url):
+        if cassette is not None and cassette.replaying:
+            start = time.perf_counter()
+            res = cassette.replay(method, url, kwargs.get("data"), stream=streamed)
+        else:
+            res, start = _request(method, host_url, url, session, headers, **kwargs)
+            if cassette is not None:
+                cassette.record(method, url, kwargs.get("data"), res)
+        if res.status_code == HTTPStatus.UNAUTHORIZED:
+            # The API key was rejected, so it should not be reused from the secrets cache.
+            invalidate_cached_secrets(host_url)
+        _trace(method, url, res, time.perf_counter() - start, streamed=streamed)
+        if not streamed:
+            _record_transfer(method, url, res, len(res.content))
+    return res
+
+
+def _request(
+    method: str,
+    host_url: str,
+    url: str,
+    session: requests.Session,
+    headers: Dict[str, str],
+    **kwargs,
+) -> Tuple[requests.Response, float]:
+    # Send an HTTP request, retrying it according to the retry policy,
+    # and within the circuit breaker and concurrency limiter for the instance.
+    # The circuit breaker counts the request as a whole, so a request is only
+    # recorded as failed once all of its retries have failed.
+    # Returns the response, and the time the final attempt was sent at.
+    policy = get_retry_policy()
+    breaker = get_circuit_breaker(host_url)
+    limiter = get_limiter(host_url)
+    attempt = 0
+    breaker.before_request(method, url)
+    while True:
+        start = time.perf_counter()
+        try:
+            with limiter.request() as limited_request:
+                res = session.request(
+                    method,
+                    url,
+                    headers=headers,
+                    timeout=state.request_timeout,
+                    **kwargs,
+                )
+                limited_request.status_code = res.status_code
+        except (requests.ConnectionError, requests.Timeout) as err:
+            get_metrics().record_request(
+                _api_section.get(),
+                method,
+                url,
+                None,
+                time.perf_counter() - start,
+            )
+            if not policy.is_retryable(method, attempt):
+                breaker.record_failure()
+                raise
+            backoff = policy.get_backoff(attempt)
+            logger.debug("%s %s -> %s (retrying in %.2f seconds)", method, url, err, backoff)
+        else:
+            get_metrics().record_request(
+                _api_section.get(),
+                method,
+                url,
+                res.status_code,
+                time.perf_counter() - start,
+            )
+            if res.status_code not in policy.status_codes or not policy.is_retryable(
+                method,
+                attempt,
+            ):
+                if res.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                break
+            backoff = policy.get_backoff(attempt, res.headers.get("Retry-After"))
+            logger.debug(
+                "%s %s -> status_code=%i (retrying in %.2f seconds)",
+                method,
+                url,
+                res.status_code,
+                backoff,
+            )
+            res.close()
+        time.sleep(backoff)
+        attempt += 1
+    return (res, start)
 
 
 def get_initialize_js(host_url: str, api_key: Optional[str] = None) -> Dict[str, Any]:
@@ -58,15 +872,15 @@ def get_initialize_js(host_url: str, api_key: Optional[str] = None) -> Dict[str,
 
     logger.debug("GET %s", url)
 
-    res = requests.get(
-        url,
-        headers={"X-Api-Key": api_key} if api_key else None,
-        timeout=state.request_timeout,
-        allow_redirects=False,
-    )
+    res = _send("GET", host_url, url, api_key, None, allow_redirects=False)
 
     if res.status_code != HTTPStatus.OK:
-        logger.debug("GET %s -> status_code=%i res=%s", url, res.status_code, res.text)
+        logger.debug(
+            "GET %s -> status_code=%i res=%s",
+            url,
+            res.status_code,
+            _LazyRepr(res.text),
+        )
         if res.status_code in (HTTPStatus.UNAUTHORIZED, HTTPStatus.FOUND):
             status_code: int = HTTPStatus.UNAUTHORIZED
             error_message = "Unauthorized"
@@ -84,9 +898,14 @@ def get_initialize_js(host_url: str, api_key: Optional[str] = None) -> Dict[str,
             f"No matches for 'initialize.js' parsing: {res.text}",
             status_code=res.status_code,
         )
-    res_json = json5.loads(res_match.group(1))
+    # The payload is usually valid JSON, so try the (much faster) JSON codec first,
+    # and only fall back to parsing it as JavaScript if that fails.
+    try:
+        res_json = json_loads(res_match.group(1))
+    except ValueError:
+        res_json = json5.loads(res_match.group(1))
 
-    logger.debug("GET %s -> status_code=%i res=%s", url, res.status_code, repr(res_json))
+    logger.debug("GET %s -> status_code=%i res=%s", url, res.status_code, _LazyRepr(res_json))
 
     return res_json
 
@@ -107,6 +926,8 @@ def api_get(
         secrets (Union[SonarrSecrets, str]): Secrets metadata, or host URL.
         api_url (str): API command.
         expected_status_code (HTTPStatus): Expected response status. Defaults to `200 OK`.
+        session (Optional[requests.Session]): HTTP session to use.
+            Defaults to the pooled session for the instance.
 
     Returns:
         Response object
@@ -124,28 +945,318 @@ def api_get(
 
     url = f"{host_url}/{api_url.lstrip('/')}"
 
-    logger.debug("GET %s", url)
-
-    if not session:
-        session = requests.Session()
-    res = session.get(
+    snapshot = (
+        get_snapshot(host_url) if host_api_key and expected_status_code == HTTPStatus.OK else None
+    )
+    fetch = functools.partial(
+        _get,
+        host_url,
         url,
-        headers={"X-Api-Key": host_api_key} if host_api_key else None,
-        timeout=state.request_timeout,
+        api_url,
+        host_api_key,
+        expected_status_code,
+        session,
     )
+    if snapshot is not None and snapshot.get_resource(api_url):
+        res_json = snapshot.get(api_url, fetch)
+        if host_api_key:
+            _record_section_read(
+                host_url,
+                api_url,
+                functools.partial(snapshot.get_digest, api_url, fetch),
+            )
+    else:
+        res_json = fetch()
+        if host_api_key:
+            _record_section_read(host_url, api_url, functools.partial(get_digest, res_json))
+
+    return res_json
+
+
+def _get(
+    host_url: str,
+    url: str,
+    api_url: str,
+    api_key: Optional[str],
+    expected_status_code: HTTPStatus,
+    session: Optional[requests.Session],
+) -> Any:
+    # Send a `GET` request, using the API response cache if active.
+    # If a change plan is being recorded, the resource is added to its fingerprint.
+    plan = get_plan(host_url) if api_key else None
+    cache = _api_cache.get() if api_key and expected_status_code == HTTPStatus.OK else None
+    if cache is not None:
+        cached, res_json = cache.get(host_url, api_url)
+        if cached:
+            logger.debug("GET %s (cached)", url)
+            if plan is not None:
+                plan.record_read(api_url, res_json)
+            return res_json
+
+    logger.debug("GET %s", url)
+
+    res = _send("GET", host_url, url, api_key, session)
     try:
-        res_json = res.json()
-    except requests.JSONDecodeError:
+        res_json = json_loads(res.content)
+    except ValueError:
         api_error(method="GET", url=url, response=res)
 
-    logger.debug("GET %s -> status_code=%i res=%s", url, res.status_code, repr(res_json))
+    logger.debug("GET %s -> status_code=%i res=%s", url, res.status_code, _LazyRepr(res_json))
 
     if res.status_code != expected_status_code:
         api_error(method="GET", url=url, response=res)
 
+    if cache is not None:
+        cache.set(host_url, api_url, res_json)
+
+    if plan is not None:
+        plan.record_read(api_url, res_json)
+
     return res_json
 
 
+def api_get_iter(
+    secrets: Union[SonarrSecrets, str],
+    api_url: str,
+    *,
+    fields: Optional[Collection[str]] = None,
+    api_key: Optional[str] = None,
+    use_api_key: bool = True,
+    expected_status_code: HTTPStatus = HTTPStatus.OK,
+    session: Optional[requests.Session] = None,
+) -> Iterator[Any]:
+    """
+    Send an API `GET` request for a list resource, and stream the items in the response.
+
+    Items are decoded and yielded one at a time as the response body is downloaded,
+    instead of loading the whole response into memory first.
+    This is intended for list endpoints whose size grows with the media library
+    (e.g. root folders).
+
+    Resources covered by the remote snapshot are read from the snapshot instead.
+    If the response needs to be added to the change plan fingerprint, or to the resources
+    read by the active settings section, its digest is computed from the items
+    as they are streamed.
+
+    Args:
+        secrets (Union[SonarrSecrets, str]): Secrets metadata, or host URL.
+        api_url (str): API command.
+        fields (Optional[Collection[str]]): If set, only keep these fields on each item.
+        expected_status_code (HTTPStatus): Expected response status. Defaults to `200 OK`.
+        session (Optional[requests.Session]): HTTP session to use.
+            Defaults to the pooled session for the instance.
+
+    Returns:
+        Iterator of response items
+    """
+
+    if isinstance(secrets, str):
+        host_url = secrets
+        host_api_key = api_key
+    else:
+        host_url = secrets.host_url
+        host_api_key = secrets.api_key.get_secret_value()
+
+    if not use_api_key:
+        host_api_key = None
+
+    url = f"{host_url}/{api_url.lstrip('/')}"
+
+    fetch = functools.partial(
+        _get,
+        host_url,
+        url,
+        api_url,
+        host_api_key,
+        expected_status_code,
+        session,
+    )
+
+    snapshot = (
+        get_snapshot(host_url) if host_api_key and expected_status_code == HTTPStatus.OK else None
+    )
+    if snapshot is not None and snapshot.get_resource(api_url):
+        # Load the whole collection into the snapshot, instead of streaming it,
+        # so that it can be reused by later requests.
+        res_json = snapshot.get(api_url, fetch)
+        _record_section_read(
+            host_url,
+            api_url,
+            functools.partial(snapshot.get_digest, api_url, fetch),
+        )
+        yield from (_select_fields(item, fields) for item in res_json)
+        return
+
+    plan = get_plan(host_url) if host_api_key else None
+    recording_reads = bool(host_api_key) and _is_recording_section_reads(host_url)
+
+    cache = _api_cache.get() if host_api_key and expected_status_code == HTTPStatus.OK else None
+    if cache is not None:
+        cached, res_json = cache.get(host_url, api_url)
+        if cached:
+            logger.debug("GET %s (cached)", url)
+            if plan is not None:
+                plan.record_read(api_url, res_json)
+            if recording_reads:
+                _record_section_read(host_url, api_url, functools.partial(get_digest, res_json))
+            yield from (_select_fields(item, fields) for item in res_json)
+            return
+
+    # If the resource needs to be added to the change plan fingerprint,
+    # or the resources read by the section, compute its digest from the items
+    # as they are streamed, instead of reading the whole response into memory.
+    list_digest = SonarrListDigest() if plan is not None or recording_reads else None
+
+    logger.debug("GET %s (streamed)", url)
+
+    with _send("GET", host_url, url, host_api_key, session, stream=True) as res:
+        if res.status_code != expected_status_code:
+            try:
+                json_loads(res.content)
+            except ValueError:
+                api_error(method="GET", url=url, response=res, parse_response=False)
+            api_error(method="GET", url=url, response=res)
+        num_items = 0
+        decoded_bytes = 0
+
+        def _chunks() -> Iterator[bytes]:
+            nonlocal decoded_bytes
+            for chunk in res.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                decoded_bytes += len(chunk)
+                yield chunk
+
+        try:
+            for item in _iter_json_array(_chunks()):
+                num_items += 1
+                if list_digest is not None:
+                    list_digest.add(item)
+                yield _select_fields(item, fields)
+        except ValueError as err:
+            raise SonarrAPIError(
+                f"Unable to decode streamed response from 'GET {url}': {err}",
+                status_code=res.status_code,
+            ) from None
+        _record_transfer("GET", url, res, decoded_bytes)
+
+    logger.debug("GET %s -> status_code=%i items=%i", url, res.status_code, num_items)
+
+    if list_digest is not None:
+        digest = list_digest.get_digest()
+        if plan is not None:
+            plan.record_read_digest(api_url, digest)
+        if recording_reads:
+            _record_section_read(host_url, api_url, lambda: digest)
+
+
+def api_get_ids(
+    secrets: SonarrSecrets,
+    api_url: str,
+    key: str = "name",
+) -> Dict[str, int]:
+    """
+    Get a mapping of the names of the items in a list resource to their IDs.
+
+    If a remote snapshot is active for the instance, the mapping is read from it,
+    without fetching or copying the whole collection again.
+
+    Args:
+        secrets (SonarrSecrets): Sonarr secrets metadata.
+        api_url (str): API command for the list resource (e.g. `/api/v3/tag`).
+        key (str, optional): Item attribute to use as the name. Defaults to `name`.
+
+    Returns:
+        Name-to-ID mapping
+    """
+
+    snapshot = get_snapshot(secrets.host_url)
+    if snapshot is not None and snapshot.get_resource(api_url):
+        fetch = functools.partial(
+            _get,
+            secrets.host_url,
+            f"{secrets.host_url}/{api_url.lstrip('/')}",
+            api_url,
+            secrets.api_key.get_secret_value(),
+            HTTPStatus.OK,
+            None,
+        )
+        ids = snapshot.get_ids(api_url, fetch, key=key)
+        _record_section_read(
+            secrets.host_url,
+            api_url,
+            functools.partial(snapshot.get_digest, api_url, fetch),
+        )
+        return ids
+    return {item[key]: item["id"] for item in api_get(secrets, api_url)}
+
+
+def _select_fields(item: Any, fields: Optional[Collection[str]]) -> Any:
+    if fields is None or not isinstance(item, dict):
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def _iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    # Incrementally decode a JSON array from a stream of raw byte chunks,
+    # yielding each array element as soon as it has been fully received.
+    # If the top-level value is not an array, it is decoded and yielded as a whole.
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    started = False
+    expect_separator = False
+    chunks_iter = iter(chunks)
+    final = False
+    while not final:
+        try:
+            chunk = text_decoder.decode(next(chunks_iter))
+        except StopIteration:
+            chunk = text_decoder.decode(b"", final=True)
+            final = True
+        buf = buf[pos:] + chunk
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not started:
+                if buf[pos] != "[":
+                    # Not an array, so fall back to decoding the full response.
+                    rest = (
+                        buf[pos:]
+                        + "".join(text_decoder.decode(c) for c in chunks_iter)
+                        + text_decoder.decode(b"", final=True)
+                    )
+                    yield json.loads(rest)
+                    return
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            if expect_separator:
+                if buf[pos] != ",":
+                    raise ValueError(f"Expected ',' or ']' at: {buf[pos : pos + 32]!r}")
+                expect_separator = False
+                pos += 1
+                continue
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break
+            # A value ending exactly at the end of the buffer may be truncated
+            # (e.g. a number split across chunks), so wait for more data.
+            if end >= len(buf) and not final:
+                break
+            yield item
+            pos = end
+            expect_separator = True
+    raise ValueError("Unexpected end of response" if started else "Empty response")
+
+
 def api_post(
     secrets: Union[SonarrSecrets, str],
     api_url: str,
@@ -161,6 +1272,8 @@ def api_post(
         secrets (Union[SonarrSecrets, str]): Sonarr secrets metadata, or host URL.
         api_url (str): Sonarr API command.
         req (Any): Request (JSON-serialisable).
+        session (Optional[requests.Session]): HTTP session to use.
+            Defaults to the pooled session for the instance.
         expected_status_code (HTTPStatus): Expected response status. Defaults to `201 Created`.
 
     Returns:
@@ -175,26 +1288,39 @@ def api_post(
         api_key = secrets.api_key.get_secret_value() if use_api_key else None
     url = f"{host_url}/{api_url.lstrip('/')}"
 
-    logger.debug("POST %s <- req=%s", url, repr(req))
+    plan = get_plan(host_url) if api_key else None
+    if plan is not None:
+        res_json = plan.record_write("POST", api_url, req, expected_status_code, _api_section.get())
+        _update_snapshot(host_url, "POST", api_url, res_json)
+        return res_json
 
-    if not session:
-        session = requests.Session()
-    res = session.post(
+    logger.debug("POST %s <- req=%s", url, _LazyRepr(req))
+
+    res = _send(
+        "POST",
+        host_url,
         url,
-        headers={"X-Api-Key": api_key} if api_key else None,
-        timeout=state.request_timeout,
-        **({"json": req} if req is not None else {}),
+        api_key,
+        session,
+        **({"req": req} if req is not None else {}),
     )
+    _invalidate_api_cache(host_url, api_url)
     try:
-        res_json = res.json()
-    except requests.JSONDecodeError:
+        res_json = json_loads(res.content)
+    except ValueError:
+        _update_snapshot(host_url, "POST", api_url)
         api_error(method="POST", url=url, response=res)
 
-    logger.debug("POST %s -> status_code=%i res=%s", url, res.status_code, repr(res_json))
+    logger.debug("POST %s -> status_code=%i res=%s", url, res.status_code, _LazyRepr(res_json))
 
     if res.status_code != expected_status_code:
+        _update_snapshot(host_url, "POST", api_url)
         api_error(method="POST", url=url, response=res)
 
+    _update_snapshot(host_url, "POST", api_url, res_json)
+    if api_key:
+        _record_journal_write(host_url, "POST", api_url, res_json)
+
     return res_json
 
 
@@ -213,6 +1339,8 @@ def api_put(
         secrets (Union[SonarrSecrets, str]): Sonarr secrets metadata, or host URL.
         api_url (str): Sonarr API command.
         req (Any): Request (JSON-serialisable).
+        session (Optional[requests.Session]): HTTP session to use.
+            Defaults to the pooled session for the instance.
         expected_status_code (HTTPStatus): Expected response status. Defaults to `200 OK`.
 
     Returns:
@@ -227,26 +1355,32 @@ def api_put(
         api_key = secrets.api_key.get_secret_value() if use_api_key else None
     url = f"{host_url}/{api_url.lstrip('/')}"
 
-    logger.debug("PUT %s <- req=%s", url, repr(req))
+    plan = get_plan(host_url) if api_key else None
+    if plan is not None:
+        res_json = plan.record_write("PUT", api_url, req, expected_status_code, _api_section.get())
+        _update_snapshot(host_url, "PUT", api_url, res_json)
+        return res_json
 
-    if not session:
-        session = requests.Session()
-    res = session.put(
-        url,
-        headers={"X-Api-Key": api_key} if api_key else None,
-        json=req,
-        timeout=state.request_timeout,
-    )
+    logger.debug("PUT %s <- req=%s", url, _LazyRepr(req))
+
+    res = _send("PUT", host_url, url, api_key, session, req=req)
+    _invalidate_api_cache(host_url, api_url)
     try:
-        res_json = res.json()
-    except requests.JSONDecodeError:
+        res_json = json_loads(res.content)
+    except ValueError:
+        _update_snapshot(host_url, "PUT", api_url)
         api_error(method="PUT", url=url, response=res)
 
-    logger.debug("PUT %s -> status_code=%i res=%s", url, res.status_code, repr(res_json))
+    logger.debug("PUT %s -> status_code=%i res=%s", url, res.status_code, _LazyRepr(res_json))
 
     if res.status_code != expected_status_code:
+        _update_snapshot(host_url, "PUT", api_url)
         api_error(method="PUT", url=url, response=res)
 
+    _update_snapshot(host_url, "PUT", api_url, res_json)
+    if api_key:
+        _record_journal_write(host_url, "PUT", api_url, res_json)
+
     return res_json
 
 
@@ -263,6 +1397,8 @@ def api_delete(
     Args:
         secrets (Union[SonarrSecrets, str]): Sonarr secrets metadata, or host URL.
         api_url (str): Sonarr API command.
+        session (Optional[requests.Session]): HTTP session to use.
+            Defaults to the pooled session for the instance.
         expected_status_code (HTTPStatus): Expected response status. Defaults to `200 OK`.
     """
 
@@ -274,21 +1410,257 @@ def api_delete(
         api_key = secrets.api_key.get_secret_value() if use_api_key else None
     url = f"{host_url}/{api_url.lstrip('/')}"
 
+    plan = get_plan(host_url) if api_key else None
+    if plan is not None:
+        plan.record_write("DELETE", api_url, None, expected_status_code, _api_section.get())
+        _update_snapshot(host_url, "DELETE", api_url, None)
+        return
+
     logger.debug("DELETE %s", url)
 
-    if not session:
-        session = requests.Session()
-    res = session.delete(
-        url,
-        headers={"X-Api-Key": api_key} if api_key else None,
-        timeout=state.request_timeout,
-    )
+    res = _send("DELETE", host_url, url, api_key, session)
+    _invalidate_api_cache(host_url, api_url)
 
     logger.debug("DELETE %s -> status_code=%i", url, res.status_code)
 
     if res.status_code != expected_status_code:
+        _update_snapshot(host_url, "DELETE", api_url)
         api_error(method="DELETE", url=url, response=res, parse_response=False)
 
+    _update_snapshot(host_url, "DELETE", api_url, None)
+    if api_key:
+        _record_journal_write(host_url, "DELETE", api_url, None)
+
+
+def verify_plan(secrets: SonarrSecrets, plan: SonarrPlan) -> List[str]:
+    """
+    Check whether the remote state a change plan was computed against has changed,
+    by reading every resource the plan was computed from again.
+
+    Args:
+        secrets (SonarrSecrets): Sonarr secrets metadata.
+        plan (SonarrPlan): Change plan to verify.
+
+    Returns:
+        API commands of the resources that have changed (empty if the plan is up to date)
+    """
+
+    api_urls = list(plan.reads.keys())
+    return [
+        api_url
+        for api_url, res_json in zip(api_urls, api_get_many(secrets, api_urls))
+        if get_digest(res_json) != plan.reads[api_url]
+    ]
+
+
+def apply_plan(secrets: SonarrSecrets, plan: SonarrPlan, verify: bool = True) -> int:
+    """
+    Send the API writes in a change plan to a Sonarr instance, in order.
+
+    Placeholder IDs given to resources created by the plan are replaced
+    with the IDs of the created resources as the writes are sent.
+
+    Args:
+        secrets (SonarrSecrets): Sonarr secrets metadata.
+        plan (SonarrPlan): Change plan to apply.
+        verify (bool, optional): Reject the plan if the remote state has changed
+            since it was computed. Defaults to `True`.
+
+    Raises:
+        SonarrPlanError: If the plan is for a different instance, or is out of date.
+
+    Returns:
+        Number of API writes sent
+    """
+
+    if plan.host_url != secrets.host_url:
+        raise SonarrPlanError(
+            f"Change plan for '{plan.host_url}' cannot be applied to '{secrets.host_url}'",
+        )
+    if verify:
+        changed = verify_plan(secrets, plan)
+        if changed:
+            raise SonarrPlanError(
+                f"Remote state of '{plan.host_url}' has changed since the change plan "
+                f"was created (changed resources: {', '.join(changed)})",
+            )
+    ids: Dict[int, int] = {}
+    for write in plan.writes:
+        api_url = resolve_placeholder_api_url(write.api_url, ids)
+        body = resolve_placeholder_ids(write.body, ids)
+        status = HTTPStatus(write.expected_status_code)
+        if write.method == "POST":
+            res_json = api_post(secrets, api_url, body, expected_status_code=status)
+            if write.placeholder_id is not None:
+                ids[write.placeholder_id] = res_json["id"]
+        elif write.method == "PUT":
+            api_put(secrets, api_url, body, expected_status_code=status)
+        elif write.method == "DELETE":
+            api_delete(secrets, api_url, expected_status_code=status)
+        else:
+            raise SonarrPlanError(f"Unsupported method in change plan: {write.method}")
+    return len(plan.writes)
+
+
+async def async_api_get(secrets: Union[SonarrSecrets, str], api_url: str, **kwargs) -> Any:
+    """
+    Send an API `GET` request asynchronously.
+
+    Takes the same arguments, and raises the same errors, as `api_get`.
+    The request is sent using `api_get` from a worker thread, so the same
+    concurrency limits, retries and metrics apply to it as to synchronous requests.
+
+    Args:
+        secrets (Union[SonarrSecrets, str]): Secrets metadata, or host URL.
+        api_url (str): API command.
+
+    Returns:
+        Response object
+    """
+
+    return await _run_in_executor(api_get, secrets, api_url, **kwargs)
+
+
+async def async_api_post(
+    secrets: Union[SonarrSecrets, str],
+    api_url: str,
+    req: Any = None,
+    **kwargs,
+) -> Any:
+    """
+    Send a `POST` request to a Sonarr instance asynchronously.
+
+    Takes the same arguments, and raises the same errors, as `api_post`.
+
+    Args:
+        secrets (Union[SonarrSecrets, str]): Sonarr secrets metadata, or host URL.
+        api_url (str): Sonarr API command.
+        req (Any): Request (JSON-serialisable).
+
+    Returns:
+        Response object
+    """
+
+    return await _run_in_executor(api_post, secrets, api_url, req, **kwargs)
+
+
+async def async_api_put(
+    secrets: Union[SonarrSecrets, str],
+    api_url: str,
+    req: Any,
+    **kwargs,
+) -> Any:
+    """
+    Send a `PUT` request to a Sonarr instance asynchronously.
+
+    Takes the same arguments, and raises the same errors, as `api_put`.
+
+    Args:
+        secrets (Union[SonarrSecrets, str]): Sonarr secrets metadata, or host URL.
+        api_url (str): Sonarr API command.
+        req (Any): Request (JSON-serialisable).
+
+    Returns:
+        Response object
+    """
+
+    return await _run_in_executor(api_put, secrets, api_url, req, **kwargs)
+
+
+async def async_api_delete(secrets: Union[SonarrSecrets, str], api_url: str, **kwargs) -> None:
+    """
+    Send a `DELETE` request to a Sonarr instance asynchronously.
+
+    Takes the same arguments, and raises the same errors, as `api_delete`.
+
+    Args:
+        secrets (Union[SonarrSecrets, str]): Sonarr secrets metadata, or host URL.
+        api_url (str): Sonarr API command.
+    """
+
+    await _run_in_executor(api_delete, secrets, api_url, **kwargs)
+
+
+async def api_gather(
+    aws: Iterable[Awaitable[T]],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> List[T]:
+    """
+    Await the given API requests concurrently, with at most `max_concurrency`
+    requests in flight at any one time.
+
+    If any request fails, the error is raised once all in-flight requests have finished.
+
+    Args:
+        aws (Iterable[Awaitable[T]]): API request coroutines to await.
+        max_concurrency (int, optional): Maximum number of concurrent requests.
+
+    Returns:
+        Response objects, in the same order as the requests
+    """
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _bounded(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+
+    results = await asyncio.gather(*(_bounded(aw) for aw in aws), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results  # type: ignore[return-value]
+
+
+def api_get_many(
+    secrets: Union[SonarrSecrets, str],
+    api_urls: Iterable[str],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    **kwargs,
+) -> List[Any]:
+    """
+    Send several independent API `GET` requests to a Sonarr instance concurrently,
+    and wait for all of them to complete.
+
+    This is a convenience function for synchronous callers.
+    Asynchronous callers should await `async_api_get` requests using `api_gather` instead.
+
+    Requests are sent from a pool of worker threads, so this function can be called
+    from any thread, including one running an event loop.
+
+    If any request fails, the error is raised once all in-flight requests have finished.
+
+    Args:
+        secrets (Union[SonarrSecrets, str]): Secrets metadata, or host URL.
+        api_urls (Iterable[str]): API commands.
+        max_concurrency (int, optional): Maximum number of concurrent requests.
+
+    Returns:
+        Response objects, in the same order as `api_urls`
+    """
+
+    api_urls = list(api_urls)
+    results = run_graph(
+        tasks={
+            str(i): functools.partial(api_get, secrets, api_url, **kwargs)
+            for i, api_url in enumerate(api_urls)
+        },
+        dependencies={},
+        max_workers=max_concurrency,
+        thread_name_prefix="buildarr-sonarr-api",
+    )
+    return [results[str(i)] for i in range(len(api_urls))]
+
+
+async def _run_in_executor(func: Callable[..., T], *args, **kwargs) -> T:
+    # Run the blocking function in the event loop's default executor.
+    # The context is copied so that context variables are visible inside the worker thread.
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        None,
+        functools.partial(context.run, func, *args, **kwargs),
+    )
+
 
 def api_error(
     method: str,
@@ -313,7 +1685,11 @@ def api_error(
         f"Unexpected response with status code {response.status_code} from '{method} {url}':"
     )
     if parse_response:
-        res_json = response.json()
+        try:
+            res_json = json_loads(response.content)
+        except ValueError:
+            error_message += f" {response.text}"
+            raise SonarrAPIError(error_message, status_code=response.status_code) from None
         try:
             error_message += f" {_api_error(res_json)}"
         except TypeError:
@@ -0,0 +1,257 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin version-keyed capability registry.
+
+Some information about a Sonarr instance only changes between Sonarr releases,
+such as the language definitions (and their IDs). It is probed once for each
+Sonarr version and saved to a local file, so that configuration sections
+can use it without fetching it from the instance on every run.
+
+Only information used by configuration sections is probed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+
+from dataclasses import asdict, dataclass, field
+from http import HTTPStatus
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict
+
+import requests
+
+from .api import api_get
+from .exceptions import SonarrAPIError, SonarrError
+
+if TYPE_CHECKING:
+    from typing import Any, Optional, Union
+
+    from .secrets import SonarrSecrets
+
+
+logger = getLogger(__name__)
+
+
+CAPABILITIES_VERSION = 2
+
+
+def get_default_capabilities_path() -> Path:
+    """
+    Get the default location of the capability registry file.
+
+    Returns:
+        Path to `buildarr-sonarr/capabilities.json` in the user cache directory
+    """
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "buildarr-sonarr" / "capabilities.json"
+
+
+@dataclass
+class SonarrCapabilities:
+    """
+    Capabilities of a specific version of Sonarr.
+    """
+
+    version: str
+    """
+    Sonarr version the capabilities were probed from.
+    """
+
+    languages: Dict[str, int] = field(default_factory=dict)
+    """
+    Language names and IDs.
+    """
+
+    @classmethod
+    def probe(cls, secrets: SonarrSecrets) -> SonarrCapabilities:
+        """
+        Probe the capabilities of a Sonarr instance.
+
+        Args:
+            secrets (SonarrSecrets): Sonarr instance host and secrets information.
+
+        Returns:
+            Capabilities of the instance's Sonarr version
+        """
+        capabilities = cls(version=secrets.version)
+        try:
+            languages = [
+                language["language"]
+                for language in api_get(secrets, "/api/v3/languageprofile/schema")["languages"]
+            ]
+        except SonarrAPIError as err:
+            if err.status_code != HTTPStatus.NOT_FOUND:
+                raise
+            # Language profiles were removed in Sonarr V4.
+            try:
+                languages = api_get(secrets, "/api/v3/language")
+            except SonarrAPIError as language_err:
+                if language_err.status_code != HTTPStatus.NOT_FOUND:
+                    raise
+                languages = []
+        capabilities.languages = {language["name"]: language["id"] for language in languages}
+        return capabilities
+
+
+class SonarrCapabilitiesRegistry:
+    """
+    Registry of Sonarr capabilities, keyed by Sonarr version, persisted to a local file.
+    """
+
+    def __init__(self, path: Optional[Union[str, os.PathLike]] = None) -> None:
+        self.path = Path(path) if path else None
+        self._capabilities: Optional[Dict[str, SonarrCapabilities]] = None
+        self._active: Dict[str, SonarrCapabilities] = {}
+        self._lock = threading.Lock()
+
+    def find(self, version: str) -> Optional[SonarrCapabilities]:
+        """
+        Get the capabilities of a Sonarr version, if they were loaded or probed
+        in this Buildarr run.
+
+        Args:
+            version (str): Sonarr version.
+
+        Returns:
+            Capabilities, or `None` if not available
+        """
+        return self._active.get(version)
+
+    def get(self, secrets: SonarrSecrets) -> Optional[SonarrCapabilities]:
+        """
+        Get the capabilities of the version of a Sonarr instance,
+        probing the instance if they are not known yet.
+
+        Args:
+            secrets (SonarrSecrets): Sonarr instance host and secrets information.
+
+        Returns:
+            Capabilities, or `None` if they could not be probed
+        """
+        with self._lock:
+            capabilities = self._load().get(secrets.version)
+            if capabilities is None:
+                logger.debug(
+                    "Probing capabilities of Sonarr version %s from '%s'",
+                    secrets.version,
+                    secrets.host_url,
+                )
+                try:
+                    capabilities = SonarrCapabilities.probe(secrets)
+                except (SonarrError, requests.RequestException) as err:
+                    logger.warning(
+                        "Unable to probe capabilities of Sonarr version %s: %s",
+                        secrets.version,
+                        err,
+                    )
+                    return None
+                self._load()[secrets.version] = capabilities
+                self._save()
+            self._active[secrets.version] = capabilities
+            return capabilities
+
+    def _load(self) -> Dict[str, SonarrCapabilities]:
+        # Load the registry file once, and keep the capabilities in memory afterwards.
+        if self._capabilities is None:
+            self._capabilities = {}
+            if self.path and self.path.is_file():
+                try:
+                    registry = json.loads(self.path.read_text(encoding="utf-8"))
+                    if registry.get("version") != CAPABILITIES_VERSION:
+                        raise ValueError(f"unsupported version: {registry.get('version')}")
+                    self._capabilities = {
+                        version: SonarrCapabilities(**capabilities)
+                        for version, capabilities in registry["capabilities"].items()
+                    }
+                except (OSError, ValueError, KeyError, TypeError, AttributeError) as err:
+                    logger.warning(
+                        "Ignoring invalid capability registry file '%s': %s",
+                        self.path,
+                        err,
+                    )
+        return self._capabilities
+
+    def _save(self) -> None:
+        if not self.path or self._capabilities is None:
+            return
+        registry: Dict[str, Any] = {
+            "version": CAPABILITIES_VERSION,
+            "capabilities": {
+                version: asdict(capabilities)
+                for version, capabilities in sorted(self._capabilities.items())
+            },
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(f".{self.path.name}.tmp")
+            temp_path.write_text(json.dumps(registry, indent=2), encoding="utf-8")
+            temp_path.replace(self.path)
+        except OSError as err:
+            logger.warning("Unable to save capability registry file '%s': %s", self.path, err)
+
+
+_registry = SonarrCapabilitiesRegistry(get_default_capabilities_path())
+
+
+def get_capabilities(secrets: SonarrSecrets) -> Optional[SonarrCapabilities]:
+    """
+    Get the capabilities of the version of a Sonarr instance,
+    probing the instance if they are not known yet.
+
+    Args:
+        secrets (SonarrSecrets): Sonarr instance host and secrets information.
+
+    Returns:
+        Capabilities, or `None` if they could not be probed
+    """
+
+    return _registry.get(secrets)
+
+
+def find_capabilities(secrets: SonarrSecrets) -> Optional[SonarrCapabilities]:
+    """
+    Get the capabilities of the version of a Sonarr instance, without probing it.
+
+    Capabilities are only returned if they were loaded or probed earlier in the
+    Buildarr run (i.e. using `get_capabilities`).
+
+    Args:
+        secrets (SonarrSecrets): Sonarr instance host and secrets information.
+
+    Returns:
+        Capabilities, or `None` if not available
+    """
+
+    return _registry.find(secrets.version)
+
+
+def set_capabilities_registry(path: Optional[Union[str, os.PathLike]]) -> None:
+    """
+    Set the file used to persist the capability registry, discarding any loaded capabilities.
+
+    Args:
+        path (Optional[Union[str, os.PathLike]]): Registry file path, or `None`
+            to keep capabilities in memory only.
+    """
+
+    global _registry  # noqa: PLW0603
+
+    _registry = SonarrCapabilitiesRegistry(path)
@@ -0,0 +1,334 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin API request record/replay cassettes.
+
+In record mode, every request sent through the API module and the response received
+are saved to a gzip-compressed JSON cassette file.
+In replay mode, responses are served from the cassette instead of the network,
+allowing Buildarr runs against a Sonarr instance to be repeated offline, deterministically.
+
+Interactions are keyed by HTTP method, URL and a hash of the canonicalised request body,
+so requests with semantically identical JSON bodies match regardless of key order.
+When the same request is sent more than once (e.g. reading a resource before and after
+updating it), the recorded responses are replayed in order.
+
+Cassettes contain credentials: the API key of each instance (e.g. in the `initialize.js`
+response and the general settings), and any passwords and API keys set on resources
+such as download clients and indexers. They are saved with permissions only allowing
+the current user to read them, and should not be shared. Credentials are not removed
+from cassettes, as the request bodies sent when replaying must match the recorded ones.
+"""
+
+from __future__ import annotations
+
+import atexit
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List
+
+import requests
+
+from requests.structures import CaseInsensitiveDict
+from urllib3.response import HTTPResponse
+
+from .exceptions import SonarrCassetteError
+
+if TYPE_CHECKING:
+    from typing import Any, Literal, Optional, Union
+
+    CassetteMode = Literal["record", "replay"]
+
+
+logger = getLogger(__name__)
+
+
+CASSETTE_VERSION = 1
+CASSETTE_MODES = ("record", "replay")
+
+IGNORED_HEADERS = frozenset(("content-encoding", "content-length", "transfer-encoding", "date"))
+"""
+Response headers not saved to cassettes.
+
+Response bodies are saved decoded, so the encoding headers of the original response
+no longer apply.
+"""
+
+
+def get_body_hash(body: Optional[Union[bytes, str]]) -> str:
+    """
+    Get a hash of a request body that is stable regardless of JSON object key order
+    and whitespace.
+
+    Args:
+        body (Optional[Union[bytes, str]]): Request body, if any.
+
+    Returns:
+        Request body hash, or `-` if there is no body
+    """
+
+    if not body:
+        return "-"
+    data = body.encode("utf-8") if isinstance(body, str) else body
+    try:
+        data = json.dumps(
+            json.loads(data),
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+        ).encode("utf-8")
+    except ValueError:
+        pass
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class SonarrCassette:
+    """
+    Sonarr API request record/replay cassette.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike], mode: CassetteMode) -> None:
+        if mode not in CASSETTE_MODES:
+            raise SonarrCassetteError(
+                f"Invalid cassette mode '{mode}' (supported modes: {', '.join(CASSETTE_MODES)})",
+            )
+        self.path = Path(path)
+        self.mode = mode
+        self.interactions: Dict[str, List[Dict[str, Any]]] = {}
+        self._replay_counts: Dict[str, int] = {}
+        self._modified = False
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self.load()
+
+    @property
+    def replaying(self) -> bool:
+        """
+        Whether or not the cassette is serving responses (as opposed to recording them).
+        """
+        return self.mode == "replay"
+
+    @staticmethod
+    def get_key(method: str, url: str, body: Optional[Union[bytes, str]]) -> str:
+        """
+        Get the cassette key for a request.
+
+        Args:
+            method (str): HTTP method of the request.
+            url (str): Request URL.
+            body (Optional[Union[bytes, str]]): Request body, if any.
+
+        Returns:
+            Cassette key
+        """
+        return f"{method} {url} {get_body_hash(body)}"
+
+    def load(self) -> None:
+        """
+        Load the recorded interactions from the cassette file.
+
+        Raises:
+            SonarrCassetteError: If the cassette file could not be read.
+        """
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                cassette = json.load(f)
+        except (OSError, ValueError) as err:
+            raise SonarrCassetteError(
+                f"Unable to load API cassette '{self.path}': {err}",
+            ) from None
+        if cassette.get("version") != CASSETTE_VERSION:
+            raise SonarrCassetteError(
+                f"Unsupported API cassette version in '{self.path}': {cassette.get('version')}",
+            )
+        with self._lock:
+            self.interactions = cassette["interactions"]
+            self._replay_counts = {}
+        logger.debug("Loaded API cassette '%s'", self.path)
+
+    def save(self) -> None:
+        """
+        Save the recorded interactions to the cassette file, if any were added.
+        """
+        with self._lock:
+            if not self._modified:
+                return
+            data = json.dumps(
+                {"version": CASSETTE_VERSION, "interactions": self.interactions},
+                separators=(",", ":"),
+            )
+            self._modified = False
+        # Create the cassette file with permissions only allowing the current user
+        # to read it, as it contains the API keys of the recorded instances.
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f".{self.path.name}.tmp")
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            temp_path.chmod(0o600)
+            with gzip.open(f, "wb") as gzip_file:
+                gzip_file.write(data.encode("utf-8"))
+        temp_path.replace(self.path)
+        logger.debug("Saved API cassette '%s'", self.path)
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        body: Optional[Union[bytes, str]],
+        res: requests.Response,
+    ) -> None:
+        """
+        Record a request and its response.
+
+        The response body is read in full, including for streamed responses.
+
+        Args:
+            method (str): HTTP method of the request.
+            url (str): Request URL.
+            body (Optional[Union[bytes, str]]): Request body, if any.
+            res (requests.Response): Received response.
+        """
+        interaction = {
+            "status": res.status_code,
+            "headers": {
+                name: value
+                for name, value in res.headers.items()
+                if name.lower() not in IGNORED_HEADERS
+            },
+            "body": res.content.decode("utf-8", errors="surrogateescape"),
+        }
+        with self._lock:
+            self.interactions.setdefault(self.get_key(method, url, body), []).append(interaction)
+            self._modified = True
+
+    def replay(
+        self,
+        method: str,
+        url: str,
+        body: Optional[Union[bytes, str]],
+        stream: bool = False,
+    ) -> requests.Response:
+        """
+        Get the recorded response to a request.
+
+        Args:
+            method (str): HTTP method of the request.
+            url (str): Request URL.
+            body (Optional[Union[bytes, str]]): Request body, if any.
+            stream (bool, optional): Whether to leave the response body unread.
+
+        Raises:
+            SonarrCassetteError: If there is no recorded response for the request.
+
+        Returns:
+            Recorded response
+        """
+        key = self.get_key(method, url, body)
+        with self._lock:
+            try:
+                interactions = self.interactions[key]
+            except KeyError:
+                raise SonarrCassetteError(
+                    f"No response recorded for '{method} {url}' in API cassette '{self.path}'",
+                ) from None
+            # Serve responses in the order they were recorded,
+            # repeating the last one once all of them have been served.
+            index = self._replay_counts.get(key, 0)
+            self._replay_counts[key] = index + 1
+            interaction = interactions[min(index, len(interactions) - 1)]
+        content = interaction["body"].encode("utf-8", errors="surrogateescape")
+        res = requests.Response()
+        res.status_code = interaction["status"]
+        res.headers = CaseInsensitiveDict(interaction["headers"])
+        res.url = url
+        res.encoding = requests.utils.get_encoding_from_headers(res.headers)
+        res.raw = HTTPResponse(
+            body=io.BytesIO(content),
+            headers=interaction["headers"],
+            status=interaction["status"],
+            preload_content=False,
+            decode_content=False,
+        )
+        res.request = requests.Request(method, url, data=body).prepare()
+        if not stream:
+            res.content  # noqa: B018
+        return res
+
+
+_cassette: Optional[SonarrCassette] = None
+
+
+def get_cassette() -> Optional[SonarrCassette]:
+    """
+    Get the active API cassette.
+
+    Returns:
+        Active cassette, or `None` if requests are not being recorded or replayed
+    """
+
+    return _cassette
+
+
+def use_cassette(path: Union[str, os.PathLike], mode: CassetteMode) -> SonarrCassette:
+    """
+    Record or replay all Sonarr API requests using the given cassette file.
+
+    Any previously active cassette is saved and ejected.
+
+    Args:
+        path (Union[str, os.PathLike]): Cassette file path.
+        mode (CassetteMode): `record` to record requests, `replay` to serve them.
+
+    Returns:
+        Active cassette
+    """
+
+    global _cassette  # noqa: PLW0603
+
+    eject_cassette()
+    _cassette = SonarrCassette(path, mode)
+    logger.info("Using API cassette '%s' (mode: %s)", path, mode)
+    return _cassette
+
+
+def save_cassette() -> None:
+    """
+    Save the requests recorded so far to the active cassette, if recording.
+    """
+
+    cassette = _cassette
+    if cassette is not None and not cassette.replaying:
+        cassette.save()
+
+
+def eject_cassette() -> None:
+    """
+    Save and deactivate the active cassette, if any.
+    """
+
+    global _cassette  # noqa: PLW0603
+
+    save_cassette()
+    _cassette = None
+
+
+atexit.register(eject_cassette)
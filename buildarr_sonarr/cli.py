@@ -19,18 +19,31 @@ Sonarr plugin CLI commands.
 from __future__ import annotations
 
 import functools
+import signal
 
 from getpass import getpass
-from typing import TYPE_CHECKING
+from pathlib import Path
+from typing import TYPE_CHECKING, Tuple
 from urllib.parse import urlparse
 
 import click
 
+from buildarr.config import load_config
+
+from .api import apply_plan, close_sessions
 from .config import SonarrInstanceConfig
+from .core import reset_state, run_buildarr
+from .fleet import DEFAULT_FLEET_WORKERS, format_summary, run_fleet
 from .manager import SonarrManager
+from .plan import load_plans
+from .profiler import disable_profiling, enable_profiling, get_profiler, write_profile
 from .secrets import SonarrSecrets
+from .secrets_cache import configure_secrets_cache, get_secrets_cache
+from .sync_state import set_full_sync
+from .watch import DEFAULT_MAX_INTERVAL, DEFAULT_MIN_INTERVAL, SonarrWatcher
 
 if TYPE_CHECKING:
+    from typing import Optional
     from urllib.parse import ParseResult as Url
 
 HOSTNAME_PORT_TUPLE_LENGTH = 2
@@ -63,21 +76,27 @@ def sonarr():
     ),
     help="API key of the Sonarr instance. The user will be prompted if undefined.",
 )
-def dump_config(url: Url, api_key: str) -> int:
+@click.option(
+    "--profile",
+    "profile_file",
+    metavar="PROFILE-FILE",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help=(
+        "Profile the run, writing a speedscope-compatible profile to the given file, "
+        "and a table of the time spent in each section and definition to standard error."
+    ),
+)
+def dump_config(url: Url, api_key: str, profile_file: Optional[Path]) -> int:
     """
     Dump configuration from a remote Sonarr instance.
     The configuration is dumped to standard output in Buildarr-compatible YAML format.
     """
 
-    protocol = url.scheme
-    hostname_port = url.netloc.split(":", 1)
-    hostname = hostname_port[0]
-    port = (
-        int(hostname_port[1])
-        if len(hostname_port) == HOSTNAME_PORT_TUPLE_LENGTH
-        else (443 if protocol == "https" else 80)
-    )
-    url_base = url.path
+    if profile_file:
+        enable_profiling(profile_file)
+
+    protocol, hostname, port, url_base = _parse_url(url)
 
     instance_config = SonarrInstanceConfig(
         hostname=hostname,
@@ -104,4 +123,232 @@ def dump_config(url: Url, api_key: str) -> int:
         nl=False,
     )
 
+    close_sessions()
+    if profile_file:
+        _write_profile()
+
+    return 0
+
+
+@sonarr.command(
+    "apply-plan",
+    help=(
+        "Apply change plans to remote Sonarr instances.\n\n"
+        "Change plans are created by running Buildarr with the "
+        "BUILDARR_SONARR_PLAN_FILE environment variable set. "
+        "Plans are rejected if the instance configuration has changed since they were created."
+    ),
+)
+@click.argument(
+    "plan_file",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "-k",
+    "--api-key",
+    "api_key",
+    metavar="API-KEY",
+    default=None,
+    help="API key of the Sonarr instances. Auto-fetched from each instance if undefined.",
+)
+@click.option(
+    "--force",
+    "force",
+    is_flag=True,
+    default=False,
+    help="Apply the plans even if the instance configuration has changed since they were created.",
+)
+def apply_plan_file(plan_file: Path, api_key: Optional[str], force: bool) -> int:
+    """
+    Apply change plans to remote Sonarr instances.
+    """
+
+    try:
+        for plan in load_plans(plan_file):
+            if not plan.writes:
+                click.echo(f"{plan.host_url}: no changes")
+                continue
+            protocol, hostname, port, url_base = _parse_url(urlparse(plan.host_url))
+            secrets = SonarrSecrets.get_from_url(
+                hostname=hostname,
+                port=port,
+                protocol=protocol,
+                url_base=url_base,
+                api_key=api_key,
+            )
+            num_writes = apply_plan(secrets, plan, verify=not force)
+            click.echo(f"{plan.host_url}: applied {num_writes} changes")
+    finally:
+        close_sessions()
+
+    return 0
+
+
+@sonarr.command(
+    help=(
+        "Watch Sonarr instances for configuration drift, and re-sync drifted sections.\n\n"
+        "Buildarr is run repeatedly using the given configuration file, "
+        "with incremental sync enabled, so that only settings sections that have changed "
+        "locally or on the instance are updated. Each instance is polled on its own "
+        "interval, which backs off while the instance is unchanged."
+    ),
+)
+@click.argument(
+    "config_path",
+    metavar="[CONFIG-PATH]",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=Path.cwd() / "buildarr.yml",
+)
+@click.option(
+    "--min-interval",
+    "min_interval",
+    metavar="SECONDS",
+    type=click.FloatRange(min=1),
+    default=DEFAULT_MIN_INTERVAL,
+    show_default=True,
+    help="Polling interval for instances that have recently drifted.",
+)
+@click.option(
+    "--max-interval",
+    "max_interval",
+    metavar="SECONDS",
+    type=click.FloatRange(min=1),
+    default=DEFAULT_MAX_INTERVAL,
+    show_default=True,
+    help="Maximum polling interval for instances that are unchanged.",
+)
+@click.option(
+    "--full",
+    "full",
+    is_flag=True,
+    default=False,
+    help=(
+        "Update all settings sections in full on the first cycle, "
+        "ignoring the incremental sync state saved by previous runs."
+    ),
+)
+def watch(config_path: Path, min_interval: float, max_interval: float, full: bool) -> int:
+    """
+    Watch Sonarr instances for configuration drift, and re-sync drifted sections.
+    """
+
+    # Keep instance secrets between cycles, if they are not already cached.
+    if get_secrets_cache() is None:
+        configure_secrets_cache(ttl=max_interval * 2)
+
+    def _run() -> None:
+        # Reload the configuration every cycle, so that local changes are picked up.
+        try:
+            run_buildarr(config_path.resolve(), use_plugins={"sonarr"})
+        finally:
+            reset_state()
+            # Only the first cycle is forced to update all sections in full.
+            set_full_sync(False)
+
+    if full:
+        set_full_sync(True)
+    watcher = SonarrWatcher(_run, min_interval=min_interval, max_interval=max_interval)
+    signal.signal(signal.SIGTERM, lambda signalnum, frame: watcher.stop())
+    try:
+        watcher.start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_sessions()
+
     return 0
+
+
+@sonarr.command(
+    help=(
+        "Update all Sonarr instances concurrently, and exit.\n\n"
+        "Instances that are not linked to each other are updated at the same time, "
+        "using a bounded number of workers. A summary of the instances that were changed, "
+        "unchanged or failed is output at the end of the run.\n\n"
+        "If CONFIG-PATH is not defined, use `buildarr.yml' from the current directory."
+    ),
+)
+@click.argument(
+    "config_path",
+    metavar="[CONFIG-PATH]",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=Path.cwd() / "buildarr.yml",
+)
+@click.option(
+    "-w",
+    "--workers",
+    "workers",
+    metavar="WORKERS",
+    type=click.IntRange(min=1),
+    default=DEFAULT_FLEET_WORKERS,
+    show_default=True,
+    help="Maximum number of instances to update at the same time.",
+)
+@click.option(
+    "--profile",
+    "profile_file",
+    metavar="PROFILE-FILE",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help=(
+        "Profile the run, writing a speedscope-compatible profile to the given file, "
+        "and a table of the time spent in each section and definition to standard error."
+    ),
+)
+@click.option(
+    "--full",
+    "full",
+    is_flag=True,
+    default=False,
+    help=(
+        "Update all settings sections in full, "
+        "ignoring the incremental sync state saved by previous runs."
+    ),
+)
+def fleet(config_path: Path, workers: int, profile_file: Optional[Path], full: bool) -> int:
+    """
+    Update all Sonarr instances concurrently, and exit.
+    """
+
+    if profile_file:
+        enable_profiling(profile_file)
+    if full:
+        set_full_sync(True)
+
+    try:
+        load_config(config_path.resolve(), use_plugins={"sonarr"})
+        results = run_fleet(max_workers=workers)
+    finally:
+        if full:
+            set_full_sync(False)
+        close_sessions()
+        if profile_file:
+            _write_profile()
+
+    click.echo(format_summary(results))
+    if any(result.status == "failed" for result in results.values()):
+        raise click.exceptions.Exit(1)
+
+    return 0
+
+
+def _write_profile() -> None:
+    # Write the profile of an ad-hoc command run, and output the profiling statistics table.
+    profiler = get_profiler()
+    if profiler is not None:
+        write_profile()
+        click.echo(profiler.to_table(), err=True)
+    disable_profiling()
+
+
+def _parse_url(url: Url) -> Tuple[str, str, int, str]:
+    # Get the protocol, hostname, port and URL base of a Sonarr instance URL.
+    protocol = url.scheme
+    hostname_port = url.netloc.split(":", 1)
+    hostname = hostname_port[0]
+    port = (
+        int(hostname_port[1])
+        if len(hostname_port) == HOSTNAME_PORT_TUPLE_LENGTH
+        else (443 if protocol == "https" else 80)
+    )
+    return (protocol, hostname, port, url.path)
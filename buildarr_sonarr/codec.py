@@ -0,0 +1,188 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin JSON codec functions.
+
+Request and response bodies are encoded and decoded through a configurable codec.
+If `orjson` is installed it is used by default, as it is significantly faster
+than the standard library `json` module. Otherwise, the standard library is used.
+"""
+
+from __future__ import annotations
+
+import json
+
+from logging import getLogger
+from typing import TYPE_CHECKING, Dict, Type
+
+from .exceptions import SonarrError
+
+if TYPE_CHECKING:
+    from typing import Any, Union
+
+
+logger = getLogger(__name__)
+
+
+class JSONCodec:
+    """
+    JSON codec using the Python standard library.
+
+    Also serves as the base class for other codecs.
+    """
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        """
+        Encode an object to UTF-8 JSON.
+
+        Args:
+            obj (Any): JSON-serialisable object.
+
+        Returns:
+            Encoded JSON
+        """
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """
+        Decode a JSON document.
+
+        Args:
+            data (Union[bytes, str]): Encoded JSON.
+
+        Raises:
+            ValueError: If the document is not valid JSON.
+
+        Returns:
+            Decoded object
+        """
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    JSON codec using `orjson`.
+
+    Falls back to the standard library for the rare objects `orjson` does not support
+    (e.g. non-string dictionary keys, or integers larger than 64 bits).
+    """
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson  # type: ignore[import-not-found]
+
+        self._orjson = orjson
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            return self._orjson.dumps(obj)
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        try:
+            return self._orjson.loads(data)
+        except self._orjson.JSONDecodeError:
+            # Re-parse with the standard library, which will either succeed
+            # on documents orjson is stricter about, or raise the standard error.
+            return super().loads(data)
+
+
+CODECS: Dict[str, Type[JSONCodec]] = {
+    JSONCodec.name: JSONCodec,
+    OrjsonCodec.name: OrjsonCodec,
+}
+
+
+def _get_default_codec() -> JSONCodec:
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return JSONCodec()
+
+
+def get_codec(name: str) -> JSONCodec:
+    """
+    Create a JSON codec by name.
+
+    Args:
+        name (str): Codec name (`json` or `orjson`).
+
+    Raises:
+        SonarrError: If the codec does not exist or is unavailable.
+
+    Returns:
+        JSON codec object
+    """
+
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise SonarrError(
+            f"Invalid JSON codec '{name}' (supported codecs: {', '.join(CODECS.keys())})",
+        ) from None
+    except ImportError as err:
+        raise SonarrError(f"JSON codec '{name}' is not available: {err}") from None
+
+
+def set_codec(name: str) -> None:
+    """
+    Set the JSON codec used to encode and decode Sonarr API requests and responses.
+
+    Args:
+        name (str): Codec name (`json` or `orjson`).
+    """
+
+    global _codec  # noqa: PLW0603
+
+    _codec = get_codec(name)
+    logger.debug("Using JSON codec '%s'", _codec.name)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    Encode an object to UTF-8 JSON using the active codec.
+
+    Args:
+        obj (Any): JSON-serialisable object.
+
+    Returns:
+        Encoded JSON
+    """
+
+    return _codec.dumps(obj)
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """
+    Decode a JSON document using the active codec.
+
+    Args:
+        data (Union[bytes, str]): Encoded JSON.
+
+    Raises:
+        ValueError: If the document is not valid JSON.
+
+    Returns:
+        Decoded object
+    """
+
+    return _codec.loads(data)
+
+
+_codec = _get_default_codec()
@@ -18,12 +18,15 @@ Sonarr plugin configuration.
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
 from buildarr.config import ConfigPlugin
-from buildarr.types import NonEmptyStr, Port
+from buildarr.types import LocalPath, NonEmptyStr, Port
 from typing_extensions import Self
 
+from ..api import api_section, record_section_checkpoint
+from ..scheduler import reverse_dependencies, run_graph
+from ..sync_state import get_section_sync
 from ..types import SonarrApiKey, SonarrProtocol
 from .connect import SonarrConnectSettingsConfig
 from .download_clients import SonarrDownloadClientsSettingsConfig
@@ -39,9 +42,90 @@ from .types import SonarrConfigBase
 from .ui import SonarrUISettingsConfig
 
 if TYPE_CHECKING:
+    from typing import Callable
+
     from ..secrets import SonarrSecrets
 
 
+SECTION_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    # Tags must be created before everything else.
+    "tags": (),
+    "quality": ("tags",),
+    "download_clients": ("tags",),
+    # Download clients must be created before indexers.
+    "indexers": ("tags", "download_clients"),
+    "media_management": ("tags",),
+    # Qualities must be updated before quality profiles,
+    # and indexers must be created before release profiles.
+    "profiles": ("tags", "quality", "indexers"),
+    # Quality and language profiles, and root folders,
+    # must be created before import lists.
+    "import_lists": ("tags", "profiles", "media_management"),
+    "connect": ("tags",),
+    "metadata": ("tags",),
+    "general": ("tags",),
+    "ui": ("tags",),
+}
+"""
+Settings sections that must be updated before each section.
+"""
+
+SECTION_UPDATE_ORDER = (
+    "tags",
+    "quality",
+    "download_clients",
+    "indexers",
+    "media_management",
+    "profiles",
+    "import_lists",
+    "connect",
+    "metadata",
+    "general",
+    "ui",
+)
+"""
+Order to start settings section updates in, when more than one section is ready to run.
+"""
+
+SECTION_DELETE_ORDER = (
+    "profiles",
+    "indexers",
+    "download_clients",
+    "media_management",
+    "import_lists",
+    "connect",
+    "tags",
+    "quality",
+    "metadata",
+    "general",
+    "ui",
+)
+"""
+Order to start settings section deletions in, when more than one section is ready to run.
+"""
+
+DEFAULT_SECTION_MAX_WORKERS = 4
+
+_section_max_workers = DEFAULT_SECTION_MAX_WORKERS
+
+
+def set_section_max_workers(max_workers: int) -> None:
+    """
+    Set the maximum number of settings sections to update on an instance at the same time.
+
+    Args:
+        max_workers (int): Maximum number of concurrent section updates.
+            Set to `1` to update sections one at a time.
+    """
+
+    global _section_max_workers  # noqa: PLW0603
+
+    if max_workers < 1:
+        raise ValueError(f"Invalid section max workers (must be at least 1): {max_workers}")
+
+    _section_max_workers = max_workers
+
+
 class SonarrSettingsConfig(SonarrConfigBase):
     """
     Sonarr settings, used to configure a remote Sonarr instance.
@@ -59,6 +143,35 @@ class SonarrSettingsConfig(SonarrConfigBase):
     general: SonarrGeneralSettingsConfig = SonarrGeneralSettingsConfig()
     ui: SonarrUISettingsConfig = SonarrUISettingsConfig()
 
+    @classmethod
+    def from_remote(cls, secrets: SonarrSecrets) -> Self:
+        # Overload base function to attribute API requests to each section.
+        # Sections do not depend on each other when being read,
+        # so they are fetched and decoded concurrently.
+        # Sections skipped by incremental sync, or already updated in an interrupted run,
+        # are not read, and their local configuration is used as the remote configuration instead.
+        section_sync = get_section_sync(secrets.host_url)
+
+        def _from_remote(section_name: str) -> Callable[[], Any]:
+            def _read_section() -> Any:
+                if section_sync is not None and section_name in section_sync.skipped:
+                    return section_sync.skipped[section_name]
+                if section_sync is not None and section_name in section_sync.resumed:
+                    return section_sync.resumed[section_name]
+                section_type = cls.model_fields[section_name].annotation
+                with api_section(f"sonarr.settings.{section_name}"):
+                    return section_type.from_remote(secrets)  # type: ignore[union-attr]
+
+            return _read_section
+
+        sections = run_graph(
+            {section_name: _from_remote(section_name) for section_name in cls.model_fields},
+            {},
+            max_workers=_section_max_workers,
+            thread_name_prefix="buildarr-sonarr-read",
+        )
+        return cls(**{section_name: sections[section_name] for section_name in cls.model_fields})
+
     def update_remote(
         self,
         tree: str,
@@ -66,113 +179,69 @@ class SonarrSettingsConfig(SonarrConfigBase):
         remote: Self,
         check_unmanaged: bool = False,
     ) -> bool:
-        # Overload base function to guarantee execution order of section updates.
-        # 1. Tags must be created before everything else.
-        # 2. Qualities must be updated before quality profiles.
-        # 3. Download clients must be created before indexers.
-        # 4. Indexers must be created before release profiles.
-        return any(
-            [
-                self.tags.update_remote(
-                    f"{tree}.tags",
-                    secrets,
-                    remote.tags,
-                    check_unmanaged=check_unmanaged,
-                ),
-                self.quality.update_remote(
-                    f"{tree}.quality",
-                    secrets,
-                    remote.quality,
-                    check_unmanaged=check_unmanaged,
-                ),
-                self.download_clients.update_remote(
-                    f"{tree}.download_clients",
-                    secrets,
-                    remote.download_clients,
-                    check_unmanaged=check_unmanaged,
-                ),
-                self.indexers.update_remote(
-                    f"{tree}.indexers",
-                    secrets,
-                    remote.indexers,
-                    check_unmanaged=check_unmanaged,
-                ),
-                self.media_management.update_remote(
-                    f"{tree}.media_management",
-                    secrets,
-                    remote.media_management,
-                    check_unmanaged=check_unmanaged,
-                ),
-                self.profiles.update_remote(
-                    f"{tree}.profiles",
-                    secrets,
-                    remote.profiles,
-                    check_unmanaged=check_unmanaged,
-                ),
-                self.import_lists.update_remote(
-                    f"{tree}.import_lists",
-                    secrets,
-                    remote.import_lists,
-                    check_unmanaged=check_unmanaged,
-                ),
-                self.connect.update_remote(
-                    f"{tree}.connect",
-                    secrets,
-                    remote.connect,
-                    check_unmanaged=check_unmanaged,
-                ),
-                self.metadata.update_remote(
-                    f"{tree}.metadata",
-                    secrets,
-                    remote.metadata,
-                    check_unmanaged=check_unmanaged,
-                ),
-                self.general.update_remote(
-                    f"{tree}.general",
-                    secrets,
-                    remote.general,
-                    check_unmanaged=check_unmanaged,
-                ),
-                self.ui.update_remote(
-                    f"{tree}.ui",
-                    secrets,
-                    remote.ui,
-                    check_unmanaged=check_unmanaged,
-                ),
-            ],
+        # Overload base function to guarantee execution order of section updates,
+        # as defined in `SECTION_DEPENDENCIES`.
+        # Sections that do not depend on each other are updated concurrently.
+        section_sync = get_section_sync(secrets.host_url)
+
+        def _update_remote(section_name: str) -> Callable[[], bool]:
+            def _update_section() -> bool:
+                if section_sync is not None and (
+                    section_name in section_sync.skipped or section_name in section_sync.resumed
+                ):
+                    return False
+                section_tree = f"{tree}.{section_name}"
+                with api_section(section_tree):
+                    changed = getattr(self, section_name).update_remote(
+                        section_tree,
+                        secrets,
+                        getattr(remote, section_name),
+                        check_unmanaged=check_unmanaged,
+                    )
+                    record_section_checkpoint(secrets, section_name, getattr(self, section_name))
+                return changed
+
+            return _update_section
+
+        changed = run_graph(
+            {section_name: _update_remote(section_name) for section_name in SECTION_UPDATE_ORDER},
+            SECTION_DEPENDENCIES,
+            max_workers=_section_max_workers,
+            thread_name_prefix="buildarr-sonarr-update",
         )
+        if section_sync is not None:
+            section_sync.record_changed(changed)
+        return any(changed.values())
 
     def delete_remote(self, tree: str, secrets: SonarrSecrets, remote: Self) -> bool:
         # Overload base function to guarantee execution order of section deletions.
-        # 1. Release profiles must be deleted before indexers.
-        # 2. Indexers must be deleted before download clients.
-        return any(
-            [
-                self.profiles.delete_remote(f"{tree}.profiles", secrets, remote.profiles),
-                self.indexers.delete_remote(f"{tree}.indexers", secrets, remote.indexers),
-                self.download_clients.delete_remote(
-                    f"{tree}.download_clients",
-                    secrets,
-                    remote.download_clients,
-                ),
-                self.media_management.delete_remote(
-                    f"{tree}.media_management",
-                    secrets,
-                    remote.media_management,
-                ),
-                self.import_lists.delete_remote(
-                    f"{tree}.import_lists",
-                    secrets,
-                    remote.import_lists,
-                ),
-                self.connect.delete_remote(f"{tree}.connect", secrets, remote.connect),
-                self.tags.delete_remote(f"{tree}.tags", secrets, remote.tags),
-                self.quality.delete_remote(f"{tree}.quality", secrets, remote.quality),
-                self.metadata.delete_remote(f"{tree}.metadata", secrets, remote.metadata),
-                self.general.delete_remote(f"{tree}.general", secrets, remote.general),
-                self.ui.delete_remote(f"{tree}.ui", secrets, remote.ui),
-            ],
+        # Resources must be deleted before the resources they depend on,
+        # so the section dependencies are reversed.
+        section_sync = get_section_sync(secrets.host_url)
+
+        def _delete_remote(section_name: str) -> Callable[[], bool]:
+            def _delete_section() -> bool:
+                if section_sync is not None and section_name in section_sync.skipped:
+                    return False
+                section_tree = f"{tree}.{section_name}"
+                with api_section(section_tree):
+                    return getattr(self, section_name).delete_remote(
+                        section_tree,
+                        secrets,
+                        getattr(remote, section_name),
+                    )
+
+            return _delete_section
+
+        changed = run_graph(
+            {section_name: _delete_remote(section_name) for section_name in SECTION_DELETE_ORDER},
+            reverse_dependencies(SECTION_DEPENDENCIES),
+            max_workers=_section_max_workers,
+            thread_name_prefix="buildarr-sonarr-delete",
         )
+        if section_sync is not None:
+            section_sync.record_changed(changed)
+        return any(changed.values())
 
 
 class SonarrInstanceConfig(ConfigPlugin["SonarrSecrets"]):
@@ -253,6 +322,27 @@ class SonarrInstanceConfig(ConfigPlugin["SonarrSecrets"]):
     This can only be done on Sonarr instances with authentication disabled.
     """
 
+    config_xml: Optional[LocalPath] = None
+    """
+    Path to the Sonarr instance configuration file (`config.xml`), if Buildarr
+    has local access to it (e.g. through a volume shared with the Sonarr container).
+
+    When defined, the API key, port and URL base are read from this file,
+    unless they are explicitly set in the Buildarr configuration.
+    Unlike retrieving the API key from the instance, this works
+    with authentication enabled.
+
+    If the file cannot be read, the API key is retrieved from the instance instead.
+
+    ```yaml
+    sonarr:
+      hostname: "localhost"
+      config_xml: "/path/to/sonarr/config.xml"
+    ```
+
+    *New in version 0.7.0.*
+    """
+
     image: NonEmptyStr = "lscr.io/linuxserver/sonarr"
     """
     The default Docker image URI when generating a Docker Compose file.
@@ -27,9 +27,9 @@ from buildarr.types import BaseEnum, NonEmptyStr, Password, Port
 from pydantic import AnyHttpUrl, EmailStr, Field, NonNegativeInt
 from typing_extensions import Annotated, Self
 
-from ..api import api_delete, api_get, api_post, api_put
+from ..api import api_delete, api_get, api_get_ids, api_post, api_put
 from ..secrets import SonarrSecrets
-from .types import SonarrConfigBase
+from .types import SonarrConfigBase, definition_method, get_remote_ids
 from .util import trakt_expires_encoder
 
 logger = getLogger(__name__)
@@ -299,8 +299,9 @@ class Connection(SonarrConfigBase):
                 remote_map=cls._get_base_remote_map(tag_ids) + cls._remote_map,
                 remote_attrs=remote_attrs,
             ),
-        )
+        )._with_remote_attrs(remote_attrs)
 
+    @definition_method
     def _create_remote(
         self,
         tree: str,
@@ -327,6 +328,7 @@ class Connection(SonarrConfigBase):
             },
         )
 
+    @definition_method
     def _update_remote(
         self,
         tree: str,
@@ -368,6 +370,7 @@ class Connection(SonarrConfigBase):
             return True
         return False
 
+    @definition_method
     def _delete_remote(
         self,
         tree: str,
@@ -1763,7 +1766,7 @@ class SonarrConnectSettingsConfig(SonarrConfigBase):
     def from_remote(cls, secrets: SonarrSecrets) -> Self:
         connections = api_get(secrets, "/api/v3/notification")
         tag_ids: Dict[str, int] = (
-            {tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")}
+            api_get_ids(secrets, "/api/v3/tag", key="label")
             if any(connection["tags"] for connection in connections)
             else {}
         )
@@ -1787,12 +1790,11 @@ class SonarrConnectSettingsConfig(SonarrConfigBase):
         check_unmanaged: bool = False,
     ) -> bool:
         changed = False
-        connection_ids: Dict[str, int] = {
-            connection_json["name"]: connection_json["id"]
-            for connection_json in api_get(secrets, "/api/v3/notification")
-        }
+        connection_ids: Dict[str, int] = get_remote_ids(
+            secrets, "/api/v3/notification", remote.definitions
+        )
         tag_ids: Dict[str, int] = (
-            {tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")}
+            api_get_ids(secrets, "/api/v3/tag", key="label")
             if any(connection.tags for connection in self.definitions.values())
             or any(connection.tags for connection in remote.definitions.values())
             else {}
@@ -1820,12 +1822,11 @@ class SonarrConnectSettingsConfig(SonarrConfigBase):
 
     def delete_remote(self, tree: str, secrets: SonarrSecrets, remote: Self) -> bool:
         changed = False
-        connection_ids: Dict[str, int] = {
-            connection_json["name"]: connection_json["id"]
-            for connection_json in api_get(secrets, "/api/v3/notification")
-        }
+        connection_ids: Dict[str, int] = get_remote_ids(
+            secrets, "/api/v3/notification", remote.definitions
+        )
         tag_ids: Dict[str, int] = (
-            {tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")}
+            api_get_ids(secrets, "/api/v3/tag", key="label")
             if any(connection.tags for connection in self.definitions.values())
             or any(connection.tags for connection in remote.definitions.values())
             else {}
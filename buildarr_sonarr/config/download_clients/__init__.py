@@ -25,9 +25,9 @@ from buildarr.config import RemoteMapEntry
 from pydantic import Field
 from typing_extensions import Annotated, Self
 
-from ...api import api_get, api_put
+from ...api import api_get, api_get_ids, api_put
 from ...secrets import SonarrSecrets
-from ..types import SonarrConfigBase
+from ..types import SonarrConfigBase, get_remote_ids
 from .download_clients import (
     DOWNLOADCLIENT_TYPE_MAP,
     Aria2DownloadClient,
@@ -146,7 +146,7 @@ class SonarrDownloadClientsSettingsConfig(SonarrConfigBase):
         downloadclient_config = api_get(secrets, "/api/v3/config/downloadclient")
         downloadclients = api_get(secrets, "/api/v3/downloadclient")
         tag_ids: Dict[str, int] = (
-            {tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")}
+            api_get_ids(secrets, "/api/v3/tag", key="label")
             if any(downloadclient["tags"] for downloadclient in downloadclients)
             else {}
         )
@@ -166,7 +166,7 @@ class SonarrDownloadClientsSettingsConfig(SonarrConfigBase):
                     secrets=secrets,
                 ),
             },
-        )
+        )._with_remote_attrs(downloadclient_config)
 
     def update_remote(
         self,
@@ -183,7 +183,7 @@ class SonarrDownloadClientsSettingsConfig(SonarrConfigBase):
             check_unmanaged=check_unmanaged,
         )
         if config_updated:
-            remote_config = api_get(secrets, "/api/v3/config/downloadclient")
+            remote_config = remote._get_remote_attrs(secrets, "/api/v3/config/downloadclient")
             api_put(
                 secrets,
                 f"/api/v3/config/downloadclient/{remote_config['id']}",
@@ -219,12 +219,13 @@ class SonarrDownloadClientsSettingsConfig(SonarrConfigBase):
         check_unmanaged: bool,
     ) -> bool:
         changed = False
-        downloadclient_ids: Dict[str, int] = {
-            downloadclient_json["name"]: downloadclient_json["id"]
-            for downloadclient_json in api_get(secrets, "/api/v3/downloadclient")
-        }
+        downloadclient_ids: Dict[str, int] = get_remote_ids(
+            secrets,
+            "/api/v3/downloadclient",
+            remote,
+        )
         tag_ids: Dict[str, int] = (
-            {tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")}
+            api_get_ids(secrets, "/api/v3/tag", key="label")
             if any(downloadclient.tags for downloadclient in local.values())
             or any(downloadclient.tags for downloadclient in remote.values())
             else {}
@@ -272,10 +273,11 @@ class SonarrDownloadClientsSettingsConfig(SonarrConfigBase):
         remote: Mapping[str, DownloadClientType],
     ) -> bool:
         changed = False
-        downloadclient_ids: Dict[str, int] = {
-            downloadclient_json["name"]: downloadclient_json["id"]
-            for downloadclient_json in api_get(secrets, "/api/v3/downloadclient")
-        }
+        downloadclient_ids: Dict[str, int] = get_remote_ids(
+            secrets,
+            "/api/v3/downloadclient",
+            remote,
+        )
         for downloadclient_name, downloadclient in remote.items():
             if downloadclient_name not in local:
                 downloadclient_tree = f"{tree}[{downloadclient_name!r}]"
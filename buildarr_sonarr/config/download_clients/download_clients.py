@@ -28,7 +28,7 @@ from typing_extensions import Self
 
 from ...api import api_delete, api_post, api_put
 from ...secrets import SonarrSecrets
-from ..types import SonarrConfigBase
+from ..types import SonarrConfigBase, definition_method
 
 logger = getLogger(__name__)
 
@@ -323,8 +323,9 @@ class DownloadClient(SonarrConfigBase):
                 cls._get_base_remote_map(tag_ids) + cls._remote_map,
                 remote_attrs,
             ),
-        )
+        )._with_remote_attrs(remote_attrs)
 
+    @definition_method
     def _create_remote(
         self,
         tree: str,
@@ -347,6 +348,7 @@ class DownloadClient(SonarrConfigBase):
             },
         )
 
+    @definition_method
     def _update_remote(
         self,
         tree: str,
@@ -29,7 +29,7 @@ from typing_extensions import Self
 from ...api import api_delete, api_get, api_post, api_put
 from ...secrets import SonarrSecrets
 from ...types import OSAgnosticPath
-from ..types import SonarrConfigBase
+from ..types import SonarrConfigBase, definition_method
 
 logger = getLogger(__name__)
 
@@ -109,8 +109,11 @@ class RemotePathMapping(SonarrConfigBase):
 
     @classmethod
     def _from_remote(cls, remote_attrs: Mapping[str, Any]) -> Self:
-        return cls(**cls.get_local_attrs(cls._remote_map, remote_attrs))
+        return cls(
+            **cls.get_local_attrs(cls._remote_map, remote_attrs),
+        )._with_remote_attrs(remote_attrs)
 
+    @definition_method
     def _create_remote(self, tree: str, secrets: SonarrSecrets) -> None:
         api_post(
             secrets,
@@ -118,6 +121,7 @@ class RemotePathMapping(SonarrConfigBase):
             self.get_create_remote_attrs(tree, self._remote_map),
         )
 
+    @definition_method
     def _update_remote(
         self,
         tree: str,
@@ -141,6 +145,7 @@ class RemotePathMapping(SonarrConfigBase):
             return True
         return False
 
+    @definition_method
     def _delete_remote(
         self,
         tree: str,
@@ -214,6 +219,29 @@ class SonarrRemotePathMappingsSettingsConfig(SonarrConfigBase):
             ),
         )
 
+    @staticmethod
+    def _get_remote_rpm_ids(
+        secrets: SonarrSecrets,
+        remote: SonarrRemotePathMappingsSettingsConfig,
+    ) -> Dict[Tuple[str, OSAgnosticPath, OSAgnosticPath], int]:
+        # Use the IDs of the API objects the remote path mappings were decoded from,
+        # fetching them from the remote instance if they are not known.
+        rpm_ids: Dict[Tuple[str, OSAgnosticPath, OSAgnosticPath], int] = {}
+        for rpm in remote.definitions:
+            if rpm._remote_attrs is None:
+                break
+            rpm_ids[(rpm.host, rpm.remote_path, rpm.local_path)] = rpm._remote_attrs["id"]
+        else:
+            return rpm_ids
+        return {
+            (
+                rpm["host"],
+                OSAgnosticPath(rpm["remotePath"]),
+                OSAgnosticPath(rpm["localPath"]),
+            ): rpm["id"]
+            for rpm in api_get(secrets, "/api/v3/remotepathmapping")
+        }
+
     def _update_remote(
         self,
         tree: str,
@@ -224,14 +252,7 @@ class SonarrRemotePathMappingsSettingsConfig(SonarrConfigBase):
         changed = False
         # Get required resource IDs from the remote, and create
         # data structures.
-        remote_rpm_ids: Dict[Tuple[str, OSAgnosticPath, OSAgnosticPath], int] = {
-            (
-                rpm["host"],
-                OSAgnosticPath(rpm["remotePath"]),
-                OSAgnosticPath(rpm["localPath"]),
-            ): rpm["id"]
-            for rpm in api_get(secrets, "/api/v3/remotepathmapping")
-        }
+        remote_rpm_ids = self._get_remote_rpm_ids(secrets, remote)
         remote_rpms: Dict[Tuple[str, OSAgnosticPath, OSAgnosticPath], RemotePathMapping] = {
             (rpm.host, rpm.remote_path, rpm.local_path): rpm for rpm in remote.definitions
         }
@@ -264,14 +285,7 @@ class SonarrRemotePathMappingsSettingsConfig(SonarrConfigBase):
 
     def _delete_remote(self, tree: str, secrets: SonarrSecrets, remote: Self) -> bool:
         changed = False
-        remote_rpm_ids: Dict[Tuple[str, OSAgnosticPath, OSAgnosticPath], int] = {
-            (
-                rpm["host"],
-                OSAgnosticPath(rpm["remotePath"]),
-                OSAgnosticPath(rpm["localPath"]),
-            ): rpm["id"]
-            for rpm in api_get(secrets, "/api/v3/remotepathmapping")
-        }
+        remote_rpm_ids = self._get_remote_rpm_ids(secrets, remote)
         local_rpms: Dict[Tuple[str, OSAgnosticPath, OSAgnosticPath], RemotePathMapping] = {
             (rpm.host, rpm.remote_path, rpm.local_path): rpm for rpm in self.definitions
         }
@@ -508,7 +508,7 @@ class SonarrGeneralSettingsConfig(SonarrConfigBase):
             analytics=AnalyticsGeneralSettings._from_remote(settings),
             updates=UpdatesGeneralSettings._from_remote(settings),
             backup=BackupGeneralSettings._from_remote(settings),
-        )
+        )._with_remote_attrs(settings)
 
     def update_remote(
         self,
@@ -570,7 +570,7 @@ class SonarrGeneralSettingsConfig(SonarrConfigBase):
                 backup_updated,
             ],
         ):
-            remote_config = api_get(secrets, "/api/v3/config/host")
+            remote_config = remote._get_remote_attrs(secrets, "/api/v3/config/host")
             api_put(
                 secrets,
                 f"/api/v3/config/host/{remote_config['id']}",
@@ -50,10 +50,10 @@ from pydantic import (
 )
 from typing_extensions import Annotated, Self
 
-from ..api import api_delete, api_get, api_post, api_put
+from ..api import api_delete, api_get, api_get_ids, api_post, api_put
 from ..secrets import SonarrSecrets
 from ..types import SonarrApiKey
-from .types import SonarrConfigBase
+from .types import SonarrConfigBase, definition_method, get_remote_ids
 from .util import trakt_expires_encoder
 
 logger = getLogger(__name__)
@@ -278,7 +278,7 @@ class ImportList(SonarrConfigBase):
                 ),
                 remote_attrs,
             ),
-        )
+        )._with_remote_attrs(remote_attrs)
 
     def _resolve(self, name: str, ignore_nonexistent_ids: bool = False) -> Self:
         """
@@ -321,6 +321,7 @@ class ImportList(SonarrConfigBase):
         """
         return self
 
+    @definition_method
     def _create_remote(
         self,
         tree: str,
@@ -363,6 +364,7 @@ class ImportList(SonarrConfigBase):
             },
         )
 
+    @definition_method
     def _update_remote(
         self,
         tree: str,
@@ -1193,17 +1195,17 @@ class SonarrImportListsSettingsConfig(SonarrConfigBase):
     def from_remote(cls, secrets: SonarrSecrets) -> Self:
         importlists = api_get(secrets, "/api/v3/importlist")
         quality_profile_ids: Dict[str, int] = (
-            {pro["name"]: pro["id"] for pro in api_get(secrets, "/api/v3/qualityprofile")}
+            api_get_ids(secrets, "/api/v3/qualityprofile")
             if any(importlist["qualityProfileId"] for importlist in importlists)
             else {}
         )
         language_profile_ids: Dict[str, int] = (
-            {pro["name"]: pro["id"] for pro in api_get(secrets, "/api/v3/languageprofile")}
+            api_get_ids(secrets, "/api/v3/languageprofile")
             if any(importlist["languageProfileId"] for importlist in importlists)
             else {}
         )
         tag_ids: Dict[str, int] = (
-            {tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")}
+            api_get_ids(secrets, "/api/v3/tag", key="label")
             if any(importlist["tags"] for importlist in importlists)
             else {}
         )
@@ -1231,19 +1233,14 @@ class SonarrImportListsSettingsConfig(SonarrConfigBase):
         # Flag for whether or not the import list configuration was updated or not.
         changed = False
         # Get required resource ID references from the remote Sonarr instance.
-        importlist_ids: Dict[str, int] = {
-            importlist_json["name"]: importlist_json["id"]
-            for importlist_json in api_get(secrets, "/api/v3/importlist")
-        }
-        quality_profile_ids: Dict[str, int] = {
-            pro["name"]: pro["id"] for pro in api_get(secrets, "/api/v3/qualityprofile")
-        }
-        language_profile_ids: Dict[str, int] = {
-            pro["name"]: pro["id"] for pro in api_get(secrets, "/api/v3/languageprofile")
-        }
-        tag_ids: Dict[str, int] = {
-            tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")
-        }
+        importlist_ids: Dict[str, int] = get_remote_ids(
+            secrets,
+            "/api/v3/importlist",
+            remote.definitions,
+        )
+        quality_profile_ids: Dict[str, int] = api_get_ids(secrets, "/api/v3/qualityprofile")
+        language_profile_ids: Dict[str, int] = api_get_ids(secrets, "/api/v3/languageprofile")
+        tag_ids: Dict[str, int] = api_get_ids(secrets, "/api/v3/tag", key="label")
         # Evaluate locally defined import lists against the currently active ones
         # on the remote instance.
         for importlist_name, importlist in self.definitions.items():
@@ -1282,10 +1279,11 @@ class SonarrImportListsSettingsConfig(SonarrConfigBase):
 
     def delete_remote(self, tree: str, secrets: SonarrSecrets, remote: Self) -> bool:
         changed = False
-        importlist_ids: Dict[str, int] = {
-            importlist_json["name"]: importlist_json["id"]
-            for importlist_json in api_get(secrets, "/api/v3/importlist")
-        }
+        importlist_ids: Dict[str, int] = get_remote_ids(
+            secrets,
+            "/api/v3/importlist",
+            remote.definitions,
+        )
         for importlist_name, importlist in remote.definitions.items():
             if importlist_name not in self.definitions:
                 importlist_tree = f"{tree}.definitions[{importlist_name!r}]"
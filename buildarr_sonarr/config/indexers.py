@@ -40,9 +40,9 @@ from buildarr.types import BaseEnum, NonEmptyStr, Password, RssUrl
 from pydantic import AnyHttpUrl, Field, NonNegativeInt, PositiveInt, field_validator
 from typing_extensions import Annotated, Self
 
-from ..api import api_delete, api_get, api_post, api_put
+from ..api import api_delete, api_get, api_get_ids, api_post, api_put
 from ..secrets import SonarrSecrets
-from .types import SonarrConfigBase
+from .types import SonarrConfigBase, definition_method, get_remote_ids
 
 logger = getLogger(__name__)
 
@@ -204,8 +204,9 @@ class Indexer(SonarrConfigBase):
                 cls._get_base_remote_map(download_client_ids, tag_ids) + cls._remote_map,
                 remote_attrs,
             ),
-        )
+        )._with_remote_attrs(remote_attrs)
 
+    @definition_method
     def _create_remote(
         self,
         tree: str,
@@ -229,6 +230,7 @@ class Indexer(SonarrConfigBase):
             },
         )
 
+    @definition_method
     def _update_remote(
         self,
         tree: str,
@@ -1111,12 +1113,12 @@ class SonarrIndexersSettingsConfig(SonarrConfigBase):
         indexer_config = api_get(secrets, "/api/v3/config/indexer")
         indexers = api_get(secrets, "/api/v3/indexer")
         download_client_ids: Dict[str, int] = (
-            {dc["name"]: dc["id"] for dc in api_get(secrets, "/api/v3/downloadclient")}
+            api_get_ids(secrets, "/api/v3/downloadclient")
             if any(indexer_metadata["downloadClientId"] for indexer_metadata in indexers)
             else {}
         )
         tag_ids: Dict[str, int] = (
-            {tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")}
+            api_get_ids(secrets, "/api/v3/tag", key="label")
             if any(indexer["tags"] for indexer in indexers)
             else {}
         )
@@ -1132,7 +1134,7 @@ class SonarrIndexersSettingsConfig(SonarrConfigBase):
                 )
                 for indexer in indexers
             },
-        )
+        )._with_remote_attrs(indexer_config)
 
     def update_remote(
         self,
@@ -1142,17 +1144,15 @@ class SonarrIndexersSettingsConfig(SonarrConfigBase):
         check_unmanaged: bool = False,
     ) -> bool:
         changed = False
-        indexer_ids: Dict[str, int] = {
-            indexer["name"]: indexer["id"] for indexer in api_get(secrets, "/api/v3/indexer")
-        }
+        indexer_ids: Dict[str, int] = get_remote_ids(secrets, "/api/v3/indexer", remote.definitions)
         download_client_ids: Dict[str, int] = (
-            {dc["name"]: dc["id"] for dc in api_get(secrets, "/api/v3/downloadclient")}
+            api_get_ids(secrets, "/api/v3/downloadclient")
             if any(indexer.download_client for indexer in self.definitions.values())
             or any(indexer.download_client for indexer in remote.definitions.values())
             else {}
         )
         tag_ids: Dict[str, int] = (
-            {tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")}
+            api_get_ids(secrets, "/api/v3/tag", key="label")
             if any(indexer.tags for indexer in self.definitions.values())
             or any(indexer.tags for indexer in remote.definitions.values())
             else {}
@@ -1164,11 +1164,8 @@ class SonarrIndexersSettingsConfig(SonarrConfigBase):
             check_unmanaged=check_unmanaged,
         )
         if config_changed:
-            api_put(
-                secrets,
-                f"/api/v3/config/indexer/{api_get(secrets, '/api/v3/config/indexer')['id']}",
-                config_remote_attrs,
-            )
+            config_id = remote._get_remote_attrs(secrets, "/api/v3/config/indexer")["id"]
+            api_put(secrets, f"/api/v3/config/indexer/{config_id}", config_remote_attrs)
             changed = True
         for indexer_name, indexer in self.definitions.items():
             indexer_tree = f"{tree}.definitions[{indexer_name!r}]"
@@ -1195,9 +1192,7 @@ class SonarrIndexersSettingsConfig(SonarrConfigBase):
 
     def delete_remote(self, tree: str, secrets: SonarrSecrets, remote: Self) -> bool:
         changed = False
-        indexer_ids: Dict[str, int] = {
-            indexer["name"]: indexer["id"] for indexer in api_get(secrets, "/api/v3/indexer")
-        }
+        indexer_ids: Dict[str, int] = get_remote_ids(secrets, "/api/v3/indexer", remote.definitions)
         for indexer_name, indexer in remote.definitions.items():
             if indexer_name not in self.definitions:
                 indexer_tree = f"{tree}.definitions[{indexer_name!r}]"
@@ -26,7 +26,7 @@ from buildarr.types import BaseEnum, NonEmptyStr
 from pydantic import Field, NonNegativeInt
 from typing_extensions import Annotated, Self
 
-from ..api import api_delete, api_get, api_post, api_put
+from ..api import api_delete, api_get, api_get_iter, api_post, api_put
 from ..secrets import SonarrSecrets
 from .types import SonarrConfigBase
 
@@ -498,22 +498,20 @@ class SonarrMediaManagementSettingsConfig(SonarrConfigBase):
 
     @classmethod
     def from_remote(cls, secrets: SonarrSecrets) -> Self:
-        return cls(
+        naming = api_get(secrets, "/api/v3/config/naming")
+        mediamanagement = api_get(secrets, "/api/v3/config/mediamanagement")
+        config = cls(
             # Episode Naming
-            **cls.get_local_attrs(
-                cls._naming_remote_map,
-                api_get(secrets, "/api/v3/config/naming"),
-            ),
+            **cls.get_local_attrs(cls._naming_remote_map, naming),
             # All other sections except Root Folders
-            **cls.get_local_attrs(
-                cls._mediamanagement_remote_map,
-                api_get(secrets, "/api/v3/config/mediamanagement"),
-            ),
+            **cls.get_local_attrs(cls._mediamanagement_remote_map, mediamanagement),
             # Root Folders
             root_folders=set(
-                cast(NonEmptyStr, rf["path"]) for rf in api_get(secrets, "/api/v3/rootfolder")
+                cast(NonEmptyStr, rf["path"])
+                for rf in api_get_iter(secrets, "/api/v3/rootfolder", fields=("path",))
             ),
-        )
+        )._with_remote_attrs(mediamanagement)
+        return config._with_remote_attrs(naming, key="naming")
 
     def update_remote(
         self,
@@ -563,7 +561,8 @@ class SonarrMediaManagementSettingsConfig(SonarrConfigBase):
             set_unchanged=True,
         )
         if updated:
-            config_id = api_get(secrets, "/api/v3/config/naming")["id"]
+            naming = remote._get_remote_attrs(secrets, "/api/v3/config/naming", key="naming")
+            config_id = naming["id"]
             api_put(
                 secrets,
                 f"/api/v3/config/naming/{config_id}",
@@ -587,7 +586,7 @@ class SonarrMediaManagementSettingsConfig(SonarrConfigBase):
             set_unchanged=True,
         )
         if updated:
-            config_id = api_get(secrets, "/api/v3/config/mediamanagement")["id"]
+            config_id = remote._get_remote_attrs(secrets, "/api/v3/config/mediamanagement")["id"]
             api_put(
                 secrets,
                 f"/api/v3/config/mediamanagement/{config_id}",
@@ -605,7 +604,8 @@ class SonarrMediaManagementSettingsConfig(SonarrConfigBase):
     ) -> bool:
         changed = False
         current_root_folders: Dict[str, int] = {
-            rf["path"]: rf["id"] for rf in api_get(secrets, "/api/v3/rootfolder")
+            rf["path"]: rf["id"]
+            for rf in api_get_iter(secrets, "/api/v3/rootfolder", fields=("id", "path"))
         }
         for i, root_folder in enumerate(self.root_folders):
             if root_folder in current_root_folders:
@@ -626,7 +626,8 @@ class SonarrMediaManagementSettingsConfig(SonarrConfigBase):
     def _delete_remote_rootfolder(self, tree: str, secrets: SonarrSecrets, remote: Self) -> bool:
         changed = False
         current_root_folders: Dict[str, int] = {
-            rf["path"]: rf["id"] for rf in api_get(secrets, "/api/v3/rootfolder")
+            rf["path"]: rf["id"]
+            for rf in api_get_iter(secrets, "/api/v3/rootfolder", fields=("id", "path"))
         }
         expected_root_folders = set(self.root_folders)
         i = -1
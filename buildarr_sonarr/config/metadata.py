@@ -25,7 +25,7 @@ from typing_extensions import Self
 
 from ..api import api_get, api_put
 from ..secrets import SonarrSecrets
-from .types import SonarrConfigBase
+from .types import SonarrConfigBase, definition_method
 
 
 class Metadata(SonarrConfigBase):
@@ -44,8 +44,11 @@ class Metadata(SonarrConfigBase):
 
     @classmethod
     def _from_remote(cls, metadata: Dict[str, Any]) -> Self:
-        return cls(**cls.get_local_attrs(cls._base_remote_map + cls._remote_map, metadata))
+        return cls(
+            **cls.get_local_attrs(cls._base_remote_map + cls._remote_map, metadata),
+        )._with_remote_attrs(metadata)
 
+    @definition_method
     def _update_remote(
         self,
         tree: str,
@@ -256,6 +259,18 @@ class SonarrMetadataSettingsConfig(SonarrConfigBase):
 
     @classmethod
     def from_remote(cls, secrets: SonarrSecrets) -> Self:
+        kodi_emby_metadata, roksbox_metadata, wdtv_metadata = cls._get_api_metadata(secrets)
+        return cls(
+            kodi_emby=KodiEmbyMetadata._from_remote(kodi_emby_metadata),
+            roksbox=RoksboxMetadata._from_remote(roksbox_metadata),
+            wdtv=WdtvMetadata._from_remote(wdtv_metadata),
+        )
+
+    @classmethod
+    def _get_api_metadata(
+        cls,
+        secrets: SonarrSecrets,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
         kodi_emby_metadata: Optional[Dict[str, Any]] = None
         roksbox_metadata: Optional[Dict[str, Any]] = None
         wdtv_metadata: Optional[Dict[str, Any]] = None
@@ -278,11 +293,7 @@ class SonarrMetadataSettingsConfig(SonarrConfigBase):
             raise RuntimeError(
                 "Unable to find WDTV metadata on Sonarr, database might be corrupt",
             )
-        return cls(
-            kodi_emby=KodiEmbyMetadata._from_remote(kodi_emby_metadata),
-            roksbox=RoksboxMetadata._from_remote(roksbox_metadata),
-            wdtv=WdtvMetadata._from_remote(wdtv_metadata),
-        )
+        return (kodi_emby_metadata, roksbox_metadata, wdtv_metadata)
 
     def update_remote(
         self,
@@ -291,28 +302,18 @@ class SonarrMetadataSettingsConfig(SonarrConfigBase):
         remote: Self,
         check_unmanaged: bool = False,
     ) -> bool:
-        kodi_emby_metadata: Optional[Dict[str, Any]] = None
-        roksbox_metadata: Optional[Dict[str, Any]] = None
-        wdtv_metadata: Optional[Dict[str, Any]] = None
-        for metadata in api_get(secrets, "/api/v3/metadata"):
-            if metadata["implementation"] == KodiEmbyMetadata._implementation:
-                kodi_emby_metadata = metadata
-            elif metadata["implementation"] == RoksboxMetadata._implementation:
-                roksbox_metadata = metadata
-            elif metadata["implementation"] == WdtvMetadata._implementation:
-                wdtv_metadata = metadata
-        if kodi_emby_metadata is None:
-            raise RuntimeError(
-                "Unable to find Kodi (XBMC)/Emby metadata on Sonarr, database might be corrupt",
-            )
-        if roksbox_metadata is None:
-            raise RuntimeError(
-                "Unable to find Roksbox metadata on Sonarr, database might be corrupt",
-            )
-        if wdtv_metadata is None:
-            raise RuntimeError(
-                "Unable to find WDTV metadata on Sonarr, database might be corrupt",
-            )
+        # Reuse the metadata API objects the remote configuration was decoded from,
+        # if available.
+        if (
+            remote.kodi_emby._remote_attrs is not None
+            and remote.roksbox._remote_attrs is not None
+            and remote.wdtv._remote_attrs is not None
+        ):
+            kodi_emby_metadata = remote.kodi_emby._remote_attrs
+            roksbox_metadata = remote.roksbox._remote_attrs
+            wdtv_metadata = remote.wdtv._remote_attrs
+        else:
+            kodi_emby_metadata, roksbox_metadata, wdtv_metadata = self._get_api_metadata(secrets)
         return any(
             [
                 self.kodi_emby._update_remote(
@@ -26,9 +26,9 @@ from buildarr.types import BaseEnum, NonEmptyStr
 from pydantic import NonNegativeInt
 from typing_extensions import Self
 
-from ...api import api_delete, api_get, api_post, api_put
+from ...api import api_delete, api_get, api_get_ids, api_post, api_put
 from ...secrets import SonarrSecrets
-from ..types import SonarrConfigBase
+from ..types import SonarrConfigBase, definition_method
 
 logger = getLogger(__name__)
 
@@ -214,8 +214,9 @@ class DelayProfile(SonarrConfigBase):
     def _from_remote(cls, tag_ids: Mapping[str, int], remote_attrs: Mapping[str, Any]) -> Self:
         return cls(
             **cls.get_local_attrs(cls._get_remote_map(tag_ids), remote_attrs),
-        )
+        )._with_remote_attrs(remote_attrs)
 
+    @definition_method
     def _create_remote(
         self,
         tree: str,
@@ -232,6 +233,7 @@ class DelayProfile(SonarrConfigBase):
             },
         )
 
+    @definition_method
     def _update_remote(
         self,
         tree: str,
@@ -257,6 +259,7 @@ class DelayProfile(SonarrConfigBase):
             return True
         return False
 
+    @definition_method
     def _delete_remote(
         self,
         tree: str,
@@ -308,7 +311,7 @@ class SonarrDelayProfilesSettingsConfig(SonarrConfigBase):
             reverse=True,
         )
         tag_ids: Dict[str, int] = (
-            {tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")}
+            api_get_ids(secrets, "/api/v3/tag", key="label")
             if any(profile["tags"] for profile in profiles)
             else {}
         )
@@ -333,11 +336,16 @@ class SonarrDelayProfilesSettingsConfig(SonarrConfigBase):
         #
         changed = False
         #
+        # Remote delay profiles are sorted by order, highest first.
         profile_ids: List[int] = [
-            profile["id"] for profile in api_get(secrets, "/api/v3/delayprofile")
+            profile._remote_attrs["id"]
+            for profile in reversed(remote.definitions)
+            if profile._remote_attrs is not None
         ]
+        if len(profile_ids) < len(remote.definitions):
+            profile_ids = [profile["id"] for profile in api_get(secrets, "/api/v3/delayprofile")]
         tag_ids: Dict[str, int] = (
-            {tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")}
+            api_get_ids(secrets, "/api/v3/tag", key="label")
             if any(profile.tags for profile in self.definitions)
             or any(profile.tags for profile in remote.definitions)
             else {}
@@ -19,7 +19,7 @@ Sonarr plugin language profile configuration.
 from __future__ import annotations
 
 from logging import getLogger
-from typing import Any, Dict, List, Mapping, Optional, Sequence, Set
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
 
 from buildarr.config import RemoteMapEntry
 from buildarr.types import BaseEnum
@@ -27,8 +27,9 @@ from pydantic import Field, ValidationInfo, field_validator
 from typing_extensions import Annotated, Self
 
 from ...api import api_delete, api_get, api_post, api_put
+from ...capabilities import find_capabilities
 from ...secrets import SonarrSecrets
-from ..types import SonarrConfigBase
+from ..types import SonarrConfigBase, definition_method, get_remote_ids
 
 logger = getLogger(__name__)
 
@@ -262,8 +263,9 @@ class LanguageProfile(SonarrConfigBase):
     ) -> Self:
         return cls(
             **cls.get_local_attrs(cls._get_remote_map(language_ids), remote_attrs),
-        )
+        )._with_remote_attrs(remote_attrs)
 
+    @definition_method
     def _create_remote(
         self,
         tree: str,
@@ -280,6 +282,7 @@ class LanguageProfile(SonarrConfigBase):
             },
         )
 
+    @definition_method
     def _update_remote(
         self,
         tree: str,
@@ -330,10 +333,7 @@ class SonarrLanguageProfilesSettingsConfig(SonarrConfigBase):
 
     @classmethod
     def from_remote(cls, secrets: SonarrSecrets) -> Self:
-        language_ids = {
-            Language(language["language"]["name"]): language["language"]["id"]
-            for language in api_get(secrets, "/api/v3/languageprofile/schema")["languages"]
-        }
+        language_ids = cls._get_language_ids(secrets)
         return cls(
             definitions={
                 profile["name"]: LanguageProfile._from_remote(language_ids, profile)
@@ -349,26 +349,10 @@ class SonarrLanguageProfilesSettingsConfig(SonarrConfigBase):
         check_unmanaged: bool = False,
     ) -> bool:
         changed = False
-        profile_ids: Dict[str, int] = {
-            profile_json["name"]: profile_json["id"]
-            for profile_json in api_get(secrets, "/api/v3/languageprofile")
-        }
-        language_ids = {
-            Language(language["language"]["name"]): language["language"]["id"]
-            for language in api_get(secrets, "/api/v3/languageprofile/schema")["languages"]
-        }
-        # # Only works on Sonarr V4
-        # try:
-        #     language_ids: Dict[Language, int] = {
-        #         Language(language["name"]): language["id"]
-        #         for language in api_get(secrets, "/api/v3/language")
-        #     }
-        # # Compatible with Sonarr V3, deprecated on Sonarr V4
-        # except SonarrAPIError as err:
-        #     if err.response.status_code == 404:
-        #         ...
-        #     else:
-        #         raise
+        profile_ids: Dict[str, int] = get_remote_ids(
+            secrets, "/api/v3/languageprofile", remote.definitions
+        )
+        language_ids = self._get_language_ids(secrets)
         for profile_name, profile in self.definitions.items():
             profile_tree = f"{tree}.definitions[{profile_name!r}]"
             if profile_name not in remote.definitions:
@@ -392,10 +376,9 @@ class SonarrLanguageProfilesSettingsConfig(SonarrConfigBase):
 
     def delete_remote(self, tree: str, secrets: SonarrSecrets, remote: Self) -> bool:
         changed = False
-        profile_ids: Dict[str, int] = {
-            profile_json["name"]: profile_json["id"]
-            for profile_json in api_get(secrets, "/api/v3/languageprofile")
-        }
+        profile_ids: Dict[str, int] = get_remote_ids(
+            secrets, "/api/v3/languageprofile", remote.definitions
+        )
         for profile_name, profile in remote.definitions.items():
             if profile_name not in self.definitions:
                 profile_tree = f"{tree}.definitions[{profile_name!r}]"
@@ -409,3 +392,23 @@ class SonarrLanguageProfilesSettingsConfig(SonarrConfigBase):
                 else:
                     logger.debug("%s: (...) (unmanaged)", profile_tree)
         return changed
+
+    @classmethod
+    def _get_language_ids(cls, secrets: SonarrSecrets) -> Dict[Language, int]:
+        # Language IDs only change between Sonarr versions, so use the languages
+        # from the capability registry if available, instead of fetching the schema.
+        capabilities = find_capabilities(secrets)
+        languages: Iterable[Tuple[str, int]]
+        if capabilities and capabilities.languages:
+            languages = capabilities.languages.items()
+        else:
+            languages = (
+                (language["language"]["name"], language["language"]["id"])
+                for language in api_get(secrets, "/api/v3/languageprofile/schema")["languages"]
+            )
+        language_values = {language.value for language in Language}
+        return {
+            Language(language_name): language_id
+            for language_name, language_id in languages
+            if language_name in language_values
+        }
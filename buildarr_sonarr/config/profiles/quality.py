@@ -28,7 +28,7 @@ from typing_extensions import Annotated, Self
 
 from ...api import api_delete, api_get, api_post, api_put
 from ...secrets import SonarrSecrets
-from ..types import SonarrConfigBase
+from ..types import SonarrConfigBase, definition_method, get_remote_ids
 
 logger = getLogger(__name__)
 
@@ -265,8 +265,11 @@ class QualityProfile(SonarrConfigBase):
 
     @classmethod
     def _from_remote(cls, remote_attrs: Mapping[str, Any]) -> Self:
-        return cls(**cls.get_local_attrs(cls._get_remote_map(), remote_attrs))
+        return cls(
+            **cls.get_local_attrs(cls._get_remote_map(), remote_attrs),
+        )._with_remote_attrs(remote_attrs)
 
+    @definition_method
     def _create_remote(
         self,
         tree: str,
@@ -293,6 +296,7 @@ class QualityProfile(SonarrConfigBase):
             },
         )
 
+    @definition_method
     def _update_remote(
         self,
         tree: str,
@@ -368,10 +372,9 @@ class SonarrQualityProfilesSettingsConfig(SonarrConfigBase):
         check_unmanaged: bool = False,
     ) -> bool:
         changed = False
-        profile_ids: Dict[str, int] = {
-            profile_json["name"]: profile_json["id"]
-            for profile_json in api_get(secrets, "/api/v3/qualityprofile")
-        }
+        profile_ids: Dict[str, int] = get_remote_ids(
+            secrets, "/api/v3/qualityprofile", remote.definitions
+        )
         quality_definitions: Dict[str, Dict[str, Any]] = {
             quality_json["title"]: quality_json["quality"]
             for quality_json in sorted(
@@ -403,10 +406,9 @@ class SonarrQualityProfilesSettingsConfig(SonarrConfigBase):
 
     def delete_remote(self, tree: str, secrets: SonarrSecrets, remote: Self) -> bool:
         changed = False
-        profile_ids: Dict[str, int] = {
-            profile_json["name"]: profile_json["id"]
-            for profile_json in api_get(secrets, "/api/v3/qualityprofile")
-        }
+        profile_ids: Dict[str, int] = get_remote_ids(
+            secrets, "/api/v3/qualityprofile", remote.definitions
+        )
         for profile_name, profile in remote.definitions.items():
             if profile_name not in self.definitions:
                 profile_tree = f"{tree}.definitions[{profile_name!r}]"
@@ -29,9 +29,9 @@ from buildarr.types import NonEmptyStr, TrashID
 from pydantic import field_validator
 from typing_extensions import Self
 
-from ...api import api_delete, api_get, api_post, api_put
+from ...api import api_delete, api_get, api_get_ids, api_post, api_put
 from ...secrets import SonarrSecrets
-from ..types import SonarrConfigBase
+from ..types import SonarrConfigBase, definition_method, get_remote_ids
 
 logger = getLogger(__name__)
 
@@ -250,7 +250,9 @@ class ReleaseProfile(SonarrConfigBase):
         tag_ids: Mapping[str, int],
         remote_attrs: Mapping[str, Any],
     ) -> Self:
-        return cls(**cls.get_local_attrs(cls._get_remote_map(indexer_ids, tag_ids), remote_attrs))
+        return cls(
+            **cls.get_local_attrs(cls._get_remote_map(indexer_ids, tag_ids), remote_attrs),
+        )._with_remote_attrs(remote_attrs)
 
     def uses_trash_metadata(self) -> bool:
         return bool(self.trash_id)
@@ -322,6 +324,7 @@ class ReleaseProfile(SonarrConfigBase):
             f"Unable to find Sonarr release profile file with trash ID '{self.trash_id}'",
         )
 
+    @definition_method
     def _create_remote(
         self,
         tree: str,
@@ -339,6 +342,7 @@ class ReleaseProfile(SonarrConfigBase):
             },
         )
 
+    @definition_method
     def _update_remote(
         self,
         tree: str,
@@ -392,12 +396,12 @@ class SonarrReleaseProfilesSettingsConfig(SonarrConfigBase):
     def from_remote(cls, secrets: SonarrSecrets) -> Self:
         profiles: List[Dict[str, Any]] = api_get(secrets, "/api/v3/releaseprofile")
         indexer_ids: Dict[str, int] = (
-            {tag["name"]: tag["id"] for tag in api_get(secrets, "/api/v3/indexer")}
+            api_get_ids(secrets, "/api/v3/indexer")
             if any(profile["indexerId"] for profile in profiles)
             else {}
         )
         tag_ids: Dict[str, int] = (
-            {tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")}
+            api_get_ids(secrets, "/api/v3/tag", key="label")
             if any(profile["tags"] for profile in profiles)
             else {}
         )
@@ -416,18 +420,17 @@ class SonarrReleaseProfilesSettingsConfig(SonarrConfigBase):
         check_unmanaged: bool = False,
     ) -> bool:
         changed = False
-        profile_ids: Dict[str, int] = {
-            profile_json["name"]: profile_json["id"]
-            for profile_json in api_get(secrets, "/api/v3/releaseprofile")
-        }
+        profile_ids: Dict[str, int] = get_remote_ids(
+            secrets, "/api/v3/releaseprofile", remote.definitions
+        )
         indexer_ids: Dict[str, int] = (
-            {tag["name"]: tag["id"] for tag in api_get(secrets, "/api/v3/indexer")}
+            api_get_ids(secrets, "/api/v3/indexer")
             if any(p.indexer for p in self.definitions.values())
             or any(p.indexer for p in remote.definitions.values())
             else {}
         )
         tag_ids: Dict[str, int] = (
-            {tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")}
+            api_get_ids(secrets, "/api/v3/tag", key="label")
             if any(profile.tags for profile in self.definitions.values())
             or any(profile.tags for profile in remote.definitions.values())
             else {}
@@ -457,10 +460,9 @@ class SonarrReleaseProfilesSettingsConfig(SonarrConfigBase):
 
     def delete_remote(self, tree: str, secrets: SonarrSecrets, remote: Self) -> bool:
         changed = False
-        profile_ids: Dict[str, int] = {
-            profile_json["name"]: profile_json["id"]
-            for profile_json in api_get(secrets, "/api/v3/releaseprofile")
-        }
+        profile_ids: Dict[str, int] = get_remote_ids(
+            secrets, "/api/v3/releaseprofile", remote.definitions
+        )
         for profile_name, profile in remote.definitions.items():
             if profile_name not in self.definitions:
                 profile_tree = f"{tree}.definitions[{profile_name!r}]"
@@ -20,7 +20,7 @@ from __future__ import annotations
 
 import json
 
-from typing import Dict, Optional, cast
+from typing import Any, Dict, Optional, cast
 
 from buildarr.config import ConfigTrashIDNotFoundError
 from buildarr.state import state
@@ -176,7 +176,7 @@ class SonarrQualitySettingsConfig(SonarrConfigBase):
                     ),
                     min=definition_json["minSize"],
                     max=definition_json.get("maxSize", None),
-                )
+                )._with_remote_attrs(definition_json)
                 for definition_json in api_get(secrets, "/api/v3/qualitydefinition")
             },
         )
@@ -189,14 +189,16 @@ class SonarrQualitySettingsConfig(SonarrConfigBase):
         check_unmanaged: bool = False,
     ) -> bool:
         changed = False
-        remote_definitions_json = {
-            definition_json["id"]: definition_json
-            for definition_json in api_get(secrets, "/api/v3/qualitydefinition")
-        }
-        definition_ids: Dict[str, int] = {
-            definition_json["quality"]["name"]: definition_id
-            for definition_id, definition_json in remote_definitions_json.items()
+        remote_definitions_json: Dict[str, Dict[str, Any]] = {
+            definition_name: definition._remote_attrs
+            for definition_name, definition in remote.definitions.items()
+            if definition._remote_attrs is not None
         }
+        if len(remote_definitions_json) < len(remote.definitions):
+            remote_definitions_json = {
+                definition_json["quality"]["name"]: definition_json
+                for definition_json in api_get(secrets, "/api/v3/qualitydefinition")
+            }
         for definition_name, local_definition in self.definitions.items():
             updated, remote_attrs = local_definition.get_update_remote_attrs(
                 tree=f"{tree}[{definition_name!r}]",
@@ -208,11 +210,11 @@ class SonarrQualitySettingsConfig(SonarrConfigBase):
                 ],
             )
             if updated:
-                definition_id = definition_ids[definition_name]
+                definition_json = remote_definitions_json[definition_name]
                 api_put(
                     secrets,
-                    f"/api/v3/qualitydefinition/{definition_id}",
-                    {**remote_definitions_json[definition_id], **remote_attrs},
+                    f"/api/v3/qualitydefinition/{definition_json['id']}",
+                    {**definition_json, **remote_attrs},
                 )
                 changed = True
         return changed
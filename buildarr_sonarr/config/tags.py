@@ -24,7 +24,7 @@ from typing import Dict, Set
 from buildarr.types import NonEmptyStr
 from typing_extensions import Self
 
-from ..api import api_get, api_post
+from ..api import api_get, api_get_ids, api_post
 from ..secrets import SonarrSecrets
 from .types import SonarrConfigBase
 
@@ -71,9 +71,7 @@ class SonarrTagsSettingsConfig(SonarrConfigBase):
     ) -> bool:
         # This only does creations and updates, as Sonarr automatically cleans up unused tags.
         changed = False
-        current_tags: Dict[str, int] = {
-            tag["label"]: tag["id"] for tag in api_get(secrets, "/api/v3/tag")
-        }
+        current_tags: Dict[str, int] = api_get_ids(secrets, "/api/v3/tag", key="label")
         if self.definitions:
             for i, tag in enumerate(sorted(self.definitions)):
                 if tag in current_tags:
@@ -18,13 +18,155 @@ Sonarr plugin configuration utility classes and functions.
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import copy
+import functools
+
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 from buildarr.config import ConfigBase
+from pydantic import PrivateAttr
+from typing_extensions import Self
+
+from ..api import api_definition, api_get, api_get_ids
 
 if TYPE_CHECKING:
-    from ..secrets import SonarrSecrets  # noqa: F401
+    from typing import Callable, Mapping
+
+    from ..secrets import SonarrSecrets
+
+
+def definition_method(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Decorator for methods that create, update or delete a single resource definition,
+    attributing the API requests sent (and time spent) by the method to the definition
+    (e.g. `sonarr.settings.indexers.definitions['Nyaa']`).
+
+    The definition's configuration tree is taken from the `tree` argument
+    (or the first positional argument) of the method.
+
+    Args:
+        func (Callable[..., Any]): Method to decorate.
+
+    Returns:
+        Decorated method
+    """
+
+    @functools.wraps(func)
+    def _wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        tree = kwargs.get("tree", args[0] if args else None)
+        if not isinstance(tree, str):
+            return func(self, *args, **kwargs)
+        with api_definition(tree):
+            return func(self, *args, **kwargs)
+
+    return _wrapper
 
 
 class SonarrConfigBase(ConfigBase["SonarrSecrets"]):
-    pass
+    # The API objects a remote configuration was decoded from are kept in private attributes,
+    # as they are not part of the value of the configuration: they are not validated,
+    # serialised or compared, but are kept when the configuration is copied.
+    _remote_attrs: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    """
+    API object this configuration was decoded from, if it was read from a remote instance.
+    """
+
+    _keyed_remote_attrs: Dict[str, Dict[str, Any]] = PrivateAttr(default_factory=dict)
+    """
+    Additional API objects this configuration was decoded from, by key,
+    for configurations decoded from more than one API object.
+    """
+
+    def __eq__(self, other: object) -> bool:
+        # Compare the model fields (and extra fields) only, ignoring private attributes.
+        # Pydantic compares private attributes when checking equality,
+        # and before version 2.6, any other instance attributes as well.
+        if isinstance(other, SonarrConfigBase):
+            return (
+                type(self) is type(other)
+                and (self.__pydantic_extra__ or {}) == (other.__pydantic_extra__ or {})
+                and all(
+                    self.__dict__.get(name) == other.__dict__.get(name)
+                    for name in type(self).model_fields
+                )
+            )
+        return super().__eq__(other)
+
+    def _with_remote_attrs(
+        self,
+        remote_attrs: Mapping[str, Any],
+        key: Optional[str] = None,
+    ) -> Self:
+        """
+        Keep an API object this remote configuration was decoded from,
+        so that its ID and values can be reused when updating the remote instance
+        without fetching the object again.
+
+        Args:
+            remote_attrs (Mapping[str, Any]): API object.
+            key (Optional[str], optional): Key to keep an additional API object under.
+                If not set, the object is kept as the main API object.
+
+        Returns:
+            This configuration object
+        """
+        if key is None:
+            self._remote_attrs = dict(remote_attrs)
+        else:
+            self._keyed_remote_attrs = {**self._keyed_remote_attrs, key: dict(remote_attrs)}
+        return self
+
+    def _get_remote_attrs(
+        self,
+        secrets: SonarrSecrets,
+        api_url: str,
+        key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get an API object this remote configuration was decoded from,
+        fetching it from the instance if it is not known.
+
+        Args:
+            secrets (SonarrSecrets): Sonarr secrets metadata.
+            api_url (str): API command to fetch the object with.
+            key (Optional[str], optional): Key the API object was kept under.
+                If not set, the main API object is returned.
+
+        Returns:
+            Copy of the API object
+        """
+        remote_attrs = self._remote_attrs if key is None else self._keyed_remote_attrs.get(key)
+        if remote_attrs is not None:
+            return copy.deepcopy(remote_attrs)
+        return api_get(secrets, api_url)
+
+
+def get_remote_ids(
+    secrets: SonarrSecrets,
+    api_url: str,
+    definitions: Mapping[str, SonarrConfigBase],
+    key: str = "name",
+) -> Dict[str, int]:
+    """
+    Get the IDs of remote resource definitions, by name.
+
+    IDs are taken from the API objects the definitions were decoded from.
+    If any definition was not decoded from an API object, the IDs are fetched
+    from the instance instead.
+
+    Args:
+        secrets (SonarrSecrets): Sonarr secrets metadata.
+        api_url (str): API command for the resource collection (e.g. `/api/v3/indexer`).
+        definitions (Mapping[str, SonarrConfigBase]): Remote resource definitions.
+        key (str, optional): API object attribute definitions are named by.
+
+    Returns:
+        Name-to-ID mapping
+    """
+
+    ids: Dict[str, int] = {}
+    for name, definition in definitions.items():
+        if definition._remote_attrs is None:
+            return api_get_ids(secrets, api_url, key=key)
+        ids[name] = definition._remote_attrs["id"]
+    return ids
@@ -181,12 +181,10 @@ class SonarrUISettingsConfig(SonarrConfigBase):
 
     @classmethod
     def from_remote(cls, secrets: SonarrSecrets) -> Self:
+        remote_attrs = api_get(secrets, "/api/v3/config/ui")
         return cls(
-            **cls.get_local_attrs(
-                remote_map=cls._remote_map,
-                remote_attrs=api_get(secrets, "/api/v3/config/ui"),
-            ),
-        )
+            **cls.get_local_attrs(remote_map=cls._remote_map, remote_attrs=remote_attrs),
+        )._with_remote_attrs(remote_attrs)
 
     def update_remote(
         self,
@@ -203,7 +201,7 @@ class SonarrUISettingsConfig(SonarrConfigBase):
             set_unchanged=True,
         )
         if updated:
-            config_id = api_get(secrets, "/api/v3/config/ui")["id"]
+            config_id = remote._get_remote_attrs(secrets, "/api/v3/config/ui")["id"]
             api_put(
                 secrets,
                 f"/api/v3/config/ui/{config_id}",
@@ -0,0 +1,83 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin access to Buildarr core run state.
+
+Buildarr does not provide a public interface for resetting the state of a run,
+which is needed by the plugin commands that run Buildarr repeatedly in the same process
+(e.g. `buildarr sonarr watch`). Where a public interface exists
+(e.g. the `buildarr run` command), it is used instead.
+
+All access to internal Buildarr state is kept in this module. The internal attributes
+used here are stable within the range of Buildarr versions supported by this plugin
+(`buildarr>=0.8.0b0,<0.9.0`, as pinned in `pyproject.toml`), and are checked before use,
+so that an incompatible Buildarr version results in a clear error instead of
+undefined behaviour.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from buildarr.cli.run import run
+from buildarr.state import state
+
+from .exceptions import SonarrError
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Collection
+
+
+STATE_ATTRS = ("_reset",)
+"""
+Internal Buildarr state attributes used by the plugin.
+"""
+
+
+def run_buildarr(config_path: Path, use_plugins: Collection[str]) -> None:
+    """
+    Load the Buildarr configuration, and update instances, the same way `buildarr run` does.
+
+    Args:
+        config_path (Path): Configuration file to load.
+        use_plugins (Collection[str]): Plugins to use.
+    """
+
+    # The command function of `buildarr run`, without the command line parsing.
+    if run.callback is None:
+        raise SonarrError("Unsupported Buildarr version: 'buildarr run' command not found")
+    run.callback(config_path=config_path, use_plugins=set(use_plugins))
+
+
+def reset_state() -> None:
+    """
+    Reset the Buildarr state generated during a run, the same way Buildarr daemon mode
+    does between runs.
+    """
+
+    _check_state()
+    state._reset()
+
+
+def _check_state() -> None:
+    # Fail with a clear error if the installed Buildarr version does not
+    # have the internal state attributes the plugin depends on.
+    missing = [attr for attr in STATE_ATTRS if not hasattr(state, attr)]
+    if missing:
+        raise SonarrError(
+            "Unsupported Buildarr version: internal state attributes not found: "
+            + ", ".join(missing),
+        )
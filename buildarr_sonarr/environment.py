@@ -0,0 +1,205 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin run-wide options set using environment variables.
+
+All `BUILDARR_SONARR_*` environment variables are read here, when the plugin manager
+is created at the start of a Buildarr run, instead of when the plugin modules are imported.
+Options whose environment variable is not set are left unchanged, so options set
+by the plugin commands (e.g. `buildarr sonarr watch --full`) are not overridden.
+
+The environment variables are documented in `docs/configuration/environment.md`.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import os
+
+from typing import TYPE_CHECKING, cast, overload
+
+from .api import enable_api_trace, set_api_trace_max_bytes, set_session_pool_size
+from .capabilities import set_capabilities_registry
+from .cassette import use_cassette
+from .codec import set_codec
+from .config import set_section_max_workers
+from .exceptions import SonarrError
+from .journal import set_journal_file
+from .limiter import (
+    DEFAULT_INITIAL_LIMIT,
+    DEFAULT_LATENCY_TARGET,
+    DEFAULT_MAX_LIMIT,
+    configure_limiters,
+)
+from .metrics import configure_metrics_report
+from .plan import enable_planning
+from .profiler import enable_profiling, get_profiler
+from .retry import (
+    DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT,
+    DEFAULT_CIRCUIT_BREAKER_THRESHOLD,
+    configure_circuit_breakers,
+    get_retry_policy,
+    set_retry_policy,
+)
+from .secrets import set_secrets_max_workers
+from .secrets_cache import configure_secrets_cache
+from .sync_state import set_full_sync, set_sync_state_file
+
+if TYPE_CHECKING:
+    from typing import Callable, Mapping, Optional, TypeVar
+
+    from .cassette import CassetteMode
+
+    T = TypeVar("T")
+
+
+ENV_PREFIX = "BUILDARR_SONARR_"
+
+TRUE_VALUES = ("1", "true", "yes")
+
+
+def configure_from_environment(environ: Optional[Mapping[str, str]] = None) -> None:
+    """
+    Set the run-wide plugin options from the `BUILDARR_SONARR_*` environment variables.
+
+    Args:
+        environ (Optional[Mapping[str, str]], optional): Environment variables to read.
+            Defaults to the environment of the current process.
+
+    Raises:
+        SonarrError: If an environment variable has an invalid value.
+    """
+
+    env = _Environment(os.environ if environ is None else environ)
+
+    # API requests.
+    session_pool_size = env.get("SESSION_POOL_SIZE", int)
+    if session_pool_size is not None:
+        set_session_pool_size(session_pool_size)
+    json_codec = env.get("JSON_CODEC", str)
+    if json_codec:
+        set_codec(json_codec)
+    if env.is_set("API_CONCURRENCY_INITIAL", "API_CONCURRENCY_MAX", "API_LATENCY_TARGET"):
+        configure_limiters(
+            initial_limit=env.get("API_CONCURRENCY_INITIAL", int, DEFAULT_INITIAL_LIMIT),
+            max_limit=env.get("API_CONCURRENCY_MAX", int, DEFAULT_MAX_LIMIT),
+            latency_target=env.get("API_LATENCY_TARGET", float, DEFAULT_LATENCY_TARGET),
+        )
+    if env.is_set("API_MAX_RETRIES", "API_BACKOFF_FACTOR"):
+        retry_policy = get_retry_policy()
+        set_retry_policy(
+            dataclasses.replace(
+                retry_policy,
+                max_retries=env.get("API_MAX_RETRIES", int, retry_policy.max_retries),
+                backoff_factor=env.get("API_BACKOFF_FACTOR", float, retry_policy.backoff_factor),
+            ),
+        )
+    if env.is_set("API_CIRCUIT_BREAKER_THRESHOLD", "API_CIRCUIT_BREAKER_RESET_TIMEOUT"):
+        configure_circuit_breakers(
+            failure_threshold=env.get(
+                "API_CIRCUIT_BREAKER_THRESHOLD",
+                int,
+                DEFAULT_CIRCUIT_BREAKER_THRESHOLD,
+            ),
+            reset_timeout=env.get(
+                "API_CIRCUIT_BREAKER_RESET_TIMEOUT",
+                float,
+                DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT,
+            ),
+        )
+
+    # Concurrency.
+    secrets_max_workers = env.get("SECRETS_MAX_WORKERS", int)
+    if secrets_max_workers is not None:
+        set_secrets_max_workers(secrets_max_workers)
+    section_max_workers = env.get("SECTION_MAX_WORKERS", int)
+    if section_max_workers is not None:
+        set_section_max_workers(section_max_workers)
+
+    # Persistent state.
+    capabilities_file = env.get("CAPABILITIES_FILE", str)
+    if capabilities_file:
+        set_capabilities_registry(capabilities_file)
+    secrets_cache_ttl = env.get("SECRETS_CACHE_TTL", float)
+    if secrets_cache_ttl is not None:
+        configure_secrets_cache(
+            ttl=secrets_cache_ttl,
+            path=env.get("SECRETS_CACHE_FILE", str) or None,
+        )
+    sync_state_file = env.get("SYNC_STATE_FILE", str)
+    if sync_state_file:
+        set_sync_state_file(sync_state_file)
+    if env.get("FULL_SYNC", str, "").lower() in TRUE_VALUES:
+        set_full_sync(True)
+    journal_file = env.get("JOURNAL_FILE", str)
+    if journal_file:
+        set_journal_file(journal_file)
+    plan_file = env.get("PLAN_FILE", str)
+    if plan_file:
+        enable_planning(plan_file)
+
+    # Diagnostics.
+    api_trace_max_bytes = env.get("API_TRACE_MAX_BYTES", int)
+    if api_trace_max_bytes is not None:
+        set_api_trace_max_bytes(api_trace_max_bytes)
+    api_trace_file = env.get("API_TRACE_FILE", str)
+    if api_trace_file:
+        enable_api_trace(api_trace_file)
+    api_cassette = env.get("API_CASSETTE", str)
+    if api_cassette:
+        api_cassette_mode = env.get("API_CASSETTE_MODE", str, "replay")
+        if api_cassette_mode not in ("record", "replay"):
+            raise SonarrError(
+                f"Invalid value for {ENV_PREFIX}API_CASSETTE_MODE "
+                f"(must be 'record' or 'replay'): {api_cassette_mode}",
+            )
+        use_cassette(api_cassette, mode=cast("CassetteMode", api_cassette_mode))
+    configure_metrics_report(
+        json_path=env.get("METRICS_FILE", str),
+        prometheus_path=env.get("METRICS_PROMETHEUS_FILE", str),
+    )
+    profile_file = env.get("PROFILE_FILE", str)
+    if profile_file and get_profiler() is None:
+        enable_profiling(profile_file)
+
+
+class _Environment:
+    # Read typed values of plugin environment variables, ignoring empty variables.
+
+    def __init__(self, environ: Mapping[str, str]) -> None:
+        self.environ = environ
+
+    def is_set(self, *names: str) -> bool:
+        return any(self.environ.get(f"{ENV_PREFIX}{name}") for name in names)
+
+    @overload
+    def get(self, name: str, parse: Callable[[str], T]) -> Optional[T]: ...
+
+    @overload
+    def get(self, name: str, parse: Callable[[str], T], default: T) -> T: ...
+
+    def get(
+        self,
+        name: str,
+        parse: Callable[[str], T],
+        default: Optional[T] = None,
+    ) -> Optional[T]:
+        value = self.environ.get(f"{ENV_PREFIX}{name}")
+        if not value:
+            return default
+        try:
+            return parse(value)
+        except ValueError:
+            raise SonarrError(f"Invalid value for {ENV_PREFIX}{name}: {value}") from None
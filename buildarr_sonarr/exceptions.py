@@ -39,6 +39,32 @@ class SonarrAPIError(SonarrError):
         super().__init__(msg)
 
 
+class SonarrAPICircuitOpenError(SonarrAPIError):
+    """
+    Error raised when a request is not sent because the Sonarr instance has failed
+    too many consecutive requests.
+    """
+
+    pass
+
+
+class SonarrCassetteError(SonarrError):
+    """
+    Error raised when an API cassette could not be loaded,
+    or a request has no recorded response.
+    """
+
+    pass
+
+
+class SonarrPlanError(SonarrError):
+    """
+    Error raised when a change plan could not be loaded or applied.
+    """
+
+    pass
+
+
 class SonarrSecretsError(SonarrError):
     """
     Sonarr plugin secrets exception base class.
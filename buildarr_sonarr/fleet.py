@@ -0,0 +1,422 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin fleet execution mode.
+
+Buildarr updates instances one at a time, so most of the time spent updating
+a large fleet of Sonarr instances is spent waiting on the network.
+In fleet mode, instances that are not linked to each other are updated concurrently,
+using a bounded pool of workers.
+
+Instances linked using instance references (e.g. Sonarr import lists using `instance_name`)
+are still updated in the same order as Buildarr would: target instances are updated before
+the instances that reference them, and unused resources are deleted in the reverse order.
+
+A failure on one instance does not stop the rest of the fleet from being updated,
+but instances that reference a failed instance are skipped.
+Log messages are attributed to the instance they were logged for, and held back
+until each stage on an instance has finished, so that the log messages for each instance
+are output together instead of being interleaved.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import logging
+import threading
+import time
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from logging import getLogger
+from typing import TYPE_CHECKING, Dict, List, Tuple, cast
+
+from buildarr.cli.exceptions import RunInstanceConnectionTestFailedError
+from buildarr.config import (
+    load_instance_configs,
+    render_instance_configs,
+    resolve_instance_dependencies,
+)
+from buildarr.manager import load_managers
+from buildarr.state import state
+from buildarr.trash import cleanup_trash_metadata, fetch_trash_metadata, trash_metadata_used
+
+from .config.import_lists import SonarrImportList
+from .scheduler import reverse_dependencies, run_graph
+from .secrets import SonarrSecrets
+
+if TYPE_CHECKING:
+    from typing import Callable, Collection, Generator, Mapping, Optional, Sequence
+
+    from .config import SonarrConfig, SonarrInstanceConfig
+    from .manager import SonarrManager
+
+
+logger = getLogger(__name__)
+
+
+DEFAULT_FLEET_WORKERS = 8
+
+_log_buffer: contextvars.ContextVar[
+    Optional[Tuple[str, List[Tuple[logging.Handler, logging.LogRecord]]]]
+] = contextvars.ContextVar("_log_buffer", default=None)
+
+
+@dataclass
+class SonarrFleetResult:
+    """
+    Result of updating a Sonarr instance in fleet mode.
+    """
+
+    instance_name: str
+    changed: bool = False
+    error: Optional[str] = None
+    duration: float = 0.0
+
+    @property
+    def status(self) -> str:
+        """
+        Instance update status (`changed`, `unchanged` or `failed`).
+        """
+        if self.error is not None:
+            return "failed"
+        return "changed" if self.changed else "unchanged"
+
+
+class SonarrFleetLogFilter(logging.Filter):
+    """
+    Logging filter for a log handler, used while running in fleet mode.
+
+    Log records logged during a stage run on an instance are attributed to the instance,
+    and held back from the handler until the stage has finished.
+    Records logged outside of an instance stage are passed straight through.
+    """
+
+    def __init__(self, handler: logging.Handler) -> None:
+        super().__init__()
+        self.handler = handler
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        buffer = _log_buffer.get()
+        if buffer is None:
+            return True
+        instance_name, records = buffer
+        # Buildarr attributes log records to the instance currently being processed
+        # using global state, which does not work with concurrently processed instances.
+        record.plugin = " <sonarr>"
+        record.instance = f" ({instance_name})"
+        records.append((self.handler, record))
+        return False
+
+
+class SonarrFleet:
+    """
+    Concurrent updater for a fleet of Sonarr instances.
+    """
+
+    def __init__(
+        self,
+        instance_names: Sequence[str],
+        dependencies: Mapping[str, Collection[str]],
+        max_workers: int = DEFAULT_FLEET_WORKERS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.instance_names = list(instance_names)
+        self.dependencies: Dict[str, Tuple[str, ...]] = {
+            instance_name: tuple(
+                dependency
+                for dependency in dependencies.get(instance_name, ())
+                if dependency in self.instance_names
+            )
+            for instance_name in self.instance_names
+        }
+        """
+        Names of the instances each instance references, which are updated before it.
+        """
+        self.max_workers = max_workers
+        self.clock = clock
+        self.results: Dict[str, SonarrFleetResult] = {
+            instance_name: SonarrFleetResult(instance_name) for instance_name in self.instance_names
+        }
+        self._log_lock = threading.Lock()
+
+    def run(
+        self,
+        connect: Callable[[str], None],
+        update: Callable[[str], bool],
+        delete: Callable[[str], bool],
+    ) -> Dict[str, SonarrFleetResult]:
+        """
+        Update all instances in the fleet.
+
+        Every instance is connected to first, then the remote configuration
+        on every instance is updated, and finally unused resources are deleted.
+
+        Args:
+            connect (Callable[[str], None]): Function fetching secrets for an instance.
+            update (Callable[[str], bool]): Function updating an instance.
+                Returns `True` if changes were made.
+            delete (Callable[[str], bool]): Function deleting unused resources on an instance.
+                Returns `True` if changes were made.
+
+        Returns:
+            Update results, by instance name
+        """
+        with self._buffer_logs():
+            self.run_stage("connect", connect, {})
+            self.run_stage("update", update, self.dependencies)
+            self.run_stage("delete", delete, reverse_dependencies(self.dependencies))
+        return self.results
+
+    def run_stage(
+        self,
+        stage: str,
+        func: Callable[[str], Optional[bool]],
+        dependencies: Mapping[str, Collection[str]],
+    ) -> None:
+        """
+        Run a stage on all instances that have not failed yet, running instances
+        that do not depend on each other concurrently.
+
+        Instances depending on an instance that has failed are skipped,
+        and marked as failed themselves.
+
+        Args:
+            stage (str): Stage name, used in logging and error messages.
+            func (Callable[[str], Optional[bool]]): Function to run on each instance.
+                Returns `True` if changes were made.
+            dependencies (Mapping[str, Collection[str]]): Instances each instance depends on.
+        """
+        run_graph(
+            {
+                instance_name: functools.partial(
+                    self._run_task,
+                    stage,
+                    func,
+                    dependencies,
+                    instance_name,
+                )
+                for instance_name in self.instance_names
+            },
+            dependencies,
+            max_workers=self.max_workers,
+            thread_name_prefix="buildarr-sonarr-fleet",
+        )
+
+    def _run_task(
+        self,
+        stage: str,
+        func: Callable[[str], Optional[bool]],
+        dependencies: Mapping[str, Collection[str]],
+        instance_name: str,
+    ) -> None:
+        # Errors are recorded instead of raised, so that the rest of the fleet
+        # is still updated.
+        result = self.results[instance_name]
+        if result.error is not None:
+            return
+        for dependency in dependencies.get(instance_name, ()):
+            if self.results[dependency].error is not None:
+                result.error = f"{stage}: skipped, as linked instance '{dependency}' failed"
+                return
+        start = self.clock()
+        with self._capture_logs(instance_name):
+            try:
+                if func(instance_name):
+                    result.changed = True
+            except Exception as err:
+                logger.exception("Error during %s stage: %s", stage, err)
+                result.error = f"{stage}: {err}"
+            finally:
+                result.duration += self.clock() - start
+
+    @contextmanager
+    def _buffer_logs(self) -> Generator[None, None, None]:
+        # Add the fleet log filter to the root logger handlers for the duration of the run.
+        log_filters = [SonarrFleetLogFilter(handler) for handler in logging.getLogger().handlers]
+        for log_filter in log_filters:
+            log_filter.handler.addFilter(log_filter)
+        try:
+            yield
+        finally:
+            for log_filter in log_filters:
+                log_filter.handler.removeFilter(log_filter)
+
+    @contextmanager
+    def _capture_logs(self, instance_name: str) -> Generator[None, None, None]:
+        # Hold back log records from a stage run on an instance,
+        # and output them as a single block once the stage has finished.
+        records: List[Tuple[logging.Handler, logging.LogRecord]] = []
+        token = _log_buffer.set((instance_name, records))
+        try:
+            yield
+        finally:
+            _log_buffer.reset(token)
+            with self._log_lock:
+                for handler, record in records:
+                    handler.handle(record)
+
+
+def get_instance_dependencies(
+    instance_configs: Mapping[str, SonarrInstanceConfig],
+) -> Dict[str, List[str]]:
+    """
+    Get the instances each Sonarr instance references using instance links
+    (Sonarr import lists using `instance_name`).
+
+    Args:
+        instance_configs (Mapping[str, SonarrInstanceConfig]): Instance configurations, by name.
+
+    Returns:
+        Names of the instances each instance references, by instance name
+    """
+
+    return {
+        instance_name: sorted(
+            {
+                import_list.instance_name
+                for import_list in instance_config.settings.import_lists.definitions.values()
+                if isinstance(import_list, SonarrImportList) and import_list.instance_name
+            },
+        )
+        for instance_name, instance_config in instance_configs.items()
+    }
+
+
+def run_fleet(max_workers: int = DEFAULT_FLEET_WORKERS) -> Dict[str, SonarrFleetResult]:
+    """
+    Update all Sonarr instances in the loaded Buildarr configuration in fleet mode.
+
+    This is equivalent to a Buildarr run using only the Sonarr plugin,
+    except that instances are updated concurrently. The Buildarr configuration
+    must be loaded into global state before this function is called.
+
+    Args:
+        max_workers (int, optional): Maximum number of instances to update at the same time.
+
+    Returns:
+        Update results, by instance name
+    """
+
+    load_managers({"sonarr"})
+    load_instance_configs({"sonarr"})
+    resolve_instance_dependencies()
+    if trash_metadata_used():
+        logger.info("Fetching TRaSH metadata")
+        fetch_trash_metadata()
+        logger.info("Finished fetching TRaSH metadata")
+    render_instance_configs()
+
+    manager = cast("SonarrManager", state.managers["sonarr"])
+    instance_configs = cast(
+        "Dict[str, SonarrInstanceConfig]",
+        state.instance_configs["sonarr"],
+    )
+    instance_secrets = cast("Dict[str, SonarrSecrets]", state.instance_secrets["sonarr"])
+    instance_names = sorted(instance_configs.keys())
+    dependencies = get_instance_dependencies(instance_configs)
+
+    def _connect(instance_name: str) -> None:
+        instance_config = instance_configs[instance_name]
+        # Initialise the instance if required, as Buildarr does before fetching secrets.
+        try:
+            if not manager.is_initialized(instance_config):
+                logger.info("Initialising instance")
+                manager.initialize(
+                    (
+                        "sonarr"
+                        if instance_name == "default"
+                        else f"sonarr.instances[{instance_name!r}]"
+                    ),
+                    instance_config,
+                )
+                logger.info("Finished initialising instance")
+        except NotImplementedError:
+            pass
+        # The instances are already being connected to concurrently,
+        # so only fetch the secrets for this instance.
+        secrets = SonarrSecrets.get_instance(cast("SonarrConfig", instance_config))
+        if not secrets.test():
+            raise RunInstanceConnectionTestFailedError(
+                f"Connection test failed for instance '{instance_name}': {secrets}",
+            )
+        instance_secrets[instance_name] = secrets
+        try:
+            instance_configs[instance_name] = manager.post_init_render(instance_config, secrets)
+        except NotImplementedError:
+            pass
+
+    def _update(instance_name: str) -> bool:
+        instance_config = instance_configs[instance_name]
+        secrets = instance_secrets[instance_name]
+        remote_instance_config = manager.from_remote(instance_config, secrets)
+        return manager.update_remote("sonarr", instance_config, secrets, remote_instance_config)
+
+    def _delete(instance_name: str) -> bool:
+        instance_config = instance_configs[instance_name]
+        secrets = instance_secrets[instance_name]
+        remote_instance_config = manager.from_remote(instance_config, secrets)
+        return manager.delete_remote("sonarr", instance_config, secrets, remote_instance_config)
+
+    logger.info(
+        "Updating %i instances (up to %i at the same time)",
+        len(instance_names),
+        max_workers,
+    )
+    try:
+        return SonarrFleet(instance_names, dependencies, max_workers=max_workers).run(
+            connect=_connect,
+            update=_update,
+            delete=_delete,
+        )
+    finally:
+        if state.trash_metadata_dir:
+            cleanup_trash_metadata()
+
+
+def format_summary(results: Mapping[str, SonarrFleetResult]) -> str:
+    """
+    Format a summary table of the results of a fleet run.
+
+    Args:
+        results (Mapping[str, SonarrFleetResult]): Update results, by instance name.
+
+    Returns:
+        Summary table, with totals for each status
+    """
+
+    rows = [("INSTANCE", "STATUS", "DURATION", "ERROR")]
+    for result in results.values():
+        rows.append(
+            (
+                result.instance_name,
+                result.status,
+                f"{result.duration:.1f}s",
+                result.error or "",
+            ),
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(3)]
+    lines = [
+        "  ".join(
+            [*(value.ljust(width) for value, width in zip(row[:3], widths)), row[3]],
+        ).rstrip()
+        for row in rows
+    ]
+    totals = {status: 0 for status in ("changed", "unchanged", "failed")}
+    for result in results.values():
+        totals[result.status] += 1
+    lines.append(", ".join(f"{count} {status}" for status, count in totals.items()))
+    return "\n".join(lines)
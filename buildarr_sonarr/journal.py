@@ -0,0 +1,258 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin checkpoint journal.
+
+When the checkpoint journal is enabled, every successful write to a Sonarr instance
+is appended to a local journal file as it happens, together with the settings section
+and definition it was made for, and the ID of the resource written to.
+Once a settings section has been updated, a checkpoint is appended with a fingerprint
+of the section: a hash of its local configuration, and digests of the remote resources
+it read.
+
+If a run is interrupted (e.g. by a timeout, or Sonarr restarting), the next run
+resumes from the last checkpoint: sections checkpointed in the interrupted run
+are not updated again, as long as their fingerprint still matches.
+Sections that were partially updated when the run was interrupted have no checkpoint,
+and are updated in full.
+
+The fingerprint is built from the resources the section already read: only resources
+the section wrote to, and that are not held in the remote snapshot, are read again.
+Checking a fingerprint requires reading the remote resources the section depends on
+again, the same way as checking whether a section is unchanged for incremental sync
+(Sonarr has no cheaper way to tell whether a resource has changed). Most of these
+resources are shared between sections and held in the remote snapshot, so resuming
+saves the comparisons and writes of the checkpointed sections, not their reads.
+
+Once a run completes on an instance, its entries are removed from the journal.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List
+
+if TYPE_CHECKING:
+    from typing import Any, Mapping, Optional, Union
+
+
+logger = getLogger(__name__)
+
+
+class SonarrJournal:
+    """
+    Checkpoint journal of updates to Sonarr instances, persisted to a local file
+    in JSON Lines format.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def get_checkpoints(self, host_url: str, version: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the latest checkpoint of each section updated on an instance
+        in an interrupted run.
+
+        This must be called before any checkpoints are recorded for the instance in this run.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+            version (str): Current Sonarr version of the instance.
+
+        Returns:
+            Section checkpoints (local configuration hash and remote resource digests),
+            by section name
+        """
+        with self._lock:
+            return {
+                entry["section"]: {"local": entry["local"], "remote": entry["remote"]}
+                for entry in self._read()
+                if entry.get("type") == "checkpoint"
+                and entry.get("host_url") == host_url
+                and entry.get("version") == version
+            }
+
+    def get_writes(self, host_url: str) -> List[Dict[str, Any]]:
+        """
+        Get the writes made to an instance in an interrupted run.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+
+        Returns:
+            Write entries, in the order they were made
+        """
+        with self._lock:
+            return [
+                entry
+                for entry in self._read()
+                if entry.get("type") == "write" and entry.get("host_url") == host_url
+            ]
+
+    def record_write(
+        self,
+        host_url: str,
+        section: str,
+        definition: str,
+        method: str,
+        api_url: str,
+        resource_id: Optional[int],
+    ) -> None:
+        """
+        Append a successful write to an instance to the journal.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+            section (str): Configuration tree of the section the write was made for.
+            definition (str): Configuration tree of the definition the write was made for,
+                or an empty string if the write was not made for a definition.
+            method (str): HTTP method of the write.
+            api_url (str): API command of the write.
+            resource_id (Optional[int]): ID of the created, updated or deleted resource.
+        """
+        self._append(
+            {
+                "type": "write",
+                "host_url": host_url,
+                "section": section,
+                "definition": definition,
+                "method": method,
+                "api_url": api_url,
+                "resource_id": resource_id,
+            },
+        )
+
+    def record_checkpoint(
+        self,
+        host_url: str,
+        version: str,
+        section: str,
+        local: str,
+        remote: Mapping[str, str],
+    ) -> None:
+        """
+        Append a checkpoint for a section that has been updated on an instance to the journal.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+            version (str): Sonarr version of the instance.
+            section (str): Name of the updated section.
+            local (str): Local configuration hash of the section.
+            remote (Mapping[str, str]): Digests of the remote resources read by the section,
+                by API command.
+        """
+        self._append(
+            {
+                "type": "checkpoint",
+                "host_url": host_url,
+                "version": version,
+                "section": section,
+                "local": local,
+                "remote": dict(remote),
+            },
+        )
+
+    def complete(self, host_url: str) -> None:
+        """
+        Remove the entries for an instance the run completed on from the journal.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+        """
+        with self._lock:
+            entries = [entry for entry in self._read() if entry.get("host_url") != host_url]
+            try:
+                if not entries:
+                    self.path.unlink(missing_ok=True)
+                    return
+                temp_path = self.path.with_name(f".{self.path.name}.tmp")
+                temp_path.write_text(
+                    "".join(json.dumps(entry) + "\n" for entry in entries),
+                    encoding="utf-8",
+                )
+                temp_path.replace(self.path)
+            except OSError as err:
+                logger.warning("Unable to update journal file '%s': %s", self.path, err)
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        entry["time"] = time.time()
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a+b") as f:
+                    # If the last entry was only partially written (e.g. the previous run
+                    # was killed while writing it), start the new entry on a new line.
+                    line = (json.dumps(entry) + "\n").encode("utf-8")
+                    if f.tell() > 0:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            line = b"\n" + line
+                    f.write(line)
+            except OSError as err:
+                logger.warning("Unable to write to journal file '%s': %s", self.path, err)
+
+    def _read(self) -> List[Dict[str, Any]]:
+        # Read all entries currently in the journal file.
+        # Invalid lines (e.g. a partially written entry) are ignored.
+        entries: List[Dict[str, Any]] = []
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(entry, dict):
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        except OSError as err:
+            logger.warning("Unable to read journal file '%s': %s", self.path, err)
+        return entries
+
+
+_journal: Optional[SonarrJournal] = None
+
+
+def get_journal() -> Optional[SonarrJournal]:
+    """
+    Get the checkpoint journal.
+
+    Returns:
+        Checkpoint journal, or `None` if the journal is disabled
+    """
+
+    return _journal
+
+
+def set_journal_file(path: Optional[Union[str, os.PathLike]]) -> None:
+    """
+    Set the file used to persist the checkpoint journal.
+
+    Args:
+        path (Optional[Union[str, os.PathLike]]): Journal file path,
+            or `None` to disable the journal.
+    """
+
+    global _journal  # noqa: PLW0603
+
+    _journal = SonarrJournal(path) if path else None
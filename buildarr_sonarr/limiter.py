@@ -0,0 +1,272 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin adaptive API concurrency limiter.
+
+Each Sonarr instance has its own limit on the number of API requests in flight,
+managed using additive-increase/multiplicative-decrease (AIMD):
+the limit grows slowly while responses stay fast, and is halved as soon as
+response latency exceeds the target, or the instance returns an error
+indicating it is overloaded.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http import HTTPStatus
+from logging import getLogger
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    from typing import Generator, Optional
+
+
+logger = getLogger(__name__)
+
+
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MAX_LIMIT = 16
+DEFAULT_LATENCY_TARGET = 2.0
+
+
+@dataclass(frozen=True)
+class SonarrLimiterStats:
+    """
+    Snapshot of the state of the concurrency limiter for a Sonarr instance.
+    """
+
+    limit: int
+    """
+    Current maximum number of requests in flight.
+    """
+
+    in_flight: int
+    """
+    Number of requests currently in flight.
+    """
+
+    max_in_flight: int
+    """
+    Highest number of requests in flight at the same time.
+    """
+
+    throttle_events: int
+    """
+    Number of times the limit was decreased.
+    """
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter for requests to a single Sonarr instance.
+
+    Every request that completes under `latency_target` seconds increases the limit
+    by `1 / limit` (i.e. the limit grows by 1 once a full window of requests succeeds).
+    A request slower than the target, one that failed to connect, or a 5xx/429 response,
+    halves the limit. Only one decrease is applied per window of requests:
+    requests that were sent before the last decrease do not decrease it again.
+    """
+
+    def __init__(
+        self,
+        host_url: str,
+        initial_limit: int = DEFAULT_INITIAL_LIMIT,
+        max_limit: int = DEFAULT_MAX_LIMIT,
+        latency_target: float = DEFAULT_LATENCY_TARGET,
+    ) -> None:
+        self.host_url = host_url
+        self.max_limit = max(max_limit, 1)
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.throttle_events = 0
+        self._limit = float(min(max(initial_limit, 1), self.max_limit))
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """
+        Current maximum number of requests in flight.
+        """
+        return int(self._limit)
+
+    @property
+    def stats(self) -> SonarrLimiterStats:
+        """
+        Snapshot of the current state of the limiter.
+        """
+        with self._condition:
+            return SonarrLimiterStats(
+                limit=self.limit,
+                in_flight=self.in_flight,
+                max_in_flight=self.max_in_flight,
+                throttle_events=self.throttle_events,
+            )
+
+    def acquire(self) -> float:
+        """
+        Wait until a request can be sent to the instance without exceeding the limit.
+
+        Returns:
+            Monotonic time the request slot was acquired at
+        """
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return time.monotonic()
+
+    def release(self, started: float, status_code: Optional[int]) -> None:
+        """
+        Release a request slot, and adjust the limit based on the outcome of the request.
+
+        Args:
+            started (float): Monotonic time returned by `acquire`.
+            status_code (Optional[int]): Response status code, or `None` if the request failed.
+        """
+        now = time.monotonic()
+        latency = now - started
+        with self._condition:
+            self.in_flight -= 1
+            if (
+                status_code is None
+                or status_code == HTTPStatus.TOO_MANY_REQUESTS
+                or status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+                or latency > self.latency_target
+            ):
+                if started >= self._last_decrease:
+                    self._limit = max(self._limit / 2, 1.0)
+                    self._last_decrease = now
+                    self.throttle_events += 1
+                    logger.debug(
+                        (
+                            "Throttling requests to '%s' to %i in flight "
+                            "(status_code=%s latency=%.3fs)"
+                        ),
+                        self.host_url,
+                        self.limit,
+                        status_code,
+                        latency,
+                    )
+            else:
+                self._limit = min(self._limit + 1 / self.limit, float(self.max_limit))
+            self._condition.notify_all()
+
+    @contextmanager
+    def request(self) -> Generator[SonarrLimiterRequest, None, None]:
+        """
+        Context manager for sending a request within the limit.
+
+        The status code of the response should be set on the yielded object.
+        If it is not set (e.g. because an exception was raised),
+        the request is treated as failed.
+
+        Yields:
+            Limited request state
+        """
+        limited_request = SonarrLimiterRequest()
+        started = self.acquire()
+        try:
+            yield limited_request
+        finally:
+            self.release(started, limited_request.status_code)
+
+
+class SonarrLimiterRequest:
+    """
+    Request being sent within the limits of an adaptive concurrency limiter.
+    """
+
+    def __init__(self) -> None:
+        self.status_code: Optional[int] = None
+
+
+_initial_limit = DEFAULT_INITIAL_LIMIT
+_max_limit = DEFAULT_MAX_LIMIT
+_latency_target = DEFAULT_LATENCY_TARGET
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(host_url: str) -> AdaptiveLimiter:
+    """
+    Get the concurrency limiter for the given Sonarr instance, creating it if required.
+
+    Args:
+        host_url (str): Sonarr instance URL.
+
+    Returns:
+        Concurrency limiter for the instance
+    """
+
+    with _limiters_lock:
+        try:
+            return _limiters[host_url]
+        except KeyError:
+            limiter = _limiters[host_url] = AdaptiveLimiter(
+                host_url,
+                initial_limit=_initial_limit,
+                max_limit=_max_limit,
+                latency_target=_latency_target,
+            )
+            return limiter
+
+
+def get_limiter_stats() -> Dict[str, SonarrLimiterStats]:
+    """
+    Get the current state of the concurrency limiters for all Sonarr instances.
+
+    Returns:
+        Dictionary of instance URL to limiter state
+    """
+
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.host_url: limiter.stats for limiter in limiters}
+
+
+def configure_limiters(initial_limit: int, max_limit: int, latency_target: float) -> None:
+    """
+    Set the concurrency limiter options for all Sonarr instances.
+
+    Existing limiters are reset.
+
+    Args:
+        initial_limit (int): Number of requests allowed in flight at the start of a run.
+        max_limit (int): Maximum number of requests allowed in flight.
+        latency_target (float): Response latency (in seconds) above which the limit is decreased.
+    """
+
+    global _initial_limit, _max_limit, _latency_target  # noqa: PLW0603
+
+    _initial_limit = initial_limit
+    _max_limit = max_limit
+    _latency_target = latency_target
+    reset_limiters()
+
+
+def reset_limiters() -> None:
+    """
+    Discard the concurrency limiters for all Sonarr instances.
+    """
+
+    with _limiters_lock:
+        _limiters.clear()
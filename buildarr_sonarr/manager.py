@@ -18,11 +18,361 @@ Sonarr plugin manager class.
 
 from __future__ import annotations
 
+import threading
+
+from contextlib import contextmanager
+from logging import getLogger
+from typing import TYPE_CHECKING, Any, Dict
+
 from buildarr.manager import ManagerPlugin
 
+from .api import api_cache, get_read_digest, transfer_accounting
+from .capabilities import get_capabilities
+from .cassette import save_cassette
 from .config import SonarrInstanceConfig
-from .secrets import SonarrSecrets
+from .environment import configure_from_environment
+from .exceptions import SonarrAPIError
+from .journal import get_journal
+from .limiter import get_limiter_stats
+from .metrics import write_metrics_report
+from .plan import get_planner, use_plan
+from .profiler import profile, write_profile
+from .secrets import SonarrSecrets, clear_prefetched_secrets
+from .snapshot import SonarrSnapshot, use_snapshot
+from .sync_state import (
+    SonarrSectionSync,
+    get_config_hash,
+    get_sync_state,
+    is_full_sync,
+    use_section_sync,
+)
+
+if TYPE_CHECKING:
+    from typing import Generator, Mapping, Optional
+
+    from .plan import SonarrPlanner
+
+
+logger = getLogger(__name__)
 
 
 class SonarrManager(ManagerPlugin[SonarrInstanceConfig, SonarrSecrets]):
-    pass
+    """
+    Sonarr plugin manager class.
+
+    Each stage of a run against an instance is given its own API response cache,
+    so that resources read by more than one configuration section
+    (e.g. tags) are only fetched once per stage.
+
+    The collections most sections depend on (e.g. tags, download clients and profiles)
+    are kept in a remote snapshot of each instance, shared by the stages of the update pass,
+    so that they are only fetched once per pass. The snapshot is discarded once the update
+    pass is finished, so that the remote configuration refetched before deleting
+    unused resources includes any changes Sonarr made as side effects of the updates
+    (e.g. resetting references to a deleted download client), which are not
+    visible in the responses to the writes.
+
+    If incremental sync is enabled, settings sections that are unchanged since the last run
+    (both locally and on the instance) are skipped.
+
+    If a change plan file is set, the changes to each instance are recorded
+    to a plan instead of being applied.
+
+    If the checkpoint journal is enabled, settings sections already updated
+    in an interrupted run are not updated again.
+
+    If a profile file is set, the time spent in each stage, section and definition
+    is recorded to it.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        # Run state for each instance, by host URL. Instances can be processed
+        # concurrently (e.g. in fleet mode), so access is guarded by a lock.
+        self._snapshots: Dict[str, SonarrSnapshot] = {}
+        self._section_syncs: Dict[str, SonarrSectionSync] = {}
+        self._lock = threading.Lock()
+        # The manager is created once at the start of a Buildarr run,
+        # so use this to set up any run-wide plugin options.
+        configure_from_environment()
+
+    def from_remote(
+        self,
+        instance_config: SonarrInstanceConfig,
+        secrets: SonarrSecrets,
+    ) -> SonarrInstanceConfig:
+        with self._stage("from_remote", secrets):
+            # Load the capabilities of the instance's Sonarr version for the rest of the run,
+            # probing the instance if this is the first time this version is encountered.
+            get_capabilities(secrets)
+            with use_section_sync(self._get_section_sync(instance_config, secrets)):
+                return super().from_remote(instance_config, secrets)
+
+    def update_remote(
+        self,
+        tree: str,
+        local_instance_config: SonarrInstanceConfig,
+        secrets: SonarrSecrets,
+        remote_instance_config: SonarrInstanceConfig,
+    ) -> bool:
+        with self._stage("update_remote", secrets):
+            section_sync = self._get_section_sync_if_exists(secrets)
+            with use_section_sync(section_sync):
+                changed = super().update_remote(
+                    tree,
+                    local_instance_config,
+                    secrets,
+                    remote_instance_config,
+                )
+            # Sections already updated in an interrupted run still need
+            # unused resources to be deleted, so read them in full from now on.
+            if section_sync is not None:
+                section_sync.resumed.clear()
+        # Start the delete pass with a new snapshot, fetching the current state of the instance.
+        with self._lock:
+            self._snapshots.pop(secrets.host_url, None)
+        return changed
+
+    def delete_remote(
+        self,
+        tree: str,
+        local_instance_config: SonarrInstanceConfig,
+        secrets: SonarrSecrets,
+        remote_instance_config: SonarrInstanceConfig,
+    ) -> bool:
+        with self._stage("delete_remote", secrets):
+            with use_section_sync(self._get_section_sync_if_exists(secrets)):
+                changed = super().delete_remote(
+                    tree,
+                    local_instance_config,
+                    secrets,
+                    remote_instance_config,
+                )
+            # Deleting resources is the last stage of a Buildarr run,
+            # so the run completed successfully for this instance.
+            self._save_section_sync(local_instance_config, secrets)
+            journal = get_journal()
+            if journal is not None:
+                journal.complete(secrets.host_url)
+            return changed
+
+    def _get_section_sync(
+        self,
+        instance_config: SonarrInstanceConfig,
+        secrets: SonarrSecrets,
+    ) -> Optional[SonarrSectionSync]:
+        # Determine the settings sections to skip on an instance in this run, if not done yet.
+        # A section is skipped if its local configuration is unchanged since the last run,
+        # and all of the remote resources it read in the last run are also unchanged.
+        # If the checkpoint journal is enabled, sections already updated in an interrupted run
+        # are also not updated again, if their fingerprint is unchanged since the checkpoint.
+        sync_state = get_sync_state()
+        journal = get_journal()
+        if sync_state is None and journal is None:
+            return None
+        section_sync = self._get_section_sync_if_exists(secrets)
+        if section_sync is not None:
+            return section_sync
+        section_names = type(instance_config.settings).model_fields.keys()
+        paused = sync_state is not None and secrets.host_url in sync_state.paused
+        skipped: Dict[str, Any] = {}
+        resumed: Dict[str, Any] = {}
+        if paused:
+            skipped = {
+                section_name: getattr(instance_config.settings, section_name).model_copy(deep=True)
+                for section_name in section_names
+            }
+        elif not is_full_sync():
+            if sync_state is not None:
+                skipped = self._check_sections(
+                    instance_config,
+                    secrets,
+                    sync_state.get_sections(secrets.host_url, secrets.version),
+                )
+            if journal is not None:
+                resumed = self._check_sections(
+                    instance_config,
+                    secrets,
+                    {
+                        section_name: checkpoint
+                        for section_name, checkpoint in journal.get_checkpoints(
+                            secrets.host_url,
+                            secrets.version,
+                        ).items()
+                        if section_name not in skipped
+                    },
+                )
+        if paused:
+            logger.info("Skipping all settings sections (instance paused)")
+        else:
+            if skipped:
+                logger.info(
+                    "Skipping settings sections unchanged since the last run: %s",
+                    ", ".join(skipped.keys()),
+                )
+            if resumed and journal is not None:
+                logger.info(
+                    (
+                        "Resuming interrupted run (%i changes already applied), "
+                        "skipping settings sections already updated: %s"
+                    ),
+                    len(journal.get_writes(secrets.host_url)),
+                    ", ".join(resumed.keys()),
+                )
+        section_sync = SonarrSectionSync(secrets.host_url, skipped=skipped)
+        section_sync.resumed = resumed
+        with self._lock:
+            self._section_syncs[secrets.host_url] = section_sync
+        return section_sync
+
+    def _get_section_sync_if_exists(self, secrets: SonarrSecrets) -> Optional[SonarrSectionSync]:
+        # Get the incremental sync status of an instance in this run, if determined yet.
+        with self._lock:
+            return self._section_syncs.get(secrets.host_url)
+
+    def _check_sections(
+        self,
+        instance_config: SonarrInstanceConfig,
+        secrets: SonarrSecrets,
+        sections: Mapping[str, Mapping[str, Any]],
+    ) -> Dict[str, Any]:
+        # Get the local configuration of the sections whose fingerprint (local configuration hash,
+        # and digests of the remote resources they read) matches the given section states.
+        matched: Dict[str, Any] = {}
+        for section_name, section_state in sections.items():
+            local_section = getattr(instance_config.settings, section_name, None)
+            if local_section is None:
+                continue
+            if section_state.get("local") != get_config_hash(
+                local_section,
+                secrets.api_key.get_secret_value(),
+            ):
+                continue
+            try:
+                if all(
+                    get_read_digest(secrets, api_url) == digest
+                    for api_url, digest in section_state.get("remote", {}).items()
+                ):
+                    matched[section_name] = local_section.model_copy(deep=True)
+            except SonarrAPIError as err:
+                logger.debug("Unable to check section '%s': %s", section_name, err)
+        return matched
+
+    def _save_section_sync(
+        self,
+        instance_config: SonarrInstanceConfig,
+        secrets: SonarrSecrets,
+    ) -> None:
+        # Save the state of the settings sections found to be up to date in this run,
+        # using the digests of the resources as the sections read them during the run.
+        # Sections that made changes are checked in full on the next run, to confirm
+        # that the changes were applied.
+        sync_state = get_sync_state()
+        section_sync = self._get_section_sync_if_exists(secrets)
+        if sync_state is None or section_sync is None:
+            return
+        previous_sections = sync_state.get_sections(secrets.host_url, secrets.version)
+        sections: Dict[str, Dict[str, Any]] = {}
+        for section_name in type(instance_config.settings).model_fields.keys():
+            if section_name in section_sync.skipped:
+                if section_name in previous_sections:
+                    sections[section_name] = previous_sections[section_name]
+                continue
+            if section_name in section_sync.changed or section_name not in section_sync.reads:
+                continue
+            sections[section_name] = {
+                "local": get_config_hash(
+                    getattr(instance_config.settings, section_name),
+                    secrets.api_key.get_secret_value(),
+                ),
+                "remote": dict(sorted(section_sync.reads[section_name].items())),
+            }
+        sync_state.set_sections(secrets.host_url, secrets.version, sections)
+        # Sections that had to be changed to match the local configuration have drifted.
+        # Sections that were only checked in full (e.g. because they changed in the last run)
+        # have not, unless they had to be changed again.
+        if secrets.host_url not in sync_state.paused:
+            sync_state.drifted[secrets.host_url] = set(section_sync.changed)
+
+    def _save_run_files(
+        self,
+        stage: str,
+        planner: Optional[SonarrPlanner],
+    ) -> Optional[Exception]:
+        # Metrics, recorded API cassettes, change plans and profiles accumulate
+        # over the whole run, so saving them after every stage leaves complete files
+        # once the run ends. All of them are saved even if one fails,
+        # and the first error is returned.
+        save_error: Optional[Exception] = None
+        for save in (
+            write_metrics_report,
+            save_cassette,
+            *((planner.save,) if planner is not None else ()),
+            write_profile,
+        ):
+            try:
+                save()
+            except Exception as err:  # noqa: BLE001
+                logger.error("%s: unable to save run files: %s", stage, err)
+                if save_error is None:
+                    save_error = err
+        return save_error
+
+    @contextmanager
+    def _stage(self, stage: str, secrets: SonarrSecrets) -> Generator[None, None, None]:
+        # Secrets are fetched for all instances before any stage is run.
+        clear_prefetched_secrets()
+        with self._lock:
+            try:
+                snapshot = self._snapshots[secrets.host_url]
+            except KeyError:
+                snapshot = self._snapshots[secrets.host_url] = SonarrSnapshot(secrets.host_url)
+        planner = get_planner()
+        with use_snapshot(snapshot), api_cache(), transfer_accounting() as accounting:
+            try:
+                with use_plan(planner.get_plan(secrets.host_url) if planner else None):
+                    with profile(stage):
+                        yield
+            except BaseException:
+                # Failing to save the run files must not hide the error the stage failed with.
+                self._save_run_files(stage, planner)
+                raise
+            save_error = self._save_run_files(stage, planner)
+            if save_error is not None:
+                raise save_error
+            for section, stats in sorted(accounting.sections.items()):
+                logger.debug(
+                    "%s: %s: %i requests, %i bytes sent, %i bytes received (%i bytes decoded)",
+                    stage,
+                    section or "(no section)",
+                    stats.requests,
+                    stats.sent_bytes,
+                    stats.received_bytes,
+                    stats.decoded_bytes,
+                )
+            logger.debug(
+                "%s: remote snapshot: %i hits, %i misses",
+                stage,
+                snapshot.hits,
+                snapshot.misses,
+            )
+            total = accounting.total
+            logger.debug(
+                "%s: %i requests, %i bytes sent, %i bytes received "
+                "(%i bytes decoded, compression ratio %.2f)",
+                stage,
+                total.requests,
+                total.sent_bytes,
+                total.received_bytes,
+                total.decoded_bytes,
+                total.compression_ratio,
+            )
+            for host_url, limiter_stats in get_limiter_stats().items():
+                logger.debug(
+                    "%s: %s: concurrency limit %i (max %i in flight, %i throttle events)",
+                    stage,
+                    host_url,
+                    limiter_stats.limit,
+                    limiter_stats.max_in_flight,
+                    limiter_stats.throttle_events,
+                )
@@ -0,0 +1,400 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin API request metrics.
+
+Every API request is recorded against its endpoint (e.g. `PUT /api/v3/indexer/{id}`)
+and the configuration section that sent it (e.g. `sonarr.settings.indexers`).
+The metrics can be written out as a JSON report, and as a Prometheus textfile
+for the node exporter textfile collector.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Tuple
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    from typing import Any, Optional, Union
+
+
+logger = getLogger(__name__)
+
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+"""
+Upper bounds (in seconds) of the request latency histogram buckets.
+"""
+
+PROMETHEUS_PREFIX = "buildarr_sonarr"
+
+ENDPOINT_ID_PATTERN = re.compile(r"/\d+(?=/|$)")
+
+
+def get_endpoint(method: str, url: str) -> str:
+    """
+    Get the endpoint an API request was sent to, with resource IDs replaced with `{id}`.
+
+    Args:
+        method (str): HTTP method of the request.
+        url (str): Request URL.
+
+    Returns:
+        Endpoint name (e.g. `PUT /api/v3/indexer/{id}`)
+    """
+
+    return f"{method} {ENDPOINT_ID_PATTERN.sub('/{id}', urlparse(url).path)}"
+
+
+@dataclass
+class SonarrRequestMetrics:
+    """
+    Metrics for a group of Sonarr API requests.
+    """
+
+    requests: int = 0
+    """
+    Number of requests sent, including retries.
+    """
+
+    status_codes: Dict[str, int] = field(default_factory=dict)
+    """
+    Number of responses per status code. Requests that failed to get a response
+    (e.g. due to connection errors) are counted under `error`.
+    """
+
+    latency_sum: float = 0.0
+    """
+    Total time (in seconds) spent waiting for responses.
+    """
+
+    latency_buckets: List[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    """
+    Number of requests per latency histogram bucket (see `LATENCY_BUCKETS`),
+    not including requests slower than the largest bucket.
+    """
+
+    sent_bytes: int = 0
+    """
+    Request body bytes sent.
+    """
+
+    received_bytes: int = 0
+    """
+    Response body bytes received (before decompression).
+    """
+
+    def add_request(self, status: str, latency: float) -> None:
+        """
+        Add a request to the metrics.
+
+        Args:
+            status (str): Response status code, or `error` if no response was received.
+            latency (float): Request latency, in seconds.
+        """
+        self.requests += 1
+        self.status_codes[status] = self.status_codes.get(status, 0) + 1
+        self.latency_sum += latency
+        bucket = bisect_left(LATENCY_BUCKETS, latency)
+        if bucket < len(LATENCY_BUCKETS):
+            self.latency_buckets[bucket] += 1
+
+    def add_transfer(self, sent_bytes: int, received_bytes: int) -> None:
+        """
+        Add the data transferred by a request to the metrics.
+
+        Args:
+            sent_bytes (int): Request body bytes sent.
+            received_bytes (int): Response body bytes received.
+        """
+        self.sent_bytes += sent_bytes
+        self.received_bytes += received_bytes
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the metrics as a JSON-serialisable dictionary.
+
+        Returns:
+            Metrics dictionary
+        """
+        return {
+            "requests": self.requests,
+            "status_codes": dict(sorted(self.status_codes.items())),
+            "latency_sum": round(self.latency_sum, 6),
+            "latency_buckets": {
+                str(le): count for le, count in zip(LATENCY_BUCKETS, self.latency_buckets)
+            },
+            "sent_bytes": self.sent_bytes,
+            "received_bytes": self.received_bytes,
+        }
+
+
+class SonarrMetrics:
+    """
+    Sonarr API request metrics, grouped by endpoint and by configuration section.
+    """
+
+    def __init__(self) -> None:
+        self.endpoints: Dict[str, SonarrRequestMetrics] = {}
+        self.sections: Dict[str, SonarrRequestMetrics] = {}
+        self._lock = threading.Lock()
+
+    def record_request(
+        self,
+        section: str,
+        method: str,
+        url: str,
+        status_code: Optional[int],
+        latency: float,
+    ) -> None:
+        """
+        Record a sent API request.
+
+        Args:
+            section (str): Configuration section that sent the request.
+            method (str): HTTP method of the request.
+            url (str): Request URL.
+            status_code (Optional[int]): Response status code, or `None` if no response.
+            latency (float): Request latency, in seconds.
+        """
+        status = str(status_code) if status_code is not None else "error"
+        endpoint = get_endpoint(method, url)
+        with self._lock:
+            self._get(self.endpoints, endpoint).add_request(status, latency)
+            self._get(self.sections, section).add_request(status, latency)
+
+    def record_transfer(
+        self,
+        section: str,
+        method: str,
+        url: str,
+        sent_bytes: int,
+        received_bytes: int,
+    ) -> None:
+        """
+        Record the data transferred by an API request.
+
+        Args:
+            section (str): Configuration section that sent the request.
+            method (str): HTTP method of the request.
+            url (str): Request URL.
+            sent_bytes (int): Request body bytes sent.
+            received_bytes (int): Response body bytes received.
+        """
+        endpoint = get_endpoint(method, url)
+        with self._lock:
+            self._get(self.endpoints, endpoint).add_transfer(sent_bytes, received_bytes)
+            self._get(self.sections, section).add_transfer(sent_bytes, received_bytes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the metrics as a JSON-serialisable dictionary.
+
+        Returns:
+            Metrics dictionary
+        """
+        with self._lock:
+            return {
+                "endpoints": {
+                    endpoint: metrics.to_dict()
+                    for endpoint, metrics in sorted(self.endpoints.items())
+                },
+                "sections": {
+                    section: metrics.to_dict() for section, metrics in sorted(self.sections.items())
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Return the metrics in the Prometheus text exposition format.
+
+        Returns:
+            Prometheus metrics
+        """
+        with self._lock:
+            endpoints: List[Tuple[Dict[str, str], SonarrRequestMetrics]] = []
+            for endpoint, metrics in sorted(self.endpoints.items()):
+                method, path = endpoint.split(" ", 1)
+                endpoints.append(({"method": method, "endpoint": path}, metrics))
+            sections = [
+                ({"section": section}, metrics)
+                for section, metrics in sorted(self.sections.items())
+            ]
+            return "".join(
+                (
+                    _prometheus_metrics(f"{PROMETHEUS_PREFIX}_api", endpoints),
+                    _prometheus_metrics(f"{PROMETHEUS_PREFIX}_section", sections),
+                ),
+            )
+
+    @staticmethod
+    def _get(metrics: Dict[str, SonarrRequestMetrics], key: str) -> SonarrRequestMetrics:
+        try:
+            return metrics[key]
+        except KeyError:
+            request_metrics = metrics[key] = SonarrRequestMetrics()
+            return request_metrics
+
+
+def _prometheus_labels(labels: Dict[str, str]) -> str:
+    return ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in labels.items()
+    )
+
+
+def _prometheus_metrics(
+    prefix: str,
+    groups: List[Tuple[Dict[str, str], SonarrRequestMetrics]],
+) -> str:
+    lines = [
+        f"# HELP {prefix}_requests_total Number of Sonarr API requests sent.",
+        f"# TYPE {prefix}_requests_total counter",
+    ]
+    for labels, metrics in groups:
+        for status, count in sorted(metrics.status_codes.items()):
+            lines.append(
+                f"{prefix}_requests_total{{{_prometheus_labels({**labels, 'status': status})}}} "
+                f"{count}",
+            )
+    lines.extend(
+        (
+            f"# HELP {prefix}_request_duration_seconds Sonarr API request latency.",
+            f"# TYPE {prefix}_request_duration_seconds histogram",
+        ),
+    )
+    for labels, metrics in groups:
+        cumulative = 0
+        for le, count in zip(LATENCY_BUCKETS, metrics.latency_buckets):
+            cumulative += count
+            lines.append(
+                f"{prefix}_request_duration_seconds_bucket"
+                f"{{{_prometheus_labels({**labels, 'le': str(le)})}}} {cumulative}",
+            )
+        lines.extend(
+            (
+                f"{prefix}_request_duration_seconds_bucket"
+                f"{{{_prometheus_labels({**labels, 'le': '+Inf'})}}} {metrics.requests}",
+                f"{prefix}_request_duration_seconds_sum{{{_prometheus_labels(labels)}}} "
+                f"{metrics.latency_sum:.6f}",
+                f"{prefix}_request_duration_seconds_count{{{_prometheus_labels(labels)}}} "
+                f"{metrics.requests}",
+            ),
+        )
+    for name, description in (
+        ("sent_bytes", "Sonarr API request body bytes sent."),
+        ("received_bytes", "Sonarr API response body bytes received."),
+    ):
+        lines.extend(
+            (
+                f"# HELP {prefix}_{name}_total {description}",
+                f"# TYPE {prefix}_{name}_total counter",
+            ),
+        )
+        for labels, metrics in groups:
+            lines.append(
+                f"{prefix}_{name}_total{{{_prometheus_labels(labels)}}} {getattr(metrics, name)}",
+            )
+    return "\n".join(lines) + "\n"
+
+
+def _write_file(path: Path, content: str, description: str) -> None:
+    # Write the file atomically, so that readers (e.g. the node exporter)
+    # never see a partially written file.
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.tmp")
+        temp_path.write_text(content, encoding="utf-8")
+        temp_path.replace(path)
+    except OSError as err:
+        logger.warning("Unable to write %s '%s': %s", description, path, err)
+    else:
+        logger.debug("Wrote %s to '%s'", description, path)
+
+
+_metrics = SonarrMetrics()
+_metrics_file: Optional[Path] = None
+_metrics_prometheus_file: Optional[Path] = None
+
+
+def get_metrics() -> SonarrMetrics:
+    """
+    Get the API request metrics recorded in this Buildarr run.
+
+    Returns:
+        Sonarr API metrics object
+    """
+
+    return _metrics
+
+
+def reset_metrics() -> None:
+    """
+    Discard all recorded API request metrics.
+    """
+
+    global _metrics  # noqa: PLW0603
+
+    _metrics = SonarrMetrics()
+
+
+def configure_metrics_report(
+    json_path: Optional[Union[str, os.PathLike]] = None,
+    prometheus_path: Optional[Union[str, os.PathLike]] = None,
+) -> None:
+    """
+    Set the files to write the API request metrics report to.
+
+    Args:
+        json_path (Optional[Union[str, os.PathLike]]): JSON report file path.
+        prometheus_path (Optional[Union[str, os.PathLike]]): Prometheus textfile path.
+    """
+
+    global _metrics_file, _metrics_prometheus_file  # noqa: PLW0603
+
+    _metrics_file = Path(json_path) if json_path else None
+    _metrics_prometheus_file = Path(prometheus_path) if prometheus_path else None
+
+
+def write_metrics_report() -> None:
+    """
+    Write the API request metrics recorded so far to the configured report files, if any.
+    """
+
+    metrics = get_metrics()
+    if _metrics_file:
+        _write_file(
+            _metrics_file,
+            json.dumps(metrics.to_dict(), indent=2) + "\n",
+            "API metrics report",
+        )
+    if _metrics_prometheus_file:
+        _write_file(
+            _metrics_prometheus_file,
+            metrics.to_prometheus(),
+            "API metrics Prometheus textfile",
+        )
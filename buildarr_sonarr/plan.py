@@ -0,0 +1,550 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin change plans.
+
+When planning is enabled, configuration sections compute their changes as usual,
+but instead of being sent to the instance, every API write (`POST`, `PUT` and `DELETE`)
+is recorded to a change plan, in the order it would have been sent.
+The plans for all instances are saved to a JSON file, which can be reviewed,
+and then applied later using the `buildarr sonarr apply-plan` command.
+
+Each plan contains a fingerprint of the remote state it was computed against,
+made from a digest of every resource read from the instance while planning.
+Before a plan is applied, the resources are read again, and the plan is rejected
+if any of them have changed.
+
+Resources created by a plan do not have an ID until the plan is applied,
+so they are given placeholder IDs while planning. Placeholder IDs referenced
+by later writes are replaced with the real IDs as the plan is applied.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import copy
+import hashlib
+import json
+import re
+import threading
+
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List
+
+from .exceptions import SonarrPlanError
+
+if TYPE_CHECKING:
+    import os
+
+    from typing import Any, Generator, Mapping, Optional, Union
+
+
+logger = getLogger(__name__)
+
+
+PLAN_VERSION = 1
+
+PLACEHOLDER_ID_BASE = -(2**31)
+"""
+First placeholder ID given to resources created by a plan.
+
+Placeholder IDs count up from the smallest 32-bit integer,
+so they can never be mistaken for the ID of an existing resource
+(or special values such as `-1`).
+"""
+
+VOLATILE_FIELDS = frozenset(("freeSpace", "totalSpace", "unmappedFolders"))
+"""
+Attributes ignored when fingerprinting resources, as they change without
+any change to the instance configuration (e.g. root folder free space).
+"""
+
+_PLACEHOLDER_ID_SEGMENT_PATTERN = re.compile(r"(?<=/)-\d+(?=/|\?|$)")
+
+
+def get_digest(res_json: Any) -> str:
+    """
+    Get a digest of a resource read from an instance, ignoring volatile attributes.
+
+    Args:
+        res_json (Any): Response object.
+
+    Returns:
+        Resource digest
+    """
+
+    return hashlib.sha256(_dump_digest_json(res_json)).hexdigest()[:16]
+
+
+class SonarrListDigest:
+    """
+    Digest of a list resource, computed one item at a time
+    (e.g. while the list is being streamed from the instance).
+
+    The result is the same as the digest of the whole list from `get_digest`.
+    """
+
+    def __init__(self) -> None:
+        self._hash = hashlib.sha256(b"[")
+        self._num_items = 0
+
+    def add(self, item: Any) -> None:
+        """
+        Add the next item in the list to the digest.
+
+        Args:
+            item (Any): List item.
+        """
+        if self._num_items:
+            self._hash.update(b",")
+        self._hash.update(_dump_digest_json(item))
+        self._num_items += 1
+
+    def get_digest(self) -> str:
+        """
+        Get the digest of the items added so far, as a complete list.
+
+        Returns:
+            Resource digest
+        """
+        res_hash = self._hash.copy()
+        res_hash.update(b"]")
+        return res_hash.hexdigest()[:16]
+
+
+def _dump_digest_json(value: Any) -> bytes:
+    return json.dumps(
+        _strip_volatile_fields(value),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+
+def _strip_volatile_fields(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _strip_volatile_fields(v) for k, v in value.items() if k not in VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [_strip_volatile_fields(v) for v in value]
+    return value
+
+
+def resolve_placeholder_ids(value: Any, ids: Mapping[int, int]) -> Any:
+    """
+    Replace placeholder IDs in a request body with the IDs of the created resources.
+
+    Only ID attributes (`id`, attributes ending with `Id` or `Ids`, and `tags`)
+    are checked for placeholder IDs.
+
+    Args:
+        value (Any): Request body.
+        ids (Mapping[int, int]): Real resource IDs, by placeholder ID.
+
+    Returns:
+        Request body with placeholder IDs replaced
+    """
+
+    if isinstance(value, dict):
+        return {
+            k: (
+                _resolve_id(v, ids)
+                if k == "id" or k.endswith(("Id", "Ids")) or k == "tags"
+                else resolve_placeholder_ids(v, ids)
+            )
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [resolve_placeholder_ids(v, ids) for v in value]
+    return value
+
+
+def _resolve_id(value: Any, ids: Mapping[int, int]) -> Any:
+    if isinstance(value, list):
+        return [_resolve_id(v, ids) for v in value]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return ids.get(value, value)
+    return resolve_placeholder_ids(value, ids)
+
+
+def resolve_placeholder_api_url(api_url: str, ids: Mapping[int, int]) -> str:
+    """
+    Replace placeholder IDs in the path of an API command with the IDs of the created resources.
+
+    Args:
+        api_url (str): API command (e.g. `/api/v3/tag/-2147483648`).
+        ids (Mapping[int, int]): Real resource IDs, by placeholder ID.
+
+    Returns:
+        API command with placeholder IDs replaced
+    """
+
+    return _PLACEHOLDER_ID_SEGMENT_PATTERN.sub(
+        lambda match: str(ids.get(int(match.group(0)), match.group(0))),
+        api_url,
+    )
+
+
+@dataclass
+class SonarrPlannedWrite:
+    """
+    API write recorded to a change plan.
+    """
+
+    method: str
+    """
+    HTTP method of the request (`POST`, `PUT` or `DELETE`).
+    """
+
+    api_url: str
+    """
+    API command the request is sent to.
+    """
+
+    body: Any = None
+    """
+    Request body, if any.
+    """
+
+    expected_status_code: int = 200
+    """
+    Expected response status.
+    """
+
+    section: str = ""
+    """
+    Configuration section the write was made by (e.g. `sonarr.settings.tags`).
+    """
+
+    placeholder_id: Optional[int] = None
+    """
+    Placeholder ID given to the resource created by this write, if any.
+    """
+
+
+@dataclass
+class SonarrPlan:
+    """
+    Ordered list of API writes pending on a Sonarr instance,
+    and the remote state they were computed against.
+    """
+
+    host_url: str
+    """
+    Sonarr instance URL.
+    """
+
+    reads: Dict[str, str] = field(default_factory=dict)
+    """
+    Digests of the resources read from the instance while planning, by API command.
+    """
+
+    writes: List[SonarrPlannedWrite] = field(default_factory=list)
+    """
+    API writes to send to the instance, in order.
+    """
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Fingerprint of the remote state the plan was computed against.
+        """
+        return hashlib.sha256(
+            json.dumps(sorted(self.reads.items()), separators=(",", ":")).encode("utf-8"),
+        ).hexdigest()[:16]
+
+    def record_read(self, api_url: str, res_json: Any) -> None:
+        """
+        Record a resource read from the instance.
+
+        Only the first read of each resource is recorded, as it reflects
+        the remote state before any planned writes.
+
+        Args:
+            api_url (str): API command the resource was read from.
+            res_json (Any): Response object.
+        """
+        with self._lock:
+            if api_url not in self.reads:
+                self.reads[api_url] = get_digest(res_json)
+
+    def record_read_digest(self, api_url: str, digest: str) -> None:
+        """
+        Record the digest of a resource read from the instance,
+        for resources that were not loaded into memory in full (e.g. streamed lists).
+
+        Only the first read of each resource is recorded.
+
+        Args:
+            api_url (str): API command the resource was read from.
+            digest (str): Digest of the resource.
+        """
+        with self._lock:
+            self.reads.setdefault(api_url, digest)
+
+    def record_write(
+        self,
+        method: str,
+        api_url: str,
+        req: Any,
+        expected_status_code: int,
+        section: str = "",
+    ) -> Any:
+        """
+        Record an API write, instead of sending it to the instance.
+
+        Args:
+            method (str): HTTP method of the request.
+            api_url (str): API command.
+            req (Any): Request body (JSON-serialisable), if any.
+            expected_status_code (int): Expected response status.
+            section (str, optional): Configuration section making the write.
+
+        Returns:
+            Response the instance is expected to return
+        """
+        write = SonarrPlannedWrite(
+            method=method,
+            api_url=api_url,
+            body=copy.deepcopy(req),
+            expected_status_code=int(expected_status_code),
+            section=section,
+        )
+        res_json: Any = copy.deepcopy(req)
+        with self._lock:
+            if method == "POST" and isinstance(req, dict):
+                write.placeholder_id = PLACEHOLDER_ID_BASE + sum(
+                    1 for w in self.writes if w.placeholder_id is not None
+                )
+                res_json = {**res_json, "id": write.placeholder_id}
+            self.writes.append(write)
+        logger.debug("%s %s (planned)", method, api_url)
+        return res_json if method != "DELETE" else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the plan as a JSON-serialisable object.
+
+        Returns:
+            Plan object
+        """
+        with self._lock:
+            return {
+                "host_url": self.host_url,
+                "fingerprint": self.fingerprint,
+                "reads": dict(self.reads),
+                "writes": [asdict(write) for write in self.writes],
+            }
+
+    @classmethod
+    def from_dict(cls, plan: Mapping[str, Any]) -> SonarrPlan:
+        """
+        Create a plan from a plan object.
+
+        Args:
+            plan (Mapping[str, Any]): Plan object, as returned by `to_dict`.
+
+        Raises:
+            SonarrPlanError: If the plan object is invalid, or its fingerprint does not match.
+
+        Returns:
+            Plan
+        """
+        try:
+            instance = cls(
+                host_url=plan["host_url"],
+                reads=dict(plan["reads"]),
+                writes=[SonarrPlannedWrite(**write) for write in plan["writes"]],
+            )
+            fingerprint = plan["fingerprint"]
+        except (KeyError, TypeError, ValueError) as err:
+            raise SonarrPlanError(f"Invalid change plan: {err!r}") from None
+        if fingerprint != instance.fingerprint:
+            raise SonarrPlanError(
+                f"Invalid change plan for '{instance.host_url}': fingerprint mismatch",
+            )
+        return instance
+
+
+def save_plans(path: Union[str, os.PathLike], plans: List[SonarrPlan]) -> None:
+    """
+    Save change plans to a file.
+
+    Args:
+        path (Union[str, os.PathLike]): Plan file path.
+        plans (List[SonarrPlan]): Plans to save.
+    """
+
+    path = Path(path)
+    data = json.dumps(
+        {"version": PLAN_VERSION, "plans": [plan.to_dict() for plan in plans]},
+        indent=2,
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.tmp")
+    temp_path.write_text(data, encoding="utf-8")
+    temp_path.replace(path)
+    logger.debug("Saved change plans to '%s'", path)
+
+
+def load_plans(path: Union[str, os.PathLike]) -> List[SonarrPlan]:
+    """
+    Load change plans from a file.
+
+    Args:
+        path (Union[str, os.PathLike]): Plan file path.
+
+    Raises:
+        SonarrPlanError: If the plan file could not be read, or is invalid.
+
+    Returns:
+        Loaded plans
+    """
+
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as err:
+        raise SonarrPlanError(f"Unable to load change plan file '{path}': {err}") from None
+    if not isinstance(data, dict) or data.get("version") != PLAN_VERSION:
+        raise SonarrPlanError(
+            f"Unsupported change plan file version in '{path}': "
+            f"{data.get('version') if isinstance(data, dict) else None}",
+        )
+    return [SonarrPlan.from_dict(plan) for plan in data.get("plans", [])]
+
+
+class SonarrPlanner:
+    """
+    Change plans being recorded for the instances updated in a Buildarr run.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]) -> None:
+        self.path = Path(path)
+        self.plans: Dict[str, SonarrPlan] = {}
+        self._lock = threading.Lock()
+
+    def get_plan(self, host_url: str) -> SonarrPlan:
+        """
+        Get the change plan for an instance, creating it if it does not exist.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+
+        Returns:
+            Change plan
+        """
+        with self._lock:
+            try:
+                return self.plans[host_url]
+            except KeyError:
+                plan = self.plans[host_url] = SonarrPlan(host_url=host_url)
+                return plan
+
+    def save(self) -> None:
+        """
+        Save the change plans recorded so far to the plan file.
+        """
+        with self._lock:
+            plans = list(self.plans.values())
+        save_plans(self.path, plans)
+
+
+_planner: Optional[SonarrPlanner] = None
+
+_plan: contextvars.ContextVar[Optional[SonarrPlan]] = contextvars.ContextVar(
+    "_plan",
+    default=None,
+)
+
+
+def get_planner() -> Optional[SonarrPlanner]:
+    """
+    Get the active change planner.
+
+    Returns:
+        Active planner, or `None` if planning is disabled
+    """
+
+    return _planner
+
+
+def enable_planning(path: Union[str, os.PathLike]) -> SonarrPlanner:
+    """
+    Record API writes to change plans saved to the given file, instead of sending them.
+
+    Args:
+        path (Union[str, os.PathLike]): Plan file path.
+
+    Returns:
+        Active planner
+    """
+
+    global _planner  # noqa: PLW0603
+
+    _planner = SonarrPlanner(path)
+    logger.info("Recording changes to plan file '%s' (changes will not be applied)", path)
+    return _planner
+
+
+def disable_planning() -> None:
+    """
+    Stop recording API writes to change plans.
+    """
+
+    global _planner  # noqa: PLW0603
+
+    _planner = None
+
+
+def get_plan(host_url: str) -> Optional[SonarrPlan]:
+    """
+    Get the active change plan for a Sonarr instance.
+
+    Args:
+        host_url (str): Sonarr instance URL.
+
+    Returns:
+        Active plan, or `None` if there is no plan being recorded for the instance
+    """
+
+    plan = _plan.get()
+    if plan is None or plan.host_url != host_url:
+        return None
+    return plan
+
+
+@contextmanager
+def use_plan(plan: Optional[SonarrPlan]) -> Generator[Optional[SonarrPlan], None, None]:
+    """
+    Record API reads and writes to the given change plan for the duration of the context.
+
+    Args:
+        plan (Optional[SonarrPlan]): Plan of the instance API requests are sent to,
+            or `None` to send requests as normal.
+
+    Yields:
+        Active plan
+    """
+
+    token = _plan.set(plan)
+    try:
+        yield plan
+    finally:
+        _plan.reset(token)
@@ -0,0 +1,408 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin run profiler.
+
+When profiling is enabled, the time spent in each stage of a run, each settings section
+(e.g. `sonarr.settings.indexers`) and each definition within a section
+(e.g. `sonarr.settings.indexers.definitions['Nyaa']`) is recorded, together with
+the time spent waiting on API requests, the number of API requests sent,
+and the amount of data transferred.
+
+Time not spent waiting on API requests is local processing time: decoding API objects,
+constructing configuration models, and comparing local and remote configuration.
+
+The profile is output as a table sorted by wall time, and as a file in the
+[speedscope](https://www.speedscope.app) format, which can be viewed as a flame graph.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from .metrics import get_endpoint
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Generator, Optional, Union
+
+
+logger = getLogger(__name__)
+
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+@dataclass
+class SonarrProfileStats:
+    """
+    Profiling statistics for a stage, section or definition.
+
+    All statistics are inclusive of any nested sections or definitions.
+    """
+
+    calls: int = 0
+    """
+    Number of times the stage, section or definition was processed.
+    """
+
+    wall_time: float = 0.0
+    """
+    Total time (in seconds) spent processing.
+    """
+
+    http_time: float = 0.0
+    """
+    Total time (in seconds) spent waiting on API requests.
+    """
+
+    requests: int = 0
+    """
+    Number of API requests sent.
+    """
+
+    sent_bytes: int = 0
+    """
+    Request body bytes sent.
+    """
+
+    received_bytes: int = 0
+    """
+    Response body bytes received.
+    """
+
+    @property
+    def local_time(self) -> float:
+        """
+        Total time (in seconds) spent on local processing, i.e. not waiting on API requests.
+        """
+        return max(0.0, self.wall_time - self.http_time)
+
+
+@dataclass
+class _Frame:
+    # A stage, section, definition or API request being processed.
+    name: str
+    parent: Optional[_Frame]
+    start: float
+    http: bool = False
+
+
+class SonarrProfiler:
+    """
+    Profiler recording the time spent processing each stage, section and definition.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock = clock
+        self.start_time = clock()
+        self.stats: Dict[str, SonarrProfileStats] = {}
+        """
+        Profiling statistics, by stage name or configuration tree.
+        """
+        self._frame_names: Dict[str, int] = {}
+        self._events: List[Tuple[str, List[Tuple[str, int, float]]]] = []
+        # Events are recorded separately for every thread, even if thread names repeat
+        # (e.g. the worker threads of the section pools of concurrently updated instances).
+        self._thread_events = threading.local()
+        self._lock = threading.Lock()
+
+    def open_frame(self, frame: _Frame) -> None:
+        """
+        Record the start of processing a stage, section, definition or API request.
+
+        Args:
+            frame (_Frame): Frame being processed.
+        """
+        with self._lock:
+            self._record_event("O", frame.name, frame.start)
+            if not frame.http:
+                self._get(frame.name).calls += 1
+
+    def close_frame(self, frame: _Frame, end: float) -> None:
+        """
+        Record the end of processing a stage, section, definition or API request,
+        adding its time to the frame, and any frames it is nested in.
+
+        Args:
+            frame (_Frame): Frame being processed.
+            end (float): Time processing finished.
+        """
+        duration = end - frame.start
+        with self._lock:
+            self._record_event("C", frame.name, end)
+            if frame.http:
+                for parent in _get_parents(frame):
+                    stats = self._get(parent.name)
+                    stats.http_time += duration
+                    stats.requests += 1
+            else:
+                self._get(frame.name).wall_time += duration
+
+    def record_transfer(
+        self,
+        frame: Optional[_Frame],
+        sent_bytes: int,
+        received_bytes: int,
+    ) -> None:
+        """
+        Record the data transferred by an API request.
+
+        Args:
+            frame (Optional[_Frame]): Frame the API request was sent from.
+            sent_bytes (int): Request body bytes sent.
+            received_bytes (int): Response body bytes received.
+        """
+        with self._lock:
+            for parent in _get_parents(frame):
+                stats = self._get(parent.name)
+                stats.sent_bytes += sent_bytes
+                stats.received_bytes += received_bytes
+
+    def to_table(self) -> str:
+        """
+        Format the profiling statistics as a table, sorted by wall time.
+
+        Returns:
+            Profiling statistics table
+        """
+        rows = [("TREE", "CALLS", "WALL", "HTTP", "LOCAL", "REQUESTS", "SENT", "RECEIVED")]
+        with self._lock:
+            for name, stats in sorted(
+                self.stats.items(),
+                key=lambda item: (-item[1].wall_time, item[0]),
+            ):
+                rows.append(
+                    (
+                        name,
+                        str(stats.calls),
+                        f"{stats.wall_time:.3f}s",
+                        f"{stats.http_time:.3f}s",
+                        f"{stats.local_time:.3f}s",
+                        str(stats.requests),
+                        str(stats.sent_bytes),
+                        str(stats.received_bytes),
+                    ),
+                )
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return "\n".join(
+            "  ".join(
+                [
+                    value.ljust(width) if i == 0 else value.rjust(width)
+                    for i, (value, width) in enumerate(zip(row, widths))
+                ],
+            )
+            for row in rows
+        )
+
+    def to_speedscope(self, name: str = "buildarr-sonarr") -> Dict[str, Any]:
+        """
+        Return the recorded profile in the speedscope file format.
+
+        Every thread that processed a stage, section or definition has its own profile.
+
+        Args:
+            name (str, optional): Profile name.
+
+        Returns:
+            Speedscope profile, as a JSON-serialisable dictionary
+        """
+        with self._lock:
+            frames = sorted(self._frame_names.items(), key=lambda item: item[1])
+            profiles = [
+                {
+                    "type": "evented",
+                    "name": thread_name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": events[-1][2] if events else 0,
+                    "events": [
+                        {"type": event_type, "frame": frame_index, "at": at}
+                        for event_type, frame_index, at in events
+                    ],
+                }
+                for thread_name, events in self._events
+            ]
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "buildarr-sonarr",
+            "activeProfileIndex": 0,
+            "shared": {"frames": [{"name": frame_name} for frame_name, _ in frames]},
+            "profiles": profiles,
+        }
+
+    def _get(self, name: str) -> SonarrProfileStats:
+        try:
+            return self.stats[name]
+        except KeyError:
+            stats = self.stats[name] = SonarrProfileStats()
+            return stats
+
+    def _record_event(self, event_type: str, name: str, at: float) -> None:
+        try:
+            frame_index = self._frame_names[name]
+        except KeyError:
+            frame_index = self._frame_names[name] = len(self._frame_names)
+        try:
+            events = self._thread_events.events
+        except AttributeError:
+            events = self._thread_events.events = []
+            self._events.append((threading.current_thread().name, events))
+        events.append((event_type, frame_index, max(0.0, at - self.start_time)))
+
+
+def _get_parents(frame: Optional[_Frame]) -> Generator[_Frame, None, None]:
+    # Get the non-API request frames a frame is nested in, including the frame itself.
+    while frame is not None:
+        if not frame.http:
+            yield frame
+        frame = frame.parent
+
+
+_profiler: Optional[SonarrProfiler] = None
+_profile_file: Optional[Path] = None
+_frame: contextvars.ContextVar[Optional[_Frame]] = contextvars.ContextVar("_frame", default=None)
+
+
+def get_profiler() -> Optional[SonarrProfiler]:
+    """
+    Get the active run profiler.
+
+    Returns:
+        Run profiler, or `None` if profiling is disabled
+    """
+
+    return _profiler
+
+
+def enable_profiling(path: Optional[Union[str, os.PathLike]] = None) -> SonarrProfiler:
+    """
+    Start profiling, discarding any previously recorded profile.
+
+    Args:
+        path (Optional[Union[str, os.PathLike]], optional): File to write the profile to
+            in the speedscope format. The profiling statistics table is written
+            to the same path with the `.txt` suffix.
+
+    Returns:
+        Run profiler
+    """
+
+    global _profiler, _profile_file  # noqa: PLW0603
+
+    _profiler = SonarrProfiler()
+    _profile_file = Path(path) if path else None
+    return _profiler
+
+
+def disable_profiling() -> None:
+    """
+    Stop profiling.
+    """
+
+    global _profiler, _profile_file  # noqa: PLW0603
+
+    _profiler = None
+    _profile_file = None
+
+
+def write_profile() -> None:
+    """
+    Write the profile recorded so far to the configured profile files, if any.
+    """
+
+    if _profiler is None or _profile_file is None:
+        return
+    try:
+        _profile_file.parent.mkdir(parents=True, exist_ok=True)
+        _profile_file.write_text(json.dumps(_profiler.to_speedscope()), encoding="utf-8")
+        _profile_file.with_suffix(".txt").write_text(_profiler.to_table() + "\n", encoding="utf-8")
+    except OSError as err:
+        logger.warning("Unable to write profile file '%s': %s", _profile_file, err)
+    else:
+        logger.debug("Wrote profile to '%s'", _profile_file)
+
+
+@contextmanager
+def profile(name: str) -> Generator[None, None, None]:
+    """
+    Record the time spent processing a stage, section or definition within the context.
+
+    Args:
+        name (str): Stage name, or configuration tree
+            (e.g. `sonarr.settings.indexers.definitions['Nyaa']`).
+    """
+
+    with _profile_frame(name, http=False):
+        yield
+
+
+@contextmanager
+def profile_request(method: str, url: str) -> Generator[None, None, None]:
+    """
+    Record the time spent waiting on an API request sent within the context.
+
+    Args:
+        method (str): HTTP method of the request.
+        url (str): Request URL.
+    """
+
+    if _profiler is None:
+        yield
+        return
+    with _profile_frame(get_endpoint(method, url), http=True):
+        yield
+
+
+def record_profile_transfer(sent_bytes: int, received_bytes: int) -> None:
+    """
+    Record the data transferred by an API request against the active profiling frame.
+
+    Args:
+        sent_bytes (int): Request body bytes sent.
+        received_bytes (int): Response body bytes received.
+    """
+
+    if _profiler is not None:
+        _profiler.record_transfer(_frame.get(), sent_bytes, received_bytes)
+
+
+@contextmanager
+def _profile_frame(name: str, http: bool) -> Generator[None, None, None]:
+    # Frames re-entering the frame they are nested in (e.g. a section helper method
+    # called with the section tree) are merged into it, so time is not counted twice.
+    profiler = _profiler
+    parent = _frame.get()
+    if profiler is None or (parent is not None and parent.name == name):
+        yield
+        return
+    frame = _Frame(name=name, parent=parent, start=profiler.clock(), http=http)
+    profiler.open_frame(frame)
+    token = _frame.set(frame)
+    try:
+        yield
+    finally:
+        _frame.reset(token)
+        profiler.close_frame(frame, profiler.clock())
@@ -0,0 +1,297 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin API retry policy and circuit breaker.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from logging import getLogger
+from typing import TYPE_CHECKING, Dict, FrozenSet
+
+from .exceptions import SonarrAPICircuitOpenError
+
+if TYPE_CHECKING:
+    from typing import Optional
+
+
+logger = getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Policy for retrying failed Sonarr API requests.
+
+    Requests using one of the `methods` are retried when the connection fails or times out,
+    or when the response status is one of `status_codes`.
+    The delay between attempts grows exponentially, with random jitter applied
+    so that requests to a recovering instance are spread out.
+    """
+
+    max_retries: int = 3
+    """
+    Maximum number of times to retry a request. Set to `0` to disable retries.
+    """
+
+    backoff_factor: float = 0.5
+    """
+    Base delay (in seconds) between attempts. Doubled for every subsequent retry.
+    """
+
+    backoff_max: float = 30.0
+    """
+    Maximum delay (in seconds) between attempts.
+    """
+
+    methods: FrozenSet[str] = field(
+        default_factory=lambda: frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE")),
+    )
+    """
+    HTTP methods that are safe to retry (i.e. idempotent methods).
+    """
+
+    status_codes: FrozenSet[int] = field(
+        default_factory=lambda: frozenset(
+            (
+                HTTPStatus.TOO_MANY_REQUESTS,
+                HTTPStatus.BAD_GATEWAY,
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                HTTPStatus.GATEWAY_TIMEOUT,
+            ),
+        ),
+    )
+    """
+    Response status codes to retry requests on.
+    """
+
+    def is_retryable(self, method: str, attempt: int) -> bool:
+        """
+        Return whether or not a failed request should be retried.
+
+        Args:
+            method (str): HTTP method of the request.
+            attempt (int): Number of retries already made for the request.
+
+        Returns:
+            `True` if the request should be retried, otherwise `False`
+        """
+        return method in self.methods and attempt < self.max_retries
+
+    def get_backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Get the delay before the next attempt of a request.
+
+        Args:
+            attempt (int): Number of retries already made for the request.
+            retry_after (Optional[str]): `Retry-After` response header value, if any.
+
+        Returns:
+            Delay in seconds
+        """
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), self.backoff_max)
+            except ValueError:
+                pass
+        # "Full jitter" exponential backoff.
+        return random.uniform(  # noqa: S311
+            0,
+            min(self.backoff_factor * (2**attempt), self.backoff_max),
+        )
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for requests to a single Sonarr instance.
+
+    After `failure_threshold` consecutive failures (connection errors, timeouts
+    or server errors), the circuit opens and all further requests to the instance
+    fail immediately, instead of each waiting for the request timeout.
+    After `reset_timeout` seconds, a single trial request is let through:
+    if it succeeds the circuit closes again, otherwise it stays open.
+    """
+
+    def __init__(self, host_url: str, failure_threshold: int, reset_timeout: float) -> None:
+        self.host_url = host_url
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Whether or not the circuit is currently open (i.e. requests are being rejected).
+        """
+        return self.opened_at is not None
+
+    def before_request(self, method: str, url: str) -> None:
+        """
+        Check that a request to the instance is allowed to be sent.
+
+        Args:
+            method (str): HTTP method of the request.
+            url (str): Request URL.
+
+        Raises:
+            SonarrAPICircuitOpenError: If the circuit is open.
+        """
+        if self.failure_threshold < 1:
+            return
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if (
+                not self._trial_in_progress
+                and time.monotonic() - self.opened_at >= self.reset_timeout
+            ):
+                logger.debug("Circuit for '%s' half-open, sending trial request", self.host_url)
+                self._trial_in_progress = True
+                return
+        raise SonarrAPICircuitOpenError(
+            (
+                f"Not sending '{method} {url}': too many consecutive failed requests "
+                f"to the Sonarr instance at '{self.host_url}' "
+                f"(retrying after {self.reset_timeout:g} seconds)"
+            ),
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+        )
+
+    def record_success(self) -> None:
+        """
+        Record a successful request, closing the circuit if it was open.
+        """
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("Sonarr instance at '%s' has recovered", self.host_url)
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self) -> None:
+        """
+        Record a failed request, opening the circuit if the failure threshold was reached.
+        """
+        if self.failure_threshold < 1:
+            return
+        with self._lock:
+            self.failures += 1
+            self._trial_in_progress = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(
+                        (
+                            "Sonarr instance at '%s' failed %i consecutive requests, "
+                            "failing further requests for %g seconds"
+                        ),
+                        self.host_url,
+                        self.failures,
+                        self.reset_timeout,
+                    )
+                self.opened_at = time.monotonic()
+
+
+DEFAULT_CIRCUIT_BREAKER_THRESHOLD = 5
+DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT = 60.0
+
+_retry_policy = RetryPolicy()
+_circuit_breaker_threshold = DEFAULT_CIRCUIT_BREAKER_THRESHOLD
+_circuit_breaker_reset_timeout = DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_retry_policy() -> RetryPolicy:
+    """
+    Get the active API request retry policy.
+
+    Returns:
+        Retry policy
+    """
+
+    return _retry_policy
+
+
+def set_retry_policy(policy: RetryPolicy) -> None:
+    """
+    Set the retry policy used for all Sonarr API requests.
+
+    Args:
+        policy (RetryPolicy): New retry policy.
+    """
+
+    global _retry_policy  # noqa: PLW0603
+
+    _retry_policy = policy
+
+
+def get_circuit_breaker(host_url: str) -> CircuitBreaker:
+    """
+    Get the circuit breaker for the given Sonarr instance, creating it if required.
+
+    Args:
+        host_url (str): Sonarr instance URL.
+
+    Returns:
+        Circuit breaker for the instance
+    """
+
+    with _circuit_breakers_lock:
+        try:
+            return _circuit_breakers[host_url]
+        except KeyError:
+            breaker = _circuit_breakers[host_url] = CircuitBreaker(
+                host_url,
+                failure_threshold=_circuit_breaker_threshold,
+                reset_timeout=_circuit_breaker_reset_timeout,
+            )
+            return breaker
+
+
+def configure_circuit_breakers(failure_threshold: int, reset_timeout: float) -> None:
+    """
+    Set the circuit breaker options for all Sonarr instances.
+
+    Existing circuit breakers are reset.
+
+    Args:
+        failure_threshold (int): Consecutive failures before the circuit opens.
+            Set to `0` to disable circuit breaking.
+        reset_timeout (float): Seconds to wait before letting a trial request through.
+    """
+
+    global _circuit_breaker_threshold, _circuit_breaker_reset_timeout  # noqa: PLW0603
+
+    _circuit_breaker_threshold = failure_threshold
+    _circuit_breaker_reset_timeout = reset_timeout
+    reset_circuit_breakers()
+
+
+def reset_circuit_breakers() -> None:
+    """
+    Close and discard the circuit breakers for all Sonarr instances.
+    """
+
+    with _circuit_breakers_lock:
+        _circuit_breakers.clear()
@@ -0,0 +1,146 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin dependency graph task scheduler.
+"""
+
+from __future__ import annotations
+
+import contextvars
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from logging import getLogger
+from typing import TYPE_CHECKING, Dict, List, Set, Tuple, TypeVar
+
+from .exceptions import SonarrError
+
+if TYPE_CHECKING:
+    from typing import Callable, Collection, Mapping, Optional
+
+
+logger = getLogger(__name__)
+
+
+T = TypeVar("T")
+
+
+def reverse_dependencies(
+    dependencies: Mapping[str, Collection[str]],
+) -> Dict[str, Tuple[str, ...]]:
+    """
+    Reverse a dependency graph, so that every task runs before the tasks it depended on.
+
+    Args:
+        dependencies (Mapping[str, Collection[str]]): Dependencies of each task.
+
+    Returns:
+        Reversed dependency graph
+    """
+
+    reversed_dependencies: Dict[str, List[str]] = {name: [] for name in dependencies}
+    for name, task_dependencies in dependencies.items():
+        for dependency in task_dependencies:
+            reversed_dependencies[dependency].append(name)
+    return {name: tuple(deps) for name, deps in reversed_dependencies.items()}
+
+
+def run_graph(
+    tasks: Mapping[str, Callable[[], T]],
+    dependencies: Mapping[str, Collection[str]],
+    max_workers: int = 1,
+    thread_name_prefix: str = "buildarr-sonarr",
+) -> Dict[str, T]:
+    """
+    Run tasks in an order that satisfies their dependencies, running tasks
+    that do not depend on each other concurrently.
+
+    When more than one task is ready to run, they are started in the order
+    they are defined in `tasks`, so with `max_workers` set to 1, tasks run
+    one at a time in a deterministic order.
+
+    Tasks run with a copy of the caller's context, so context variables
+    set by the caller are visible to them.
+
+    If a task fails, no further tasks are started, and the error is raised
+    once the tasks already running have finished.
+
+    Args:
+        tasks (Mapping[str, Callable[[], T]]): Functions to run, by task name.
+        dependencies (Mapping[str, Collection[str]]): Names of the tasks each task depends on.
+        max_workers (int, optional): Maximum number of tasks to run at the same time.
+        thread_name_prefix (str, optional): Worker thread name prefix.
+
+    Raises:
+        SonarrError: If the dependency graph contains a cycle, or an unknown task.
+
+    Returns:
+        Task return values, by task name
+    """
+
+    for name, task_dependencies in dependencies.items():
+        for dependency in task_dependencies:
+            if dependency not in tasks:
+                raise SonarrError(f"Task '{name}' depends on unknown task '{dependency}'")
+
+    results: Dict[str, T] = {}
+    pending = list(tasks.keys())
+
+    def _ready() -> List[str]:
+        return [
+            name
+            for name in pending
+            if all(dependency in results for dependency in dependencies.get(name, ()))
+        ]
+
+    if max_workers <= 1:
+        while pending:
+            ready = _ready()
+            if not ready:
+                raise SonarrError(f"Dependency cycle between tasks: {', '.join(pending)}")
+            name = ready[0]
+            pending.remove(name)
+            results[name] = tasks[name]()
+        return results
+
+    running: Dict[Future, str] = {}
+    error: Optional[Exception] = None
+    with ThreadPoolExecutor(
+        max_workers=max_workers,
+        thread_name_prefix=thread_name_prefix,
+    ) as executor:
+        while True:
+            if error is None:
+                for name in _ready():
+                    if len(running) >= max_workers:
+                        break
+                    pending.remove(name)
+                    logger.debug("Starting task '%s'", name)
+                    running[executor.submit(contextvars.copy_context().run, tasks[name])] = name
+            if not running:
+                break
+            done: Set[Future]
+            done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: list(tasks.keys()).index(running[f])):
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as err:  # noqa: BLE001
+                    if error is None:
+                        error = err
+        if error is not None:
+            raise error
+    if pending:
+        raise SonarrError(f"Dependency cycle between tasks: {', '.join(pending)}")
+    return results
@@ -18,15 +18,24 @@ Sonarr plugin secrets file model.
 
 from __future__ import annotations
 
+import contextvars
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from http import HTTPStatus
-from typing import TYPE_CHECKING, Any, Dict, Optional, cast
+from logging import getLogger
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Tuple, Union, cast
+from xml.etree import ElementTree
 
 from buildarr.secrets import SecretsPlugin
+from buildarr.state import state
 from buildarr.types import NonEmptyStr, Port
 from pydantic import field_validator
 
 from .api import api_get, get_initialize_js
-from .exceptions import SonarrAPIError, SonarrSecretsUnauthorizedError
+from .exceptions import SonarrAPIError, SonarrSecretsError, SonarrSecretsUnauthorizedError
+from .secrets_cache import get_secrets_cache
 from .types import SonarrApiKey, SonarrProtocol
 
 if TYPE_CHECKING:
@@ -35,6 +44,13 @@ if TYPE_CHECKING:
     from .config import SonarrConfig
 
 
+logger = getLogger(__name__)
+
+
+DEFAULT_PORT = 8989
+DEFAULT_SECRETS_MAX_WORKERS = 8
+
+
 class SonarrSecrets(SecretsPlugin["SonarrConfig"]):
     """
     Sonarr API secrets.
@@ -77,24 +93,220 @@ class SonarrSecrets(SecretsPlugin["SonarrConfig"]):
 
     @classmethod
     def get(cls, config: SonarrConfig) -> Self:
-        return cls.get_from_url(
-            hostname=config.hostname,
-            port=config.port,
-            protocol=config.protocol,
-            url_base=config.url_base,
-            api_key=config.api_key.get_secret_value() if config.api_key else None,
+        # Buildarr fetches the secrets for each instance one at a time.
+        # When there are multiple instances, fetch the secrets for all of them
+        # concurrently on the first call, and serve the rest from the results.
+        # The results are discarded once they have all been used,
+        # or when the instances start being updated.
+        prefetched_secrets = _prefetched_secrets.get()
+        if prefetched_secrets is not None:
+            try:
+                prefetched_config, secrets = prefetched_secrets.pop(id(config))
+            except KeyError:
+                pass
+            else:
+                if not prefetched_secrets:
+                    clear_prefetched_secrets()
+                if prefetched_config is config:
+                    return cast("Self", secrets)
+        instance_configs = _get_instance_configs(config)
+        if len(instance_configs) < 2:  # noqa: PLR2004
+            return cls._get(config)
+        results, errors = cls._get_all(instance_configs)
+        if errors:
+            clear_prefetched_secrets()
+            raise _get_all_error(errors)
+        _prefetched_secrets.set(
+            {
+                id(instance_config): (instance_config, results[instance_name])
+                for instance_name, instance_config in instance_configs.items()
+                if instance_config is not config
+            },
         )
+        return next(
+            results[instance_name]
+            for instance_name, instance_config in instance_configs.items()
+            if instance_config is config
+        )
+
+    @classmethod
+    def get_instance(cls, config: SonarrConfig) -> Self:
+        """
+        Fetch the secrets for a single Sonarr instance.
+
+        Unlike `get`, the secrets for the other instances in the Buildarr run
+        are not fetched at the same time.
+
+        Args:
+            config (SonarrConfig): Instance configuration.
+
+        Returns:
+            Secrets object
+        """
+        return cls._get(config)
+
+    @classmethod
+    def get_all(
+        cls,
+        instance_configs: Mapping[str, SonarrConfig],
+        max_workers: Optional[int] = None,
+    ) -> Dict[str, Self]:
+        """
+        Fetch the secrets for multiple Sonarr instances concurrently.
+
+        Failures are collected for all instances, and reported together
+        once the secrets for every instance have been fetched.
+
+        Args:
+            instance_configs (Mapping[str, SonarrConfig]): Instance configurations, by name.
+            max_workers (Optional[int], optional): Maximum number of instances to fetch
+                secrets from at the same time. Defaults to the configured maximum.
+
+        Raises:
+            SonarrSecretsError: If the secrets could not be fetched for any of the instances.
+
+        Returns:
+            Secrets objects, by instance name
+        """
+        results, errors = cls._get_all(instance_configs, max_workers=max_workers)
+        if errors:
+            raise _get_all_error(errors)
+        return results
+
+    @classmethod
+    def _get_all(
+        cls,
+        instance_configs: Mapping[str, SonarrConfig],
+        max_workers: Optional[int] = None,
+    ) -> Tuple[Dict[str, Self], Dict[str, Exception]]:
+        results: Dict[str, Self] = {}
+        errors: Dict[str, Exception] = {}
+        if not instance_configs:
+            return (results, errors)
+        logger.debug("Fetching secrets for %i instances", len(instance_configs))
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers or _secrets_max_workers, len(instance_configs)),
+            thread_name_prefix="buildarr-sonarr-secrets",
+        ) as executor:
+            futures = {
+                instance_name: executor.submit(
+                    contextvars.copy_context().run,
+                    cls._get,
+                    instance_config,
+                )
+                for instance_name, instance_config in instance_configs.items()
+            }
+            for instance_name, future in futures.items():
+                try:
+                    results[instance_name] = future.result()
+                except Exception as err:  # noqa: BLE001
+                    errors[instance_name] = err
+        return (results, errors)
+
+    @classmethod
+    def _get(cls, config: SonarrConfig) -> Self:
+        port = config.port
+        url_base = cls._validate_url_base(config.url_base)
+        api_key = config.api_key.get_secret_value() if config.api_key else None
+        # If the Sonarr configuration file is available locally, use the port, URL base
+        # and API key defined in it, unless they are explicitly set in the Buildarr configuration.
+        config_xml = _read_config_xml_or_warn(config.config_xml) if config.config_xml else None
+        if config_xml:
+            if config_xml.port and "port" not in config.model_fields_set:
+                port = config_xml.port
+            if config_xml.url_base and "url_base" not in config.model_fields_set:
+                url_base = config_xml.url_base
+            if not api_key:
+                api_key = config_xml.api_key
+        # The API key of an instance can be cached between runs, so that it does not
+        # need to be fetched from `/initialize.js` again. The instance status is still
+        # fetched on every run, which checks that the cached API key is still valid,
+        # and gets the current version of the instance (which may have been upgraded).
+        secrets_cache = get_secrets_cache()
+        cached_api_key: Optional[str] = None
+        if secrets_cache is not None and not api_key:
+            cached_secrets = secrets_cache.get(
+                cls._get_host_url(
+                    protocol=config.protocol,
+                    hostname=config.hostname,
+                    port=port,
+                    url_base=url_base,
+                ),
+                version=config.version,
+            )
+            if cached_secrets:
+                cached_api_key = cached_secrets["api_key"]
+        try:
+            secrets = cls.get_from_url(
+                hostname=config.hostname,
+                port=port,
+                protocol=config.protocol,
+                url_base=url_base,
+                api_key=cached_api_key or api_key,
+            )
+        except SonarrSecretsUnauthorizedError:
+            if not cached_api_key:
+                raise
+            # The cached API key was rejected (and invalidated),
+            # so fetch the current API key from the instance.
+            secrets = cls.get_from_url(
+                hostname=config.hostname,
+                port=port,
+                protocol=config.protocol,
+                url_base=url_base,
+                api_key=api_key,
+            )
+        if secrets_cache is not None and not api_key:
+            secrets_cache.set(
+                secrets.host_url,
+                api_key=secrets.api_key.get_secret_value(),
+                version=secrets.version,
+            )
+        return secrets
 
     @classmethod
     def get_from_url(
         cls,
         hostname: str,
-        port: int,
+        port: Optional[int],
         protocol: str,
         url_base: Optional[str] = None,
         api_key: Optional[str] = None,
+        config_xml: Optional[Union[str, os.PathLike]] = None,
     ) -> Self:
+        """
+        Fetch the secrets for a Sonarr instance at the given location.
+
+        If a Sonarr configuration file is given, the port, URL base and API key
+        defined in it are used, unless they are explicitly set.
+
+        Args:
+            hostname (str): Hostname of the instance.
+            port (Optional[int]): Port of the instance. If `None`, the port defined
+                in the configuration file is used, or the default Sonarr port.
+            protocol (str): Protocol to connect to the instance with.
+            url_base (Optional[str], optional): URL base of the instance. If not set,
+                the URL base defined in the configuration file is used, if any.
+            api_key (Optional[str], optional): API key of the instance. If not set,
+                the API key defined in the configuration file is used,
+                or it is fetched from the instance.
+            config_xml (Optional[Union[str, os.PathLike]], optional):
+                Sonarr configuration file of the instance, if available locally.
+
+        Returns:
+            Secrets object
+        """
         url_base = cls._validate_url_base(url_base)
+        sonarr_config_xml = _read_config_xml_or_warn(config_xml) if config_xml else None
+        if sonarr_config_xml:
+            if port is None:
+                port = sonarr_config_xml.port
+            if url_base is None:
+                url_base = sonarr_config_xml.url_base
+            if not api_key:
+                api_key = sonarr_config_xml.api_key
+        if port is None:
+            port = DEFAULT_PORT
         host_url = cls._get_host_url(
             protocol=protocol,
             hostname=hostname,
@@ -162,3 +374,116 @@ class SonarrSecrets(SecretsPlugin["SonarrConfig"]):
         # We already perform API requests as part of instantiating the secrets object.
         # If the object exists, then the connection test is already successful.
         return True
+
+
+@dataclass(frozen=True)
+class SonarrConfigXml:
+    """
+    Connection settings read from a Sonarr instance configuration file (`config.xml`).
+    """
+
+    api_key: str
+    port: Optional[int] = None
+    url_base: Optional[str] = None
+
+
+def read_config_xml(path: Union[str, os.PathLike]) -> SonarrConfigXml:
+    """
+    Read the API key, port and URL base from a Sonarr instance configuration file.
+
+    Args:
+        path (Union[str, os.PathLike]): Path to the Sonarr `config.xml` file.
+
+    Raises:
+        SonarrSecretsError: If the file could not be read, or does not contain an API key.
+
+    Returns:
+        Connection settings defined in the file
+    """
+
+    try:
+        # The configuration file is a local file managed by Sonarr, so it is trusted.
+        root = ElementTree.parse(path).getroot()  # noqa: S314
+    except (OSError, ElementTree.ParseError) as err:
+        raise SonarrSecretsError(
+            f"Unable to read Sonarr configuration file '{path}': {err}",
+        ) from None
+    api_key = (root.findtext("ApiKey") or "").strip()
+    if not api_key:
+        raise SonarrSecretsError(f"No API key found in Sonarr configuration file '{path}'")
+    port = (root.findtext("Port") or "").strip()
+    try:
+        return SonarrConfigXml(
+            api_key=api_key,
+            port=int(port) if port else None,
+            url_base=SonarrSecrets._validate_url_base(root.findtext("UrlBase")),
+        )
+    except ValueError:
+        raise SonarrSecretsError(
+            f"Invalid port in Sonarr configuration file '{path}': {port}",
+        ) from None
+
+
+def _read_config_xml_or_warn(path: Union[str, os.PathLike]) -> Optional[SonarrConfigXml]:
+    # Read the Sonarr configuration file, falling back to connecting
+    # to the instance to get the required values if it could not be read.
+    try:
+        return read_config_xml(path)
+    except SonarrSecretsError as err:
+        logger.warning("%s (falling back to retrieving the API key from the instance)", err)
+        return None
+
+
+_secrets_max_workers = DEFAULT_SECRETS_MAX_WORKERS
+_prefetched_secrets: contextvars.ContextVar[
+    Optional[Dict[int, Tuple[SonarrConfig, SonarrSecrets]]]
+] = contextvars.ContextVar("_prefetched_secrets", default=None)
+
+
+def clear_prefetched_secrets() -> None:
+    """
+    Discard the secrets prefetched for the other instances in this Buildarr run,
+    so that they are not kept after the secrets for all instances have been fetched.
+    """
+
+    _prefetched_secrets.set(None)
+
+
+def set_secrets_max_workers(max_workers: int) -> None:
+    """
+    Set the maximum number of instances to fetch secrets from at the same time.
+
+    Args:
+        max_workers (int): Maximum number of concurrent secrets fetches.
+    """
+
+    global _secrets_max_workers  # noqa: PLW0603
+
+    if max_workers < 1:
+        raise ValueError(f"Invalid secrets max workers (must be at least 1): {max_workers}")
+
+    _secrets_max_workers = max_workers
+
+
+def _get_instance_configs(config: SonarrConfig) -> Mapping[str, SonarrConfig]:
+    # Return the configurations of all instances managed by the same plugin
+    # as the given instance in this Buildarr run, or nothing if the instance
+    # is not part of a run (e.g. when dumping the configuration of an instance).
+    if state.instance_configs is None:
+        return {}
+    for instance_configs in state.instance_configs.values():
+        if any(instance_config is config for instance_config in instance_configs.values()):
+            return cast("Mapping[str, SonarrConfig]", instance_configs)
+    return {}
+
+
+def _get_all_error(errors: Mapping[str, Exception]) -> Exception:
+    # Return a single error to raise for the failures of one or more instances.
+    if len(errors) == 1:
+        return next(iter(errors.values()))
+    return SonarrSecretsError(
+        f"Unable to fetch secrets for {len(errors)} instances:\n"
+        + "\n".join(
+            f"  {instance_name}: {error}" for instance_name, error in sorted(errors.items())
+        ),
+    )
@@ -0,0 +1,227 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin persistent secrets cache.
+
+Fetching the secrets for an instance takes up to two API requests
+(`/initialize.js` and `/api/v3/system/status`). When the API key is not set
+in the instance configuration, the API key fetched from `/initialize.js`
+can be cached on disk between Buildarr runs, saving one request per instance per run.
+
+The instance status is still fetched on every run, which checks that the cached
+API key is still accepted, and gets the current version of the instance.
+The version used for the run (e.g. to look up instance capabilities)
+is therefore never a cached value, even if the instance was upgraded
+since the secrets were cached.
+
+Cached secrets expire after a configurable time to live, and are invalidated
+when the instance rejects the API key, or when the expected version
+set in the instance configuration does not match the cached version.
+As the cache file contains API keys, it is only readable by the owner.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    from typing import Any, Optional, Union
+
+
+logger = getLogger(__name__)
+
+
+CACHE_VERSION = 1
+
+
+def get_default_secrets_cache_path() -> Path:
+    """
+    Get the default location of the secrets cache file.
+
+    Returns:
+        Path to `buildarr-sonarr/secrets.json` in the user cache directory
+    """
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "buildarr-sonarr" / "secrets.json"
+
+
+class SonarrSecretsCache:
+    """
+    On-disk cache of the API key and version of Sonarr instances, keyed by host URL.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike], ttl: float) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        host_url: str,
+        api_key: Optional[str] = None,
+        version: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached secrets for an instance.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+            api_key (Optional[str]): Configured API key, if any.
+            version (Optional[str]): Expected instance version, if any.
+
+        Returns:
+            Cached `api_key` and `version`, or `None` if not cached, expired or mismatched
+        """
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(host_url)
+            if entry is None:
+                return None
+            reason: Optional[str] = None
+            if time.time() - entry["cached_at"] >= self.ttl:
+                reason = "expired"
+            elif api_key and entry["api_key"] != api_key:
+                reason = "API key mismatch"
+            elif version and entry["version"] != version:
+                reason = f"version mismatch (cached {entry['version']}, expected {version})"
+            if reason:
+                logger.debug("Invalidating cached secrets for '%s': %s", host_url, reason)
+                del entries[host_url]
+                self._save()
+                return None
+            logger.debug("Using cached secrets for '%s'", host_url)
+            return {"api_key": entry["api_key"], "version": entry["version"]}
+
+    def set(self, host_url: str, api_key: str, version: str) -> None:
+        """
+        Cache the secrets for an instance.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+            api_key (str): Instance API key.
+            version (str): Instance version.
+        """
+        with self._lock:
+            self._load()[host_url] = {
+                "api_key": api_key,
+                "version": version,
+                "cached_at": time.time(),
+            }
+            self._save()
+
+    def invalidate(self, host_url: str) -> None:
+        """
+        Remove the cached secrets for an instance, if any.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+        """
+        with self._lock:
+            entries = self._load()
+            if host_url in entries:
+                logger.debug("Invalidating cached secrets for '%s'", host_url)
+                del entries[host_url]
+                self._save()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        # Load the cache file once, and keep the entries in memory afterwards.
+        # A missing or unreadable cache file is treated as an empty cache.
+        if self._entries is None:
+            try:
+                cache = json.loads(self.path.read_text(encoding="utf-8"))
+                if cache.get("version") != CACHE_VERSION:
+                    raise ValueError(f"unsupported version: {cache.get('version')}")
+                self._entries = dict(cache["entries"])
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as err:
+                logger.warning("Ignoring invalid secrets cache file '%s': %s", self.path, err)
+                self._entries = {}
+        return self._entries
+
+    def _save(self) -> None:
+        # Write the cache file atomically, creating it with owner-only permissions
+        # so that the API keys it contains are never readable by other users.
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f".{self.path.name}.tmp")
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            temp_path.chmod(0o600)
+            json.dump({"version": CACHE_VERSION, "entries": self._entries}, f)
+        temp_path.replace(self.path)
+
+
+_secrets_cache: Optional[SonarrSecretsCache] = None
+_secrets_cache_lock = threading.Lock()
+
+
+def get_secrets_cache() -> Optional[SonarrSecretsCache]:
+    """
+    Get the persistent secrets cache.
+
+    Returns:
+        Secrets cache, or `None` if secrets caching is disabled
+    """
+
+    return _secrets_cache
+
+
+def configure_secrets_cache(
+    ttl: float,
+    path: Optional[Union[str, os.PathLike]] = None,
+) -> Optional[SonarrSecretsCache]:
+    """
+    Enable or disable caching Sonarr instance secrets on disk.
+
+    Args:
+        ttl (float): Time (in seconds) cached secrets are valid for. `0` disables the cache.
+        path (Optional[Union[str, os.PathLike]]): Cache file path. Defaults to the
+            `buildarr-sonarr/secrets.json` file in the user cache directory.
+
+    Returns:
+        Secrets cache, or `None` if secrets caching is disabled
+    """
+
+    global _secrets_cache  # noqa: PLW0603
+
+    with _secrets_cache_lock:
+        _secrets_cache = (
+            SonarrSecretsCache(path or get_default_secrets_cache_path(), ttl=ttl)
+            if ttl > 0
+            else None
+        )
+        return _secrets_cache
+
+
+def invalidate_cached_secrets(host_url: str) -> None:
+    """
+    Remove the cached secrets for an instance, if secrets caching is enabled.
+
+    Args:
+        host_url (str): Sonarr instance URL.
+    """
+
+    secrets_cache = _secrets_cache
+    if secrets_cache is not None:
+        secrets_cache.invalidate(host_url)
@@ -0,0 +1,324 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin per-run remote resource snapshot.
+
+Most configuration sections read the same few collections from a Sonarr instance
+(e.g. tags, download clients and quality profiles), once when the remote configuration
+is fetched, and again in every stage that needs to map names to IDs.
+
+While a snapshot is active for an instance, each collection it covers is fetched
+at most once, on first access, and then served from memory while the snapshot is in use
+(the stages of the update pass of a run).
+Instead of discarding a collection when it is written to, the snapshot applies
+the response of each successful write to the collection in place
+(e.g. a tag created by the `tags` section is added to the snapshot),
+so that later sections see the new IDs without fetching the collection again.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import copy
+import threading
+
+from contextlib import contextmanager
+from logging import getLogger
+from typing import TYPE_CHECKING, Dict, Tuple, TypeVar
+
+from .plan import get_digest
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Generator, Optional
+
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+
+SNAPSHOT_COLLECTIONS = frozenset(
+    (
+        "tag",
+        "indexer",
+        "downloadclient",
+        "qualityprofile",
+        "languageprofile",
+        "qualitydefinition",
+        "notification",
+        "importlist",
+    ),
+)
+"""
+List resources covered by the snapshot.
+
+Root folders are not covered: the root folder collection includes the unmapped folders
+in each root folder, so it grows with the media library, and is streamed
+(keeping only the fields used) instead of being held in memory.
+"""
+
+SNAPSHOT_SINGLETONS = frozenset(
+    (
+        "config/host",
+        "config/ui",
+        "config/mediamanagement",
+        "config/naming",
+        "config/indexer",
+        "config/downloadclient",
+    ),
+)
+"""
+Configuration singleton resources covered by the snapshot.
+"""
+
+
+def _parse_api_url(api_url: str) -> Tuple[str, Tuple[str, ...], bool]:
+    # Split an API command into the resource it belongs to, the remaining path segments,
+    # and whether or not it has a query string.
+    # e.g. `/api/v3/indexer/1?forceSave=true` -> (`indexer`, (`1`,), True)
+    path, _, query = api_url.partition("?")
+    segments = path.strip("/").split("/")
+    if segments[:2] == ["api", "v3"]:
+        segments = segments[2:]
+    if segments[:1] == ["config"]:
+        return ("/".join(segments[:2]), tuple(segments[2:]), bool(query))
+    return (segments[0] if segments else "", tuple(segments[1:]), bool(query))
+
+
+class SonarrSnapshot:
+    """
+    Snapshot of the resources on a Sonarr instance, loaded lazily and kept up to date
+    with the writes sent to the instance.
+    """
+
+    def __init__(self, host_url: str) -> None:
+        self.host_url = host_url
+        self.hits = 0
+        self.misses = 0
+        self._resources: Dict[str, Any] = {}
+        self._ids: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._digests: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def get_resource(api_url: str) -> Optional[str]:
+        """
+        Get the snapshot resource a `GET` API command reads, if covered by the snapshot.
+
+        Args:
+            api_url (str): API command.
+
+        Returns:
+            Resource name (e.g. `tag`), or `None` if the command is not covered
+        """
+        resource, rest, has_query = _parse_api_url(api_url)
+        if rest or has_query:
+            return None
+        if resource in SNAPSHOT_COLLECTIONS or resource in SNAPSHOT_SINGLETONS:
+            return resource
+        return None
+
+    def get(self, api_url: str, fetch: Callable[[], Any]) -> Any:
+        """
+        Get a resource from the snapshot, fetching it if this is the first access.
+
+        Args:
+            api_url (str): API command for the resource (e.g. `/api/v3/tag`).
+            fetch (Callable[[], Any]): Function that fetches the resource from the instance.
+
+        Returns:
+            Copy of the resource
+        """
+        return self._load(api_url, fetch, copy.deepcopy)
+
+    def get_ids(self, api_url: str, fetch: Callable[[], Any], key: str = "name") -> Dict[str, int]:
+        """
+        Get a mapping of the names of the items in a collection to their IDs,
+        fetching the collection if this is the first access.
+
+        The mapping is cached until the collection is next written to,
+        so repeated lookups do not need to copy the collection.
+
+        Args:
+            api_url (str): API command for the collection (e.g. `/api/v3/tag`).
+            fetch (Callable[[], Any]): Function that fetches the collection from the instance.
+            key (str, optional): Item attribute to use as the name. Defaults to `name`.
+
+        Returns:
+            Name-to-ID mapping
+        """
+        resource = self._require_resource(api_url)
+
+        def _get_ids(items: Any) -> Dict[str, int]:
+            try:
+                ids = self._ids[(resource, key)]
+            except KeyError:
+                ids = self._ids[(resource, key)] = {item[key]: item["id"] for item in items}
+            return dict(ids)
+
+        return self._load(api_url, fetch, _get_ids)
+
+    def get_digest(self, api_url: str, fetch: Callable[[], Any]) -> str:
+        """
+        Get a digest of a resource, fetching it if this is the first access.
+
+        The digest is cached until the resource is next written to,
+        so repeated lookups do not need to copy or serialise the resource.
+
+        Args:
+            api_url (str): API command for the resource (e.g. `/api/v3/tag`).
+            fetch (Callable[[], Any]): Function that fetches the resource from the instance.
+
+        Returns:
+            Resource digest
+        """
+        resource = self._require_resource(api_url)
+
+        def _get_digest(res_json: Any) -> str:
+            try:
+                return self._digests[resource]
+            except KeyError:
+                digest = self._digests[resource] = get_digest(res_json)
+                return digest
+
+        return self._load(api_url, fetch, _get_digest)
+
+    def apply(self, method: str, api_url: str, res_json: Any) -> None:
+        """
+        Apply a successful write sent to the instance to the snapshot.
+
+        Created (`POST`), updated (`PUT`) and deleted (`DELETE`) items in a collection
+        are updated in place. Writes that cannot be applied in place
+        (e.g. bulk updates) discard the resource, so that it is fetched again
+        on the next access.
+
+        Args:
+            method (str): HTTP method of the request.
+            api_url (str): API command the request was sent to.
+            res_json (Any): Response object.
+        """
+        resource, rest, _ = _parse_api_url(api_url)
+        with self._lock:
+            if resource not in self._resources:
+                return
+            self._ids = {k: v for k, v in self._ids.items() if k[0] != resource}
+            self._digests.pop(resource, None)
+            items = self._resources[resource]
+            if resource in SNAPSHOT_SINGLETONS:
+                if method == "PUT" and len(rest) <= 1 and isinstance(res_json, dict):
+                    self._resources[resource] = copy.deepcopy(res_json)
+                    return
+            elif not rest and method == "POST" and isinstance(res_json, dict) and "id" in res_json:
+                items.append(copy.deepcopy(res_json))
+                return
+            elif len(rest) == 1 and rest[0].isdigit():
+                item_id = int(rest[0])
+                if method == "DELETE":
+                    self._resources[resource] = [item for item in items if item["id"] != item_id]
+                    return
+                if method == "PUT" and isinstance(res_json, dict) and res_json.get("id") == item_id:
+                    self._resources[resource] = [
+                        copy.deepcopy(res_json) if item["id"] == item_id else item for item in items
+                    ]
+                    return
+            logger.debug(
+                "Discarding '%s' from remote snapshot after '%s %s'",
+                resource,
+                method,
+                api_url,
+            )
+            del self._resources[resource]
+
+    def discard(self, api_url: str) -> None:
+        """
+        Discard the resource the given API command belongs to, if loaded,
+        so that it is fetched again on the next access.
+
+        Args:
+            api_url (str): API command.
+        """
+        resource, _, _ = _parse_api_url(api_url)
+        with self._lock:
+            self._resources.pop(resource, None)
+            self._ids = {k: v for k, v in self._ids.items() if k[0] != resource}
+            self._digests.pop(resource, None)
+
+    def _require_resource(self, api_url: str) -> str:
+        resource = self.get_resource(api_url)
+        if resource is None:
+            raise ValueError(f"API command not covered by the remote snapshot: {api_url}")
+        return resource
+
+    def _load(self, api_url: str, fetch: Callable[[], Any], read: Callable[[Any], T]) -> T:
+        # Fetch each resource at most once, even when sections running concurrently
+        # request it at the same time, without blocking access to other resources.
+        # The resource is read while holding the lock, so that it is never read
+        # while a write is being applied to it.
+        resource = self._require_resource(api_url)
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(resource, threading.Lock())
+        with fetch_lock:
+            with self._lock:
+                if resource in self._resources:
+                    self.hits += 1
+                    return read(self._resources[resource])
+            res_json = fetch()
+            with self._lock:
+                self.misses += 1
+                self._resources[resource] = copy.deepcopy(res_json)
+                return read(self._resources[resource])
+
+
+_snapshot: contextvars.ContextVar[Optional[SonarrSnapshot]] = contextvars.ContextVar(
+    "_snapshot",
+    default=None,
+)
+
+
+def get_snapshot(host_url: str) -> Optional[SonarrSnapshot]:
+    """
+    Get the active remote snapshot for a Sonarr instance.
+
+    Args:
+        host_url (str): Sonarr instance URL.
+
+    Returns:
+        Active snapshot, or `None` if there is no snapshot active for the instance
+    """
+
+    snapshot = _snapshot.get()
+    if snapshot is None or snapshot.host_url != host_url:
+        return None
+    return snapshot
+
+
+@contextmanager
+def use_snapshot(snapshot: SonarrSnapshot) -> Generator[SonarrSnapshot, None, None]:
+    """
+    Serve the resources covered by the given snapshot from it for the duration of the context.
+
+    Args:
+        snapshot (SonarrSnapshot): Snapshot of the instance API requests are sent to.
+
+    Yields:
+        Active snapshot
+    """
+
+    token = _snapshot.set(snapshot)
+    try:
+        yield snapshot
+    finally:
+        _snapshot.reset(token)
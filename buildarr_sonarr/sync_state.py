@@ -0,0 +1,389 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin incremental sync state.
+
+Most Buildarr runs change nothing, but every run reads the full configuration
+of every instance to find that out. When incremental sync is enabled,
+a hash of the local configuration of every settings section that was found
+to be up to date is saved to a local state file, together with digests of the
+remote resources the section read.
+
+On the next run, a section whose local configuration hash is unchanged is checked
+by reading the resources it depends on again, and comparing their digests.
+If none of them have changed, the section is skipped: its remote configuration
+is not decoded into configuration models, no changes are computed, and none of the
+per-definition requests the section would otherwise make are sent.
+
+Checking a section is not free: every resource it depends on is still downloaded,
+as Sonarr does not provide a cheaper change signal (such as entity tags or
+modification times) for its API resources. Most of those resources are shared
+between sections, so each is only downloaded once per run, and sections that are
+not skipped read them from the remote snapshot instead of fetching them again.
+
+The digests saved at the end of a run are those of the resources as the sections read
+them during the run, so saving the state does not send any further requests.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import hmac
+import json
+import os
+import threading
+
+from contextlib import contextmanager
+from enum import Enum
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Set
+
+from . import __version__
+
+if TYPE_CHECKING:
+    from typing import Any, Generator, Mapping, Optional, Union
+
+    from pydantic import BaseModel
+
+
+logger = getLogger(__name__)
+
+
+SYNC_STATE_VERSION = 1
+
+
+def get_default_sync_state_path() -> Path:
+    """
+    Get the default location of the incremental sync state file.
+
+    Returns:
+        Path to `buildarr-sonarr/sync-state.json` in the user cache directory
+    """
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "buildarr-sonarr" / "sync-state.json"
+
+
+def get_config_hash(config: BaseModel, key: str) -> str:
+    """
+    Get a hash of a local configuration section.
+
+    Only attributes explicitly set in the configuration are included,
+    as unset attributes are not managed by Buildarr. Secret values are included
+    in the hash, so that changing them causes the section to be updated,
+    but are never saved in the state file themselves. The hash is an HMAC keyed
+    with a secret of the instance (its API key), so that secret values
+    cannot be guessed by hashing candidate values and comparing them to the state file.
+    The plugin version is also included, so that sections are always
+    checked in full after the plugin is upgraded.
+
+    Args:
+        config (BaseModel): Local configuration section.
+        key (str): Secret key of the instance the section is for.
+
+    Returns:
+        Configuration hash
+    """
+
+    return hmac.new(
+        key.encode("utf-8"),
+        json.dumps(
+            [__version__, config.model_dump(exclude_unset=True)],
+            sort_keys=True,
+            separators=(",", ":"),
+            default=_json_default,
+        ).encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "get_secret_value"):
+        return value.get_secret_value()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    return str(value)
+
+
+class SonarrSyncState:
+    """
+    Incremental sync state of Sonarr instances, persisted to a local file.
+
+    For each instance (keyed by host URL), the Sonarr version, and for every
+    up to date section, the local configuration hash and the digests of the remote
+    resources read by the section (by API command) are saved.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]) -> None:
+        self.path = Path(path)
+        self.paused: Set[str] = set()
+        """
+        Host URLs of the instances to skip all sections on, without checking them.
+        """
+        self.drifted: Dict[str, Set[str]] = {}
+        """
+        Names of the sections that made changes on each instance in the latest run,
+        by host URL. Paused instances are not included.
+        """
+        self._instances: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def get_sections(self, host_url: str, version: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the saved state of the up to date sections on an instance.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+            version (str): Current Sonarr version of the instance.
+
+        Returns:
+            Section states, or an empty dictionary if the instance version has changed
+        """
+        with self._lock:
+            instance = self._load().get(host_url)
+            if not instance or instance.get("version") != version:
+                return {}
+            return dict(instance.get("sections", {}))
+
+    def set_sections(
+        self,
+        host_url: str,
+        version: str,
+        sections: Mapping[str, Dict[str, Any]],
+    ) -> None:
+        """
+        Save the state of the up to date sections on an instance.
+
+        Args:
+            host_url (str): Sonarr instance URL.
+            version (str): Sonarr version of the instance.
+            sections (Mapping[str, Dict[str, Any]]): Section states.
+        """
+        with self._lock:
+            self._load()[host_url] = {"version": version, "sections": dict(sections)}
+            self._save()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        # Load the state file once, and keep the state in memory afterwards.
+        # A missing or invalid state file results in a full sync.
+        if self._instances is None:
+            self._instances = {}
+            if self.path.is_file():
+                try:
+                    state = json.loads(self.path.read_text(encoding="utf-8"))
+                    if state.get("version") != SYNC_STATE_VERSION:
+                        raise ValueError(f"unsupported version: {state.get('version')}")
+                    self._instances = dict(state["instances"])
+                except (OSError, ValueError, KeyError, TypeError, AttributeError) as err:
+                    logger.warning("Ignoring invalid sync state file '%s': %s", self.path, err)
+        return self._instances
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(f".{self.path.name}.tmp")
+            temp_path.write_text(
+                json.dumps(
+                    {"version": SYNC_STATE_VERSION, "instances": self._instances},
+                    indent=2,
+                    sort_keys=True,
+                ),
+                encoding="utf-8",
+            )
+            temp_path.replace(self.path)
+        except OSError as err:
+            logger.warning("Unable to save sync state file '%s': %s", self.path, err)
+
+
+class SonarrSectionSync:
+    """
+    Incremental sync status of the settings sections of a Sonarr instance
+    for a single Buildarr run.
+    """
+
+    def __init__(self, host_url: str, skipped: Optional[Mapping[str, Any]] = None) -> None:
+        self.host_url = host_url
+        self.skipped: Dict[str, Any] = dict(skipped or {})
+        """
+        Local configuration of the sections skipped in this run, by section name.
+        """
+        self.resumed: Dict[str, Any] = {}
+        """
+        Local configuration of the sections already updated in an interrupted run,
+        which are not updated again in this run, by section name.
+        Unlike skipped sections, unused resources are still deleted.
+        """
+        self.reads: Dict[str, Dict[str, str]] = {}
+        """
+        Digests of the resources read by each section, by API command, by section name.
+
+        If a section reads a resource more than once, the digest of the latest read is kept.
+        """
+        self.writes: Dict[str, Set[str]] = {}
+        """
+        API commands written to by each section, by section name.
+        """
+        self.changed: Set[str] = set()
+        """
+        Names of the sections that made changes to the instance in this run.
+        """
+        self._lock = threading.Lock()
+
+    def record_read(self, tree: str, api_url: str, digest: str) -> None:
+        """
+        Record a resource read by a settings section.
+
+        Args:
+            tree (str): Configuration tree of the section (e.g. `sonarr.settings.indexers`).
+            api_url (str): API command the resource was read from.
+            digest (str): Digest of the resource, as read by the section.
+        """
+        with self._lock:
+            self.reads.setdefault(tree.rpartition(".")[2], {})[api_url] = digest
+
+    def record_write(self, tree: str, api_url: str) -> None:
+        """
+        Record a successful write to the instance made by a settings section.
+
+        Args:
+            tree (str): Configuration tree of the section (e.g. `sonarr.settings.indexers`).
+            api_url (str): API command the write was sent to.
+        """
+        with self._lock:
+            self.writes.setdefault(tree.rpartition(".")[2], set()).add(api_url)
+
+    def record_changed(self, sections: Mapping[str, bool]) -> None:
+        """
+        Record the sections that made changes to the instance.
+
+        Args:
+            sections (Mapping[str, bool]): Whether each section made changes, by section name.
+        """
+        with self._lock:
+            self.changed.update(name for name, changed in sections.items() if changed)
+
+
+_sync_state: Optional[SonarrSyncState] = None
+_full_sync = False
+
+_section_sync: contextvars.ContextVar[Optional[SonarrSectionSync]] = contextvars.ContextVar(
+    "_section_sync",
+    default=None,
+)
+
+
+def get_sync_state() -> Optional[SonarrSyncState]:
+    """
+    Get the incremental sync state.
+
+    Returns:
+        Sync state, or `None` if incremental sync is disabled
+    """
+
+    return _sync_state
+
+
+def set_sync_state_file(path: Optional[Union[str, os.PathLike]]) -> None:
+    """
+    Set the file used to persist the incremental sync state.
+
+    Args:
+        path (Optional[Union[str, os.PathLike]]): State file path,
+            or `None` to disable incremental sync.
+    """
+
+    global _sync_state  # noqa: PLW0603
+
+    _sync_state = SonarrSyncState(path) if path else None
+
+
+def is_full_sync() -> bool:
+    """
+    Check whether incremental sync should be overridden, updating all sections in full.
+
+    Returns:
+        `True` if all sections should be updated in full
+    """
+
+    return _full_sync
+
+
+def set_full_sync(full_sync: bool) -> None:
+    """
+    Set whether incremental sync should be overridden, updating all sections in full.
+
+    The sync state is still saved at the end of the run.
+
+    Args:
+        full_sync (bool): `True` to update all sections in full.
+    """
+
+    global _full_sync  # noqa: PLW0603
+
+    _full_sync = full_sync
+
+
+def get_active_section_sync() -> Optional[SonarrSectionSync]:
+    """
+    Get the active incremental sync status, regardless of the instance it is for.
+
+    Returns:
+        Active sync status, or `None` if incremental sync is not active
+    """
+
+    return _section_sync.get()
+
+
+def get_section_sync(host_url: str) -> Optional[SonarrSectionSync]:
+    """
+    Get the active incremental sync status for a Sonarr instance.
+
+    Args:
+        host_url (str): Sonarr instance URL.
+
+    Returns:
+        Active sync status, or `None` if incremental sync is not active for the instance
+    """
+
+    section_sync = _section_sync.get()
+    if section_sync is None or section_sync.host_url != host_url:
+        return None
+    return section_sync
+
+
+@contextmanager
+def use_section_sync(
+    section_sync: Optional[SonarrSectionSync],
+) -> Generator[Optional[SonarrSectionSync], None, None]:
+    """
+    Skip and track settings sections using the given sync status for the duration of the context.
+
+    Args:
+        section_sync (Optional[SonarrSectionSync]): Sync status of the instance
+            being updated, or `None` to update all sections.
+
+    Yields:
+        Active sync status
+    """
+
+    token = _section_sync.set(section_sync)
+    try:
+        yield section_sync
+    finally:
+        _section_sync.reset(token)
@@ -0,0 +1,157 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sonarr plugin drift-watch daemon.
+
+The watcher runs Buildarr repeatedly in a single long-running process, using
+incremental sync so that each cycle only reads the resources each settings section
+depends on, and only reconciles the sections that have drifted.
+
+Because the process is kept running, HTTP sessions, the capability registry,
+the incremental sync state and the secrets cache stay warm between cycles.
+
+Each instance is polled on its own interval. The interval doubles every time
+an instance is found to be up to date (up to a maximum), and is reset
+to the minimum when any section on it has drifted. Instances that are not due
+to be polled are paused, so all of their sections are skipped without being checked.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from logging import getLogger
+from typing import TYPE_CHECKING, Dict, cast
+
+from .sync_state import get_default_sync_state_path, get_sync_state, set_sync_state_file
+
+if TYPE_CHECKING:
+    from typing import Callable, Optional, Set
+
+    from .sync_state import SonarrSyncState
+
+
+logger = getLogger(__name__)
+
+
+DEFAULT_MIN_INTERVAL = 60.0
+DEFAULT_MAX_INTERVAL = 3600.0
+
+
+class SonarrWatcher:
+    """
+    Drift-watch daemon, polling Sonarr instances and re-syncing drifted sections.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[], None],
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.run = run
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.clock = clock
+        self.intervals: Dict[str, float] = {}
+        """
+        Current polling interval of each instance (in seconds), by host URL.
+        """
+        self.next_polls: Dict[str, float] = {}
+        """
+        Time each instance is next due to be polled, by host URL.
+        """
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """
+        Poll instances until the watcher is stopped.
+        """
+        logger.info(
+            "Watching instances for drift (polling interval %gs to %gs)",
+            self.min_interval,
+            self.max_interval,
+        )
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.get_wait_time())
+        logger.info("Stopped watching instances")
+
+    def stop(self) -> None:
+        """
+        Signal the watcher to stop after the current cycle.
+        """
+        self._stop.set()
+
+    def get_wait_time(self) -> float:
+        """
+        Get the time to wait until the next instance is due to be polled.
+
+        Returns:
+            Wait time (in seconds)
+        """
+        if not self.next_polls:
+            return self.min_interval
+        return max(0.0, min(self.next_polls.values()) - self.clock())
+
+    def poll(self) -> Optional[Set[str]]:
+        """
+        Run a polling cycle on the instances that are due to be polled,
+        and update their polling intervals.
+
+        Returns:
+            Host URLs of the instances that had drifted, or `None` if no instances were due
+        """
+        now = self.clock()
+        paused = {host_url for host_url, next_poll in self.next_polls.items() if next_poll > now}
+        if self.next_polls and len(paused) == len(self.next_polls):
+            return None
+        if get_sync_state() is None:
+            set_sync_state_file(get_default_sync_state_path())
+        sync_state = cast("SonarrSyncState", get_sync_state())
+        sync_state.paused = paused
+        sync_state.drifted = {}
+        try:
+            self.run()
+        except Exception as err:
+            # Retry the instances polled in the failed cycle at the minimum interval.
+            logger.exception("Error while polling instances for drift: %s", err)
+            for host_url in self.next_polls.keys() - paused:
+                self.intervals[host_url] = self.min_interval
+                self.next_polls[host_url] = self.clock() + self.min_interval
+            return set()
+        finally:
+            sync_state.paused = set()
+        drifted_instances: Set[str] = set()
+        for host_url, drifted_sections in sync_state.drifted.items():
+            if drifted_sections:
+                logger.info(
+                    "Drift detected on '%s' in sections: %s",
+                    host_url,
+                    ", ".join(sorted(drifted_sections)),
+                )
+                drifted_instances.add(host_url)
+                interval = self.min_interval
+            else:
+                interval = min(
+                    self.intervals.get(host_url, self.min_interval) * 2,
+                    self.max_interval,
+                )
+            self.intervals[host_url] = interval
+            self.next_polls[host_url] = self.clock() + interval
+            logger.debug("Polling '%s' again in %gs", host_url, interval)
+        return drifted_instances
@@ -0,0 +1,109 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the run-scoped API response cache.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from buildarr_sonarr.api import api_cache, api_delete, api_get, api_post, api_put
+
+
+def test_cache_hit(sonarr_api) -> None:
+    """
+    Check that repeated `GET` requests are only sent once while the cache is active.
+    """
+
+    sonarr_api.server.expect_oneshot_request("/api/v3/tag", method="GET").respond_with_json(
+        [{"id": 1, "label": "shows"}],
+    )
+
+    with api_cache() as cache:
+        for _ in range(3):
+            assert api_get(sonarr_api.secrets, "/api/v3/tag") == [{"id": 1, "label": "shows"}]
+
+    sonarr_api.server.check_assertions()
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_cache_returns_copies(sonarr_api) -> None:
+    """
+    Check that modifying a returned response does not modify the cached response.
+    """
+
+    sonarr_api.server.expect_oneshot_request("/api/v3/tag", method="GET").respond_with_json(
+        [{"id": 1, "label": "shows"}],
+    )
+
+    with api_cache():
+        api_get(sonarr_api.secrets, "/api/v3/tag")[0]["label"] = "anime"
+        assert api_get(sonarr_api.secrets, "/api/v3/tag") == [{"id": 1, "label": "shows"}]
+
+
+def test_cache_inactive(sonarr_api) -> None:
+    """
+    Check that responses are not cached outside of a cache context.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json([])
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(
+        [{"id": 1, "label": "shows"}],
+    )
+
+    assert api_get(sonarr_api.secrets, "/api/v3/tag") == []
+    assert api_get(sonarr_api.secrets, "/api/v3/tag") == [{"id": 1, "label": "shows"}]
+
+
+@pytest.mark.parametrize(
+    ("method", "api_url", "status"),
+    [
+        ("POST", "/api/v3/indexer", 201),
+        ("PUT", "/api/v3/indexer/1", 202),
+        ("DELETE", "/api/v3/indexer/1", 200),
+    ],
+)
+def test_write_invalidates(sonarr_api, method, api_url, status) -> None:
+    """
+    Check that writing to a resource collection invalidates its cached responses,
+    while leaving other resources cached.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json([])
+    sonarr_api.server.expect_ordered_request("/api/v3/indexer", method="GET").respond_with_json(
+        [],
+    )
+    sonarr_api.server.expect_ordered_request(api_url, method=method).respond_with_json(
+        {"id": 1},
+        status=status,
+    )
+    sonarr_api.server.expect_ordered_request("/api/v3/indexer", method="GET").respond_with_json(
+        [{"id": 1}],
+    )
+
+    with api_cache():
+        api_get(sonarr_api.secrets, "/api/v3/tag")
+        assert api_get(sonarr_api.secrets, "/api/v3/indexer") == []
+        if method == "POST":
+            api_post(sonarr_api.secrets, api_url, {"name": "Nyaa"})
+        elif method == "PUT":
+            api_put(sonarr_api.secrets, api_url, {"id": 1, "name": "Nyaa"})
+        else:
+            api_delete(sonarr_api.secrets, api_url)
+        assert api_get(sonarr_api.secrets, "/api/v3/indexer") == [{"id": 1}]
+        api_get(sonarr_api.secrets, "/api/v3/tag")
+
+    sonarr_api.server.check_assertions()
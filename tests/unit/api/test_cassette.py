@@ -0,0 +1,112 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test recording and replaying Sonarr API requests using cassettes.
+"""
+
+from __future__ import annotations
+
+import stat
+
+import pytest
+
+from buildarr_sonarr.api import api_get, api_get_iter, api_post
+from buildarr_sonarr.cassette import eject_cassette, get_body_hash, use_cassette
+from buildarr_sonarr.exceptions import SonarrAPIError, SonarrCassetteError
+
+
+@pytest.fixture(autouse=True)
+def _eject_cassette():
+    yield
+    eject_cassette()
+
+
+def test_body_hash_canonical() -> None:
+    """
+    Check that JSON request bodies hash the same regardless of key order and whitespace.
+    """
+
+    assert get_body_hash(b'{"a":1,"b":[1,2]}') == get_body_hash('{ "b": [1, 2], "a": 1 }')
+    assert get_body_hash(b'{"a":1}') != get_body_hash(b'{"a":2}')
+    assert get_body_hash(None) == get_body_hash(b"") == "-"
+
+
+def test_record_replay(sonarr_api, tmp_path) -> None:
+    """
+    Check that recorded requests are replayed without touching the network,
+    in the order they were recorded.
+    """
+
+    cassette_path = tmp_path / "sonarr.json.gz"
+    tags = [{"id": 1, "label": "test"}]
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json([])
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/tag",
+        method="POST",
+        json={"label": "test"},
+    ).respond_with_json(tags[0], status=201)
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(tags)
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/rootfolder",
+        method="GET",
+    ).respond_with_json({"message": "Unauthorized"}, status=401)
+
+    use_cassette(cassette_path, mode="record")
+    assert api_get(sonarr_api.secrets, "/api/v3/tag") == []
+    assert api_post(sonarr_api.secrets, "/api/v3/tag", {"label": "test"}) == tags[0]
+    assert list(api_get_iter(sonarr_api.secrets, "/api/v3/tag")) == tags
+    with pytest.raises(SonarrAPIError, match="Unauthorized"):
+        api_get(sonarr_api.secrets, "/api/v3/rootfolder")
+    eject_cassette()
+    sonarr_api.server.check_assertions()
+    # Cassettes contain API keys, so they must only be readable by the current user.
+    assert stat.S_IMODE(cassette_path.stat().st_mode) == 0o600  # noqa: PLR2004
+    assert not list(tmp_path.glob(".*.tmp"))
+
+    sonarr_api.server.stop()
+    try:
+        use_cassette(cassette_path, mode="replay")
+        assert api_get(sonarr_api.secrets, "/api/v3/tag") == []
+        assert api_post(sonarr_api.secrets, "/api/v3/tag", {"label": "test"}) == tags[0]
+        assert list(api_get_iter(sonarr_api.secrets, "/api/v3/tag", fields=("id",))) == [
+            {"id": 1},
+        ]
+        # Once all recorded responses are served, the last one is repeated.
+        assert api_get(sonarr_api.secrets, "/api/v3/tag") == tags
+        with pytest.raises(SonarrAPIError, match="Unauthorized") as exc_info:
+            api_get(sonarr_api.secrets, "/api/v3/rootfolder")
+        assert exc_info.value.status_code == 401  # noqa: PLR2004
+        with pytest.raises(SonarrCassetteError, match="No response recorded"):
+            api_post(sonarr_api.secrets, "/api/v3/tag", {"label": "other"})
+    finally:
+        sonarr_api.server.start()
+
+
+def test_replay_missing_file(tmp_path) -> None:
+    """
+    Check that an error is raised when replaying a cassette that does not exist.
+    """
+
+    with pytest.raises(SonarrCassetteError, match="Unable to load API cassette"):
+        use_cassette(tmp_path / "missing.json.gz", mode="replay")
+
+
+def test_invalid_mode(tmp_path) -> None:
+    """
+    Check that an error is raised for an invalid cassette mode.
+    """
+
+    with pytest.raises(SonarrCassetteError, match="Invalid cassette mode"):
+        use_cassette(tmp_path / "sonarr.json.gz", mode="rewind")  # type: ignore[arg-type]
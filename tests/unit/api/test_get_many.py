@@ -0,0 +1,204 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test sending concurrent and asynchronous API requests.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from buildarr_sonarr import api
+from buildarr_sonarr.api import (
+    api_gather,
+    api_get_many,
+    api_section,
+    async_api_delete,
+    async_api_get,
+    async_api_post,
+    async_api_put,
+)
+from buildarr_sonarr.exceptions import SonarrAPIError
+from buildarr_sonarr.metrics import get_metrics, reset_metrics
+
+
+def test_get_many(sonarr_api) -> None:
+    """
+    Check that concurrent `GET` requests return their responses in request order.
+    """
+
+    sonarr_api.server.expect_request("/api/v3/tag", method="GET").respond_with_json(
+        [{"id": 1, "label": "shows"}],
+    )
+    sonarr_api.server.expect_request("/api/v3/indexer", method="GET").respond_with_json([])
+    sonarr_api.server.expect_request("/api/v3/config/ui", method="GET").respond_with_json(
+        {"id": 1},
+    )
+
+    assert api_get_many(
+        sonarr_api.secrets,
+        ["/api/v3/tag", "/api/v3/indexer", "/api/v3/config/ui"],
+    ) == [[{"id": 1, "label": "shows"}], [], {"id": 1}]
+
+
+def test_get_many_error(sonarr_api) -> None:
+    """
+    Check that API errors are raised the same way as the synchronous functions.
+    """
+
+    sonarr_api.server.expect_request("/api/v3/tag", method="GET").respond_with_json([])
+    sonarr_api.server.expect_request("/api/v3/indexer", method="GET").respond_with_json(
+        {"message": "Not Found"},
+        status=404,
+    )
+
+    with pytest.raises(SonarrAPIError, match="Not Found") as exc_info:
+        api_get_many(sonarr_api.secrets, ["/api/v3/tag", "/api/v3/indexer"])
+
+    assert exc_info.value.status_code == 404  # noqa: PLR2004
+
+
+def test_get_many_event_loop(sonarr_api) -> None:
+    """
+    Check that concurrent `GET` requests can be sent from within a running event loop.
+    """
+
+    sonarr_api.server.expect_request("/api/v3/tag", method="GET").respond_with_json([])
+
+    async def _run():
+        return api_get_many(sonarr_api.secrets, ["/api/v3/tag"])
+
+    assert asyncio.run(_run()) == [[]]
+
+
+def test_write_requests(sonarr_api) -> None:
+    """
+    Check that the asynchronous `POST`, `PUT` and `DELETE` functions
+    pass their requests through and check the expected status codes.
+    """
+
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/tag",
+        method="POST",
+        json={"label": "shows"},
+    ).respond_with_json({"id": 1, "label": "shows"}, status=201)
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/tag/1",
+        method="PUT",
+        json={"id": 1, "label": "anime"},
+    ).respond_with_json({"id": 1, "label": "anime"}, status=202)
+    sonarr_api.server.expect_ordered_request("/api/v3/tag/1", method="DELETE").respond_with_data(
+        "",
+    )
+
+    async def _run() -> None:
+        assert await async_api_post(sonarr_api.secrets, "/api/v3/tag", {"label": "shows"}) == {
+            "id": 1,
+            "label": "shows",
+        }
+        assert await async_api_put(
+            sonarr_api.secrets,
+            "/api/v3/tag/1",
+            {"id": 1, "label": "anime"},
+        ) == {"id": 1, "label": "anime"}
+        await async_api_delete(sonarr_api.secrets, "/api/v3/tag/1")
+
+    asyncio.run(_run())
+    sonarr_api.server.check_assertions()
+
+
+def test_max_concurrency(mocker) -> None:
+    """
+    Check that no more than the given number of requests are in flight at any one time.
+    """
+
+    max_concurrency = 2
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def _api_get(secrets, api_url, **kwargs):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+        return api_url
+
+    mocker.patch.object(api, "api_get", _api_get)
+
+    api_urls = [f"/api/v3/tag/{i}" for i in range(6)]
+
+    assert api_get_many("http://sonarr:8989", api_urls, max_concurrency=max_concurrency) == api_urls
+    assert peak == max_concurrency
+
+
+def test_gather_max_concurrency(mocker) -> None:
+    """
+    Check that no more than the given number of asynchronous requests
+    are in flight at any one time.
+    """
+
+    max_concurrency = 2
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def _api_get(secrets, api_url, **kwargs):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+        return api_url
+
+    mocker.patch.object(api, "api_get", _api_get)
+
+    api_urls = [f"/api/v3/tag/{i}" for i in range(6)]
+
+    async def _run():
+        return await api_gather(
+            (async_api_get("http://sonarr:8989", api_url) for api_url in api_urls),
+            max_concurrency=max_concurrency,
+        )
+
+    assert asyncio.run(_run()) == api_urls
+    assert peak == max_concurrency
+
+
+def test_async_metrics(sonarr_api) -> None:
+    """
+    Check that asynchronous requests are recorded in the run metrics,
+    under the configuration section they were sent from.
+    """
+
+    sonarr_api.server.expect_request("/api/v3/tag", method="GET").respond_with_json([])
+
+    reset_metrics()
+
+    async def _run():
+        with api_section("sonarr.settings.tags"):
+            return await async_api_get(sonarr_api.secrets, "/api/v3/tag")
+
+    assert asyncio.run(_run()) == []
+    assert get_metrics().sections["sonarr.settings.tags"].status_codes == {"200": 1}
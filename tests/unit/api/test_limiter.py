@@ -0,0 +1,140 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the adaptive per-instance API concurrency limiter.
+"""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from buildarr_sonarr.api import api_get
+from buildarr_sonarr.limiter import (
+    DEFAULT_INITIAL_LIMIT,
+    DEFAULT_LATENCY_TARGET,
+    DEFAULT_MAX_LIMIT,
+    AdaptiveLimiter,
+    configure_limiters,
+    get_limiter_stats,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_limiters():
+    yield
+    configure_limiters(
+        initial_limit=DEFAULT_INITIAL_LIMIT,
+        max_limit=DEFAULT_MAX_LIMIT,
+        latency_target=DEFAULT_LATENCY_TARGET,
+    )
+
+
+def test_additive_increase() -> None:
+    """
+    Check that the limit grows by 1 for every full window of fast, successful requests,
+    up to the maximum.
+    """
+
+    limiter = AdaptiveLimiter("http://sonarr:8989", initial_limit=2, max_limit=3)
+
+    for _ in range(2):
+        with limiter.request() as limited_request:
+            limited_request.status_code = 200
+    assert limiter.limit == 3  # noqa: PLR2004
+
+    for _ in range(10):
+        with limiter.request() as limited_request:
+            limited_request.status_code = 200
+    assert limiter.limit == 3  # noqa: PLR2004
+    assert limiter.stats.throttle_events == 0
+
+
+@pytest.mark.parametrize("status_code", [429, 503, None])
+def test_multiplicative_decrease(status_code) -> None:
+    """
+    Check that overload responses and failed requests halve the limit.
+    """
+
+    limiter = AdaptiveLimiter("http://sonarr:8989", initial_limit=8)
+
+    with limiter.request() as limited_request:
+        limited_request.status_code = status_code
+
+    assert limiter.limit == 4  # noqa: PLR2004
+    assert limiter.stats.throttle_events == 1
+
+
+def test_latency_decrease(mocker) -> None:
+    """
+    Check that responses slower than the latency target halve the limit,
+    but only once for requests that were in flight at the same time.
+    """
+
+    monotonic = mocker.patch("buildarr_sonarr.limiter.time.monotonic", return_value=10.0)
+    limiter = AdaptiveLimiter("http://sonarr:8989", initial_limit=8, latency_target=1.0)
+
+    first = limiter.acquire()
+    second = limiter.acquire()
+    monotonic.return_value = 15.0
+    limiter.release(first, 200)
+    limiter.release(second, 200)
+
+    assert limiter.stats == limiter.stats.__class__(
+        limit=4,
+        in_flight=0,
+        max_in_flight=2,
+        throttle_events=1,
+    )
+
+
+def test_limit_blocks() -> None:
+    """
+    Check that no more requests than the limit are allowed in flight.
+    """
+
+    limiter = AdaptiveLimiter("http://sonarr:8989", initial_limit=1)
+    started = limiter.acquire()
+    acquired = threading.Event()
+
+    def _acquire() -> None:
+        limiter.release(limiter.acquire(), 200)
+        acquired.set()
+
+    thread = threading.Thread(target=_acquire)
+    thread.start()
+    assert not acquired.wait(0.1)
+
+    limiter.release(started, 200)
+    thread.join()
+    assert acquired.is_set()
+    assert limiter.stats.max_in_flight == 1
+
+
+def test_api_requests_observed(sonarr_api) -> None:
+    """
+    Check that API requests go through the limiter for the instance.
+    """
+
+    configure_limiters(initial_limit=2, max_limit=4, latency_target=60)
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json([])
+
+    api_get(sonarr_api.secrets, "/api/v3/tag")
+
+    stats = get_limiter_stats()[sonarr_api.secrets.host_url]
+    assert stats.max_in_flight == 1
+    assert stats.in_flight == 0
+    assert stats.throttle_events == 0
@@ -0,0 +1,201 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test recording and applying change plans.
+"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from buildarr_sonarr.api import api_get_ids, api_put, apply_plan
+from buildarr_sonarr.config.tags import SonarrTagsSettingsConfig
+from buildarr_sonarr.exceptions import SonarrPlanError
+from buildarr_sonarr.plan import (
+    PLACEHOLDER_ID_BASE,
+    SonarrListDigest,
+    SonarrPlan,
+    get_digest,
+    load_plans,
+    resolve_placeholder_api_url,
+    resolve_placeholder_ids,
+    save_plans,
+    use_plan,
+)
+from buildarr_sonarr.snapshot import SonarrSnapshot, use_snapshot
+
+TAGS = [{"id": 1, "label": "shows"}]
+
+
+def _record_plan(sonarr_api) -> SonarrPlan:
+    # Plan creating the `anime` tag, and assigning it to an existing indexer.
+    plan = SonarrPlan(host_url=sonarr_api.secrets.host_url)
+    with use_snapshot(SonarrSnapshot(sonarr_api.secrets.host_url)), use_plan(plan):
+        SonarrTagsSettingsConfig(definitions=["shows", "anime"]).update_remote(
+            tree="sonarr.settings.tags",
+            secrets=sonarr_api.secrets,
+            remote=SonarrTagsSettingsConfig(definitions=["shows"]),
+        )
+        tag_ids = api_get_ids(sonarr_api.secrets, "/api/v3/tag", key="label")
+        api_put(
+            sonarr_api.secrets,
+            "/api/v3/indexer/1",
+            {"id": 1, "name": "Nyaa", "tags": [tag_ids["anime"]]},
+        )
+    return plan
+
+
+def test_record(sonarr_api) -> None:
+    """
+    Check that writes are recorded to the plan instead of being sent,
+    and that resources created by the plan are visible to later writes
+    using placeholder IDs.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(TAGS)
+
+    plan = _record_plan(sonarr_api)
+
+    sonarr_api.server.check_assertions()
+    assert plan.reads == {"/api/v3/tag": get_digest(TAGS)}
+    assert [(w.method, w.api_url, w.body, w.placeholder_id) for w in plan.writes] == [
+        ("POST", "/api/v3/tag", {"label": "anime"}, PLACEHOLDER_ID_BASE),
+        (
+            "PUT",
+            "/api/v3/indexer/1",
+            {"id": 1, "name": "Nyaa", "tags": [PLACEHOLDER_ID_BASE]},
+            None,
+        ),
+    ]
+
+
+def test_apply(sonarr_api) -> None:
+    """
+    Check that applying a plan sends its writes in order,
+    replacing placeholder IDs with the IDs of the created resources.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(TAGS)
+    plan = _record_plan(sonarr_api)
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(TAGS)
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/tag",
+        method="POST",
+        json={"label": "anime"},
+    ).respond_with_json({"id": 5, "label": "anime"}, status=201)
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/indexer/1",
+        method="PUT",
+        json={"id": 1, "name": "Nyaa", "tags": [5]},
+    ).respond_with_json({"id": 1, "name": "Nyaa", "tags": [5]}, status=202)
+
+    assert apply_plan(sonarr_api.secrets, plan) == 2  # noqa: PLR2004
+    sonarr_api.server.check_assertions()
+
+
+def test_apply_changed(sonarr_api) -> None:
+    """
+    Check that a plan is rejected without sending any writes
+    if the remote state has changed since it was created.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(TAGS)
+    plan = _record_plan(sonarr_api)
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(
+        [*TAGS, {"id": 2, "label": "anime"}],
+    )
+
+    with pytest.raises(SonarrPlanError, match=r"changed resources: /api/v3/tag"):
+        apply_plan(sonarr_api.secrets, plan)
+    sonarr_api.server.check_assertions()
+
+
+def test_save_load(tmp_path) -> None:
+    """
+    Check that plans can be saved to a file and loaded again,
+    and that modified plans are rejected.
+    """
+
+    plan = SonarrPlan(host_url="http://sonarr:8989", reads={"/api/v3/tag": "0123456789abcdef"})
+    plan.record_write("POST", "/api/v3/tag", {"label": "anime"}, 201, "sonarr.settings.tags")
+    plan.record_write("DELETE", "/api/v3/tag/1", None, 200, "sonarr.settings.tags")
+    plan_file = tmp_path / "plan.json"
+
+    save_plans(plan_file, [plan])
+    assert load_plans(plan_file) == [plan]
+
+    data = json.loads(plan_file.read_text())
+    data["plans"][0]["reads"]["/api/v3/tag"] = "fedcba9876543210"
+    plan_file.write_text(json.dumps(data))
+    with pytest.raises(SonarrPlanError, match=r"fingerprint mismatch"):
+        load_plans(plan_file)
+
+
+def test_digest_ignores_volatile_fields() -> None:
+    """
+    Check that attributes that change without any configuration change
+    do not affect resource digests.
+    """
+
+    assert get_digest([{"id": 1, "path": "/tv", "freeSpace": 1}]) == get_digest(
+        [{"path": "/tv", "id": 1, "freeSpace": 2}],
+    )
+    assert get_digest([{"id": 1, "path": "/tv"}]) != get_digest([{"id": 1, "path": "/anime"}])
+
+
+@pytest.mark.parametrize(
+    "items",
+    [[], [{"id": 1, "path": "/tv", "freeSpace": 1}], [{"id": 1, "path": "/tv"}, "é", 2, None]],
+)
+def test_list_digest(items) -> None:
+    """
+    Check that list digests computed one item at a time match the digest of the whole list.
+    """
+
+    list_digest = SonarrListDigest()
+    for item in items:
+        list_digest.add(item)
+
+    assert list_digest.get_digest() == get_digest(items)
+
+
+def test_resolve_placeholder_ids() -> None:
+    """
+    Check that placeholder IDs are only replaced in ID attributes and API command paths.
+    """
+
+    ids = {PLACEHOLDER_ID_BASE: 5}
+    assert resolve_placeholder_ids(
+        {
+            "id": PLACEHOLDER_ID_BASE,
+            "tags": [1, PLACEHOLDER_ID_BASE],
+            "downloadClientId": PLACEHOLDER_ID_BASE,
+            "fields": [{"name": "minimumSeeders", "value": PLACEHOLDER_ID_BASE}],
+        },
+        ids,
+    ) == {
+        "id": 5,
+        "tags": [1, 5],
+        "downloadClientId": 5,
+        "fields": [{"name": "minimumSeeders", "value": PLACEHOLDER_ID_BASE}],
+    }
+    assert resolve_placeholder_api_url(f"/api/v3/tag/{PLACEHOLDER_ID_BASE}", ids) == (
+        "/api/v3/tag/5"
+    )
+    assert resolve_placeholder_api_url("/api/v3/tag/-1", ids) == "/api/v3/tag/-1"
@@ -0,0 +1,158 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the retry policy and circuit breaker in the Sonarr plugin API module.
+"""
+
+from __future__ import annotations
+
+import pytest
+import requests
+
+from buildarr_sonarr.api import api_get, api_post
+from buildarr_sonarr.exceptions import SonarrAPICircuitOpenError, SonarrAPIError
+from buildarr_sonarr.retry import (
+    DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT,
+    DEFAULT_CIRCUIT_BREAKER_THRESHOLD,
+    RetryPolicy,
+    configure_circuit_breakers,
+    get_circuit_breaker,
+    set_retry_policy,
+)
+
+
+@pytest.fixture(autouse=True)
+def _retry_policy(mocker):
+    mocker.patch("buildarr_sonarr.api.time.sleep")
+    set_retry_policy(RetryPolicy(max_retries=2))
+    configure_circuit_breakers(failure_threshold=3, reset_timeout=60)
+    yield
+    set_retry_policy(RetryPolicy())
+    configure_circuit_breakers(
+        failure_threshold=DEFAULT_CIRCUIT_BREAKER_THRESHOLD,
+        reset_timeout=DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT,
+    )
+
+
+def test_retry_status_code(sonarr_api) -> None:
+    """
+    Check that idempotent requests are retried when a listed status code is returned.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_data(
+        "Bad Gateway",
+        status=502,
+    )
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json([])
+
+    assert api_get(sonarr_api.secrets, "/api/v3/tag") == []
+    assert not get_circuit_breaker(sonarr_api.secrets.host_url).is_open
+
+
+def test_retry_exhausted(sonarr_api) -> None:
+    """
+    Check that the last response is handled as normal once all retries are used up.
+    """
+
+    for _ in range(3):
+        sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(
+            {"message": "Service Unavailable"},
+            status=503,
+        )
+
+    with pytest.raises(SonarrAPIError, match="Service Unavailable") as exc_info:
+        api_get(sonarr_api.secrets, "/api/v3/tag")
+
+    assert exc_info.value.status_code == 503  # noqa: PLR2004
+    assert get_circuit_breaker(sonarr_api.secrets.host_url).failures == 1
+
+
+def test_no_retry_non_idempotent(sonarr_api) -> None:
+    """
+    Check that non-idempotent requests are not retried.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="POST").respond_with_json(
+        {"message": "Bad Gateway"},
+        status=502,
+    )
+
+    with pytest.raises(SonarrAPIError, match="Bad Gateway"):
+        api_post(sonarr_api.secrets, "/api/v3/tag", {"label": "test"})
+
+
+def test_retry_connection_error(mocker) -> None:
+    """
+    Check that connection errors are retried, and open the circuit when they persist
+    for the failure threshold of requests (not retry attempts).
+    """
+
+    host_url = "http://127.0.0.1:1"
+    secrets = mocker.Mock(host_url=host_url)
+    secrets.api_key.get_secret_value.return_value = "abcdefghijklmnopqrstuvwxyz012345"
+    session_request = mocker.spy(requests.Session, "request")
+
+    with pytest.raises(requests.ConnectionError):
+        api_get(secrets, "/api/v3/tag")
+
+    assert session_request.call_count == 3  # noqa: PLR2004
+    assert get_circuit_breaker(host_url).failures == 1
+    assert not get_circuit_breaker(host_url).is_open
+
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            api_get(secrets, "/api/v3/tag")
+
+    assert get_circuit_breaker(host_url).is_open
+
+    with pytest.raises(SonarrAPICircuitOpenError):
+        api_get(secrets, "/api/v3/tag")
+
+
+def test_circuit_breaker_half_open(mocker) -> None:
+    """
+    Check that the circuit lets a trial request through after the reset timeout,
+    and closes again if it succeeds.
+    """
+
+    monotonic = mocker.patch("buildarr_sonarr.retry.time.monotonic", return_value=100.0)
+    breaker = get_circuit_breaker("http://sonarr:8989")
+
+    for _ in range(3):
+        breaker.record_failure()
+
+    with pytest.raises(SonarrAPICircuitOpenError):
+        breaker.before_request("GET", "http://sonarr:8989/api/v3/tag")
+
+    monotonic.return_value = 160.0
+    breaker.before_request("GET", "http://sonarr:8989/api/v3/tag")
+    with pytest.raises(SonarrAPICircuitOpenError):
+        breaker.before_request("GET", "http://sonarr:8989/api/v3/tag")
+
+    breaker.record_success()
+    assert not breaker.is_open
+    breaker.before_request("GET", "http://sonarr:8989/api/v3/tag")
+
+
+def test_backoff_retry_after() -> None:
+    """
+    Check that the `Retry-After` header is honoured, up to the maximum backoff.
+    """
+
+    policy = RetryPolicy(backoff_max=10)
+
+    assert policy.get_backoff(0, "2") == 2  # noqa: PLR2004
+    assert policy.get_backoff(0, "3600") == 10  # noqa: PLR2004
+    assert 0 <= policy.get_backoff(10, "invalid") <= 10  # noqa: PLR2004
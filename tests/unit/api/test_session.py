@@ -0,0 +1,94 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the pooled HTTP session management in the Sonarr plugin API module.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from buildarr_sonarr import api
+from buildarr_sonarr.api import api_get, close_sessions, get_session, set_session_pool_size
+
+
+@pytest.fixture(autouse=True)
+def _close_sessions():
+    yield
+    close_sessions()
+    set_session_pool_size(api.DEFAULT_SESSION_POOL_SIZE)
+
+
+def test_session_reused() -> None:
+    """
+    Check that the same session is returned for the same instance.
+    """
+
+    assert get_session("http://sonarr:8989") is get_session("http://sonarr:8989")
+
+
+def test_session_per_instance() -> None:
+    """
+    Check that different instances get their own sessions.
+    """
+
+    assert get_session("http://sonarr1:8989") is not get_session("http://sonarr2:8989")
+
+
+def test_close_sessions() -> None:
+    """
+    Check that closing the sessions causes a new session to be created on the next request.
+    """
+
+    session = get_session("http://sonarr:8989")
+    close_sessions()
+
+    assert get_session("http://sonarr:8989") is not session
+
+
+def test_pool_size() -> None:
+    """
+    Check that the configured pool size is applied to new sessions.
+    """
+
+    pool_size = 3
+    set_session_pool_size(pool_size)
+
+    adapter = get_session("http://sonarr:8989").get_adapter("http://sonarr:8989")
+
+    assert adapter._pool_maxsize == pool_size  # type: ignore[attr-defined]
+
+
+def test_pool_size_invalid() -> None:
+    """
+    Check that an invalid pool size is rejected.
+    """
+
+    with pytest.raises(ValueError, match="Invalid session pool size"):
+        set_session_pool_size(0)
+
+
+def test_api_get_uses_session(sonarr_api) -> None:
+    """
+    Check that API requests use the pooled session for the instance by default.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json([])
+
+    session = get_session(sonarr_api.secrets.host_url)
+    api_get(sonarr_api.secrets, "/api/v3/tag")
+
+    assert get_session(sonarr_api.secrets.host_url) is session
+    assert sonarr_api.secrets.host_url in api._sessions
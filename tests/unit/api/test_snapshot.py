@@ -0,0 +1,289 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the per-run remote resource snapshot.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from buildarr.manager import ManagerPlugin
+
+from buildarr_sonarr.api import (
+    api_delete,
+    api_get,
+    api_get_ids,
+    api_get_iter,
+    api_post,
+    api_put,
+    api_section,
+)
+from buildarr_sonarr.config import SonarrInstanceConfig
+from buildarr_sonarr.config.tags import SonarrTagsSettingsConfig
+from buildarr_sonarr.exceptions import SonarrAPIError
+from buildarr_sonarr.manager import SonarrManager
+from buildarr_sonarr.plan import get_digest
+from buildarr_sonarr.snapshot import SonarrSnapshot, get_snapshot, use_snapshot
+from buildarr_sonarr.sync_state import SonarrSectionSync, use_section_sync
+
+TAGS = [{"id": 1, "label": "shows"}, {"id": 2, "label": "anime"}]
+
+
+@pytest.mark.parametrize(
+    ("api_url", "resource"),
+    [
+        ("/api/v3/tag", "tag"),
+        ("/api/v3/config/host", "config/host"),
+        ("api/v3/config/naming", "config/naming"),
+        ("/api/v3/rootfolder", None),
+        ("/api/v3/tag/1", None),
+        ("/api/v3/indexer/schema", None),
+        ("/api/v3/indexer?forceSave=true", None),
+        ("/api/v3/releaseprofile", None),
+    ],
+)
+def test_get_resource(api_url, resource) -> None:
+    """
+    Check that only reads of whole snapshot resources are served from the snapshot.
+    """
+
+    assert SonarrSnapshot.get_resource(api_url) == resource
+
+
+def test_fetch_once(sonarr_api) -> None:
+    """
+    Check that a resource is only fetched once while the snapshot is active,
+    and that copies of it are returned.
+    """
+
+    sonarr_api.server.expect_oneshot_request("/api/v3/tag", method="GET").respond_with_json(TAGS)
+
+    with use_snapshot(SonarrSnapshot(sonarr_api.secrets.host_url)) as snapshot:
+        api_get(sonarr_api.secrets, "/api/v3/tag")[0]["label"] = "movies"
+        assert api_get(sonarr_api.secrets, "/api/v3/tag") == TAGS
+        assert list(api_get_iter(sonarr_api.secrets, "/api/v3/tag", fields=("id",))) == [
+            {"id": 1},
+            {"id": 2},
+        ]
+        assert api_get_ids(sonarr_api.secrets, "/api/v3/tag", key="label") == {
+            "shows": 1,
+            "anime": 2,
+        }
+
+    sonarr_api.server.check_assertions()
+    assert (snapshot.hits, snapshot.misses) == (3, 1)
+
+
+def test_section_read_digests(sonarr_api) -> None:
+    """
+    Check that the digests of snapshot resources read by settings sections are recorded,
+    and kept up to date with the writes applied to the snapshot.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(TAGS)
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="POST").respond_with_json(
+        {"id": 3, "label": "new"},
+        status=201,
+    )
+
+    section_sync = SonarrSectionSync(sonarr_api.secrets.host_url)
+    with use_snapshot(SonarrSnapshot(sonarr_api.secrets.host_url)), use_section_sync(
+        section_sync,
+    ):
+        with api_section("sonarr.settings.indexers"):
+            api_get_ids(sonarr_api.secrets, "/api/v3/tag", key="label")
+        with api_section("sonarr.settings.tags"):
+            api_post(sonarr_api.secrets, "/api/v3/tag", {"label": "new"})
+            api_get(sonarr_api.secrets, "/api/v3/tag")
+
+    sonarr_api.server.check_assertions()
+    assert section_sync.reads == {
+        "indexers": {"/api/v3/tag": get_digest(TAGS)},
+        "tags": {"/api/v3/tag": get_digest([*TAGS, {"id": 3, "label": "new"}])},
+    }
+
+
+def test_inactive(sonarr_api) -> None:
+    """
+    Check that resources are fetched on every read outside of a snapshot context,
+    or when the snapshot is for a different instance.
+    """
+
+    for _ in range(2):
+        sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(
+            TAGS,
+        )
+
+    assert get_snapshot(sonarr_api.secrets.host_url) is None
+    assert api_get_ids(sonarr_api.secrets, "/api/v3/tag", key="label") == {"shows": 1, "anime": 2}
+    with use_snapshot(SonarrSnapshot("http://sonarr.example.com:8989")):
+        assert get_snapshot(sonarr_api.secrets.host_url) is None
+        assert api_get(sonarr_api.secrets, "/api/v3/tag") == TAGS
+
+    sonarr_api.server.check_assertions()
+
+
+@pytest.mark.parametrize(
+    ("method", "api_url", "status", "expected"),
+    [
+        (
+            "POST",
+            "/api/v3/tag",
+            201,
+            [{"id": 1, "label": "shows"}, {"id": 2, "label": "anime"}, {"id": 3, "label": "new"}],
+        ),
+        ("PUT", "/api/v3/tag/2", 202, [{"id": 1, "label": "shows"}, {"id": 2, "label": "new"}]),
+        ("DELETE", "/api/v3/tag/2", 200, [{"id": 1, "label": "shows"}]),
+    ],
+)
+def test_write_applied(sonarr_api, method, api_url, status, expected) -> None:
+    """
+    Check that writes to a collection are applied to the snapshot in place,
+    without fetching the collection again.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(TAGS)
+    sonarr_api.server.expect_ordered_request(api_url, method=method).respond_with_json(
+        {"id": 3 if method == "POST" else 2, "label": "new"},
+        status=status,
+    )
+
+    with use_snapshot(SonarrSnapshot(sonarr_api.secrets.host_url)):
+        assert api_get_ids(sonarr_api.secrets, "/api/v3/tag", key="label") == {
+            "shows": 1,
+            "anime": 2,
+        }
+        if method == "POST":
+            api_post(sonarr_api.secrets, api_url, {"label": "new"})
+        elif method == "PUT":
+            api_put(sonarr_api.secrets, api_url, {"id": 2, "label": "new"})
+        else:
+            api_delete(sonarr_api.secrets, api_url)
+        assert api_get(sonarr_api.secrets, "/api/v3/tag") == expected
+        assert api_get_ids(sonarr_api.secrets, "/api/v3/tag", key="label") == {
+            tag["label"]: tag["id"] for tag in expected
+        }
+
+    sonarr_api.server.check_assertions()
+
+
+def test_singleton_write_applied(sonarr_api) -> None:
+    """
+    Check that updates to configuration singletons replace the snapshot resource.
+    """
+
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/config/host",
+        method="GET",
+    ).respond_with_json({"id": 1, "port": 8989})
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/config/host/1",
+        method="PUT",
+    ).respond_with_json({"id": 1, "port": 9000}, status=202)
+
+    with use_snapshot(SonarrSnapshot(sonarr_api.secrets.host_url)):
+        config = api_get(sonarr_api.secrets, "/api/v3/config/host")
+        api_put(sonarr_api.secrets, "/api/v3/config/host/1", {**config, "port": 9000})
+        assert api_get(sonarr_api.secrets, "/api/v3/config/host") == {"id": 1, "port": 9000}
+
+    sonarr_api.server.check_assertions()
+
+
+@pytest.mark.parametrize(
+    ("api_url", "status"),
+    [("/api/v3/indexer/bulk", 202), ("/api/v3/indexer/1", 500)],
+)
+def test_write_discards(sonarr_api, api_url, status) -> None:
+    """
+    Check that writes that cannot be applied in place, and failed writes,
+    cause the collection to be fetched again on the next read.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/indexer", method="GET").respond_with_json(
+        [{"id": 1, "name": "Nyaa"}],
+    )
+    sonarr_api.server.expect_ordered_request(api_url, method="PUT").respond_with_json(
+        [{"id": 1, "name": "Anime"}] if status == 202 else {"message": "Error"},  # noqa: PLR2004
+        status=status,
+    )
+    sonarr_api.server.expect_ordered_request("/api/v3/indexer", method="GET").respond_with_json(
+        [{"id": 1, "name": "Anime"}],
+    )
+
+    with use_snapshot(SonarrSnapshot(sonarr_api.secrets.host_url)):
+        assert api_get_ids(sonarr_api.secrets, "/api/v3/indexer") == {"Nyaa": 1}
+        try:
+            api_put(sonarr_api.secrets, api_url, {"id": 1, "name": "Anime"})
+        except SonarrAPIError:
+            pass
+        assert api_get_ids(sonarr_api.secrets, "/api/v3/indexer") == {"Anime": 1}
+
+    sonarr_api.server.check_assertions()
+
+
+def test_created_tags_visible(sonarr_api) -> None:
+    """
+    Check that tags created by the `tags` section are visible to later sections
+    without fetching the tags again.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(
+        [{"id": 1, "label": "shows"}],
+    )
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="POST").respond_with_json(
+        {"id": 2, "label": "anime"},
+        status=201,
+    )
+
+    with use_snapshot(SonarrSnapshot(sonarr_api.secrets.host_url)):
+        assert SonarrTagsSettingsConfig(definitions=["shows", "anime"]).update_remote(
+            tree="sonarr.settings.tags",
+            secrets=sonarr_api.secrets,
+            remote=SonarrTagsSettingsConfig(definitions=["shows"]),
+        )
+        assert api_get_ids(sonarr_api.secrets, "/api/v3/tag", key="label") == {
+            "shows": 1,
+            "anime": 2,
+        }
+
+    sonarr_api.server.check_assertions()
+
+
+def test_refetched_for_delete(sonarr_api, mocker) -> None:
+    """
+    Check that the snapshot is shared by the stages of the update pass of a run,
+    and that the remote configuration is fetched again for the delete pass.
+    """
+
+    for tags in (TAGS, TAGS[:1]):
+        sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(
+            tags,
+        )
+    mocker.patch.object(ManagerPlugin, "update_remote", return_value=False)
+
+    manager = SonarrManager()
+    with manager._stage("from_remote", sonarr_api.secrets):
+        assert api_get(sonarr_api.secrets, "/api/v3/tag") == TAGS
+    assert not manager.update_remote(
+        "sonarr",
+        SonarrInstanceConfig(),
+        sonarr_api.secrets,
+        SonarrInstanceConfig(),
+    )
+    with manager._stage("from_remote", sonarr_api.secrets):
+        assert api_get(sonarr_api.secrets, "/api/v3/tag") == TAGS[:1]
+
+    sonarr_api.server.check_assertions()
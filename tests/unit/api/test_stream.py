@@ -0,0 +1,164 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test streamed JSON decoding of list API responses.
+"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from buildarr_sonarr import api
+from buildarr_sonarr.api import _iter_json_array, api_get_iter
+from buildarr_sonarr.config import SonarrInstanceConfig, SonarrSettingsConfig
+from buildarr_sonarr.exceptions import SonarrAPIError
+from buildarr_sonarr.manager import SonarrManager
+from buildarr_sonarr.plan import disable_planning, enable_planning, get_digest
+from buildarr_sonarr.sync_state import set_sync_state_file
+
+from ..config.settings.media_management.util import (
+    MEDIAMANAGEMENT_CONFIG_DEFAULTS,
+    NAMING_CONFIG_DEFAULTS,
+)
+
+ROOT_FOLDERS = [
+    {
+        "id": 1,
+        "path": "/media/tv",
+        "freeSpace": 1234567890123,
+        "unmappedFolders": [{"name": "Série", "path": "/media/tv/Série"}],
+    },
+    {"id": 22, "path": "/media/anime", "freeSpace": -1.5e3, "unmappedFolders": []},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1024])
+def test_iter_json_array_chunked(chunk_size) -> None:
+    """
+    Check that array items are decoded correctly regardless of where chunks are split,
+    including inside multi-byte characters and numbers.
+    """
+
+    data = json.dumps(ROOT_FOLDERS, ensure_ascii=False, indent=2).encode("utf-8")
+
+    assert (
+        list(
+            _iter_json_array(data[i : i + chunk_size] for i in range(0, len(data), chunk_size)),
+        )
+        == ROOT_FOLDERS
+    )
+
+
+@pytest.mark.parametrize("data", [b"[]", b"  [ ]  "])
+def test_iter_json_array_empty(data) -> None:
+    """
+    Check that empty arrays yield no items.
+    """
+
+    assert list(_iter_json_array([data])) == []
+
+
+def test_iter_json_array_object() -> None:
+    """
+    Check that a non-array response is yielded as a single item.
+    """
+
+    assert list(_iter_json_array([b'{"id"', b": 1}"])) == [{"id": 1}]
+
+
+@pytest.mark.parametrize("data", [b"", b"[1, 2", b"[1 2]"])
+def test_iter_json_array_invalid(data) -> None:
+    """
+    Check that truncated or malformed arrays raise an error.
+    """
+
+    with pytest.raises(ValueError):
+        list(_iter_json_array([data]))
+
+
+def test_api_get_iter(sonarr_api) -> None:
+    """
+    Check that streamed items are returned in order, with only the requested fields.
+    """
+
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/rootfolder",
+        method="GET",
+    ).respond_with_json(ROOT_FOLDERS)
+
+    assert list(
+        api_get_iter(sonarr_api.secrets, "/api/v3/rootfolder", fields=("id", "path")),
+    ) == [{"id": 1, "path": "/media/tv"}, {"id": 22, "path": "/media/anime"}]
+
+
+def test_api_get_iter_error(sonarr_api) -> None:
+    """
+    Check that an unexpected response status raises an API error.
+    """
+
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/rootfolder",
+        method="GET",
+    ).respond_with_json({"message": "Unauthorized"}, status=401)
+
+    with pytest.raises(SonarrAPIError, match="Unauthorized") as exc_info:
+        list(api_get_iter(sonarr_api.secrets, "/api/v3/rootfolder"))
+
+    assert exc_info.value.status_code == 401  # noqa: PLR2004
+
+
+def test_from_remote_streamed(sonarr_api, tmp_path, mocker) -> None:
+    """
+    Check that root folders are streamed when the remote configuration is read
+    in a Buildarr run, with the remote snapshot, change planning and incremental sync
+    all active, and that their digests are still recorded.
+    """
+
+    sonarr_api.server.expect_request("/api/v3/config/naming", method="GET").respond_with_json(
+        NAMING_CONFIG_DEFAULTS,
+    )
+    sonarr_api.server.expect_request(
+        "/api/v3/config/mediamanagement",
+        method="GET",
+    ).respond_with_json(MEDIAMANAGEMENT_CONFIG_DEFAULTS)
+    sonarr_api.server.expect_request("/api/v3/rootfolder", method="GET").respond_with_json(
+        ROOT_FOLDERS,
+    )
+    # Only read the media management section.
+    for section_name, field in SonarrSettingsConfig.model_fields.items():
+        if section_name != "media_management":
+            mocker.patch.object(field.annotation, "from_remote", return_value=field.annotation())
+    mocker.patch("buildarr_sonarr.manager.get_capabilities")
+    get = mocker.spy(api, "_get")
+
+    set_sync_state_file(tmp_path / "sync-state.json")
+    planner = enable_planning(tmp_path / "plan.json")
+    try:
+        manager = SonarrManager()
+        remote = manager.from_remote(SonarrInstanceConfig(), sonarr_api.secrets)
+    finally:
+        disable_planning()
+        set_sync_state_file(None)
+
+    assert remote.settings.media_management.root_folders == {"/media/tv", "/media/anime"}
+    assert "/api/v3/rootfolder" not in [call.args[2] for call in get.call_args_list]
+    assert manager._section_syncs[sonarr_api.secrets.host_url].reads["media_management"][
+        "/api/v3/rootfolder"
+    ] == get_digest(ROOT_FOLDERS)
+    assert planner.get_plan(sonarr_api.secrets.host_url).reads["/api/v3/rootfolder"] == (
+        get_digest(ROOT_FOLDERS)
+    )
@@ -0,0 +1,126 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test API trace logging.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+
+import pytest
+import requests
+
+from buildarr_sonarr import api
+from buildarr_sonarr.api import (
+    api_get,
+    api_post,
+    disable_api_trace,
+    enable_api_trace,
+    set_api_trace_max_bytes,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_api_trace():
+    yield
+    disable_api_trace()
+    set_api_trace_max_bytes(api.DEFAULT_API_TRACE_MAX_BYTES)
+
+
+def test_trace_file(sonarr_api, tmp_path) -> None:
+    """
+    Check that one JSON record is written per request, with the expected metadata.
+    """
+
+    trace_file = tmp_path / "trace.jsonl"
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json([])
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/tag",
+        method="POST",
+        json={"label": "shows"},
+    ).respond_with_json({"id": 1, "label": "shows"}, status=201)
+
+    enable_api_trace(trace_file)
+    api_get(sonarr_api.secrets, "/api/v3/tag")
+    api_post(sonarr_api.secrets, "/api/v3/tag", {"label": "shows"})
+    disable_api_trace()
+
+    get_record, post_record = (json.loads(line) for line in trace_file.read_text().splitlines())
+    assert get_record["method"] == "GET"
+    assert get_record["url"] == f"{sonarr_api.secrets.host_url}/api/v3/tag"
+    assert get_record["status"] == 200  # noqa: PLR2004
+    assert get_record["req_bytes"] == 0
+    assert get_record["res_bytes"] == len(get_record["res"])
+    assert get_record["latency_ms"] >= 0
+    assert post_record["status"] == 201  # noqa: PLR2004
+    assert json.loads(post_record["req"]) == {"label": "shows"}
+    assert json.loads(post_record["res"]) == {"id": 1, "label": "shows"}
+
+
+def test_trace_truncated(sonarr_api, tmp_path) -> None:
+    """
+    Check that payloads over the configured size are truncated.
+    """
+
+    trace_file = tmp_path / "trace.jsonl"
+    tags = [{"id": i, "label": f"tag{i}"} for i in range(100)]
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(tags)
+
+    set_api_trace_max_bytes(16)
+    enable_api_trace(trace_file)
+    assert api_get(sonarr_api.secrets, "/api/v3/tag") == tags
+    disable_api_trace()
+
+    record = json.loads(trace_file.read_text())
+    assert record["res"].endswith(" bytes truncated)")
+    assert record["res"].index("...(") == 16  # noqa: PLR2004
+    assert record["res_bytes"] > 16  # noqa: PLR2004
+
+
+def test_trace_without_raw_response(tmp_path) -> None:
+    """
+    Check that responses without an underlying raw response (e.g. responses built
+    in memory) are traced using the size of the response body.
+    """
+
+    trace_file = tmp_path / "trace.jsonl"
+    res = requests.Response()
+    res.status_code = 200
+    res._content = b"[]"
+    res.request = requests.Request("GET", "http://sonarr:8989/api/v3/tag").prepare()
+
+    enable_api_trace(trace_file)
+    api._trace("GET", "http://sonarr:8989/api/v3/tag", res, 0.1)
+    disable_api_trace()
+
+    record = json.loads(trace_file.read_text())
+    assert record["res_bytes"] == 2  # noqa: PLR2004
+    assert record["res_wire_bytes"] == 2  # noqa: PLR2004
+
+
+def test_payloads_not_formatted_when_disabled(sonarr_api, mocker, caplog) -> None:
+    """
+    Check that payloads are not serialised for logging when debug logging is disabled.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json([])
+    caplog.set_level(logging.INFO, logger="buildarr_sonarr")
+    truncate = mocker.spy(api, "_truncate")
+
+    api_get(sonarr_api.secrets, "/api/v3/tag")
+
+    truncate.assert_not_called()
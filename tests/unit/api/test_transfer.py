@@ -0,0 +1,78 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test response compression negotiation and transfer size accounting.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+
+from werkzeug import Request, Response
+
+from buildarr_sonarr.api import api_get, api_get_iter, api_section, transfer_accounting
+
+ROOT_FOLDERS = [{"id": i, "path": f"/media/tv{i}", "unmappedFolders": []} for i in range(50)]
+
+
+def _gzip_response(request: Request) -> Response:
+    assert "gzip" in request.headers["Accept-Encoding"]
+    return Response(
+        gzip.compress(json.dumps(ROOT_FOLDERS).encode("utf-8")),
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+    )
+
+
+def test_compressed_transfer(sonarr_api) -> None:
+    """
+    Check that compressed responses are decoded, and that both the compressed
+    and decompressed sizes are recorded against the active section.
+    """
+
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/rootfolder",
+        method="GET",
+    ).respond_with_handler(_gzip_response)
+
+    with transfer_accounting() as accounting:
+        with api_section("sonarr.settings.media_management"):
+            assert api_get(sonarr_api.secrets, "/api/v3/rootfolder") == ROOT_FOLDERS
+
+    stats = accounting.sections["sonarr.settings.media_management"]
+    assert stats.requests == 1
+    assert stats.sent_bytes == 0
+    assert stats.decoded_bytes == len(json.dumps(ROOT_FOLDERS))
+    assert 0 < stats.received_bytes < stats.decoded_bytes
+    assert accounting.total.compression_ratio > 1
+
+
+def test_compressed_transfer_streamed(sonarr_api) -> None:
+    """
+    Check that transfer sizes are also recorded for streamed responses.
+    """
+
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/rootfolder",
+        method="GET",
+    ).respond_with_handler(_gzip_response)
+
+    with transfer_accounting() as accounting:
+        assert list(api_get_iter(sonarr_api.secrets, "/api/v3/rootfolder")) == ROOT_FOLDERS
+
+    stats = accounting.sections[""]
+    assert stats.requests == 1
+    assert stats.decoded_bytes == len(json.dumps(ROOT_FOLDERS))
+    assert 0 < stats.received_bytes < stats.decoded_bytes
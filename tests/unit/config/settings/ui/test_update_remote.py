@@ -288,3 +288,31 @@ def test_enable_color_impaired_mode(sonarr_api, attr_value) -> None:
         secrets=sonarr_api.secrets,
         remote=UISettings(enable_color_impaired_mode=not attr_value),
     )
+
+
+def test_remote_attrs_reused(sonarr_api) -> None:
+    """
+    Check that the API object a remote configuration was read from is reused
+    when updating the remote instance, instead of being fetched again.
+    """
+
+    api_ui_config = {**UI_CONFIG_DEFAULTS, "id": 1, "showRelativeDates": False}
+
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/config/ui",
+        method="GET",
+    ).respond_with_json({**UI_CONFIG_DEFAULTS, "id": 1})
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/config/ui/1",
+        method="PUT",
+        json=api_ui_config,
+    ).respond_with_json(api_ui_config, status=202)
+
+    remote = UISettings.from_remote(sonarr_api.secrets)
+    assert remote == UISettings()
+    assert UISettings(show_relative_dates=False).update_remote(
+        tree="sonarr.settings.ui",
+        secrets=sonarr_api.secrets,
+        remote=remote,
+    )
+    sonarr_api.server.check_assertions()
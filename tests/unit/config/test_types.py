@@ -0,0 +1,119 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the configuration utility classes and functions.
+"""
+
+from __future__ import annotations
+
+import copy
+
+from buildarr_sonarr.api import _api_definition
+from buildarr_sonarr.config.download_clients.remote_path_mappings import RemotePathMapping
+from buildarr_sonarr.config.types import definition_method, get_remote_ids
+from buildarr_sonarr.config.ui import SonarrUISettingsConfig as UISettings
+
+
+def test_remote_attrs_not_compared() -> None:
+    """
+    Check that the API object a remote configuration was read from
+    does not affect comparisons between configuration objects.
+    """
+
+    assert UISettings()._with_remote_attrs({"id": 1}) == UISettings()
+    assert UISettings()._with_remote_attrs({"id": 1}) != UISettings(show_relative_dates=False)
+    assert UISettings()._with_remote_attrs({"id": 1}, key="naming") == UISettings()
+
+
+def test_remote_attrs_definition() -> None:
+    """
+    Check that the API object a resource definition was read from is kept by copies,
+    and does not affect comparisons or serialisation of the definition.
+    """
+
+    rpm = RemotePathMapping(host="sabnzbd", remote_path="/downloads", local_path="/data")
+    remote_rpm = rpm.model_copy()._with_remote_attrs({"id": 1})
+
+    assert remote_rpm == rpm
+    assert remote_rpm.model_dump() == rpm.model_dump()
+    assert "_remote_attrs" not in remote_rpm.__dict__
+    assert rpm._remote_attrs is None
+    assert remote_rpm.model_copy()._remote_attrs == {"id": 1}
+    assert copy.deepcopy(remote_rpm)._remote_attrs == {"id": 1}
+    assert remote_rpm != rpm.model_copy(update={"host": "nzbget"})
+
+
+def test_get_remote_attrs_keyed(sonarr_api) -> None:
+    """
+    Check that additional API objects are kept separately from the main API object,
+    and only fetched from the instance if they are not known.
+    """
+
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/config/naming",
+        method="GET",
+    ).respond_with_json({"id": 2})
+
+    ui = UISettings()._with_remote_attrs({"id": 1})
+    assert ui._get_remote_attrs(sonarr_api.secrets, "/api/v3/config/ui") == {"id": 1}
+    assert ui._get_remote_attrs(sonarr_api.secrets, "/api/v3/config/naming", key="naming") == {
+        "id": 2,
+    }
+    ui._with_remote_attrs({"id": 3}, key="naming")
+    assert ui._get_remote_attrs(sonarr_api.secrets, "/api/v3/config/naming", key="naming") == {
+        "id": 3,
+    }
+    assert ui._remote_attrs == {"id": 1}
+    sonarr_api.server.check_assertions()
+
+
+def test_definition_method() -> None:
+    """
+    Check that methods decorated as definition methods attribute their API requests
+    to the definition tree passed to them.
+    """
+
+    class Definition:
+        @definition_method
+        def _update_remote(self, tree, secrets=None):
+            return _api_definition.get()
+
+    assert Definition()._update_remote("sonarr.settings.tags.definitions[0]") == (
+        "sonarr.settings.tags.definitions[0]"
+    )
+    assert Definition()._update_remote(tree="sonarr.settings.tags.definitions[1]") == (
+        "sonarr.settings.tags.definitions[1]"
+    )
+    assert not Definition()._update_remote(None)
+
+
+def test_get_remote_ids(sonarr_api) -> None:
+    """
+    Check that resource IDs are taken from the API objects definitions were read from,
+    and only fetched from the instance if any definition was not read from an API object.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/indexer", method="GET").respond_with_json(
+        [{"id": 1, "name": "Nyaa"}, {"id": 2, "name": "Anime"}],
+    )
+
+    definitions = {"Nyaa": UISettings()._with_remote_attrs({"id": 1, "name": "Nyaa"})}
+    assert get_remote_ids(sonarr_api.secrets, "/api/v3/indexer", definitions) == {"Nyaa": 1}
+    assert get_remote_ids(
+        sonarr_api.secrets,
+        "/api/v3/indexer",
+        {**definitions, "Anime": UISettings()},
+    ) == {"Nyaa": 1, "Anime": 2}
+    sonarr_api.server.check_assertions()
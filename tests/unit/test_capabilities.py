@@ -0,0 +1,156 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the Sonarr plugin version-keyed capability registry.
+"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from buildarr_sonarr.capabilities import (
+    SonarrCapabilitiesRegistry,
+    find_capabilities,
+    get_capabilities,
+    set_capabilities_registry,
+)
+from buildarr_sonarr.config.profiles.language import Language, SonarrLanguageProfilesSettingsConfig
+
+
+@pytest.fixture(autouse=True)
+def _capabilities_registry(tmp_path):
+    set_capabilities_registry(tmp_path / "capabilities.json")
+    yield
+    set_capabilities_registry(None)
+
+
+def _expect_probe(server) -> None:
+    server.expect_ordered_request(
+        "/api/v3/languageprofile/schema",
+        method="GET",
+    ).respond_with_json(
+        {
+            "languages": [
+                {"language": {"id": 1, "name": "English"}, "allowed": False},
+                {"language": {"id": 8, "name": "Japanese"}, "allowed": False},
+            ],
+        },
+    )
+
+
+def test_probe(sonarr_api) -> None:
+    """
+    Check that the languages are probed from the language profile schema,
+    without any other requests being sent.
+    """
+
+    _expect_probe(sonarr_api.server)
+
+    capabilities = get_capabilities(sonarr_api.secrets)
+
+    sonarr_api.server.check_assertions()
+    assert len(sonarr_api.server.log) == 1
+    assert capabilities is not None
+    assert capabilities.languages == {"English": 1, "Japanese": 8}
+    assert find_capabilities(sonarr_api.secrets) is capabilities
+
+
+def test_probe_no_language_profiles(sonarr_api) -> None:
+    """
+    Check that the languages are probed from the language endpoint
+    on Sonarr versions without language profiles.
+    """
+
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/languageprofile/schema",
+        method="GET",
+    ).respond_with_json({"message": "Not Found"}, status=404)
+    sonarr_api.server.expect_ordered_request("/api/v3/language", method="GET").respond_with_json(
+        [{"id": 1, "name": "English"}],
+    )
+
+    capabilities = get_capabilities(sonarr_api.secrets)
+
+    sonarr_api.server.check_assertions()
+    assert capabilities is not None
+    assert capabilities.languages == {"English": 1}
+
+
+def test_persisted(sonarr_api, tmp_path) -> None:
+    """
+    Check that capabilities are only probed once per Sonarr version,
+    and persisted between runs.
+    """
+
+    _expect_probe(sonarr_api.server)
+    capabilities = get_capabilities(sonarr_api.secrets)
+    sonarr_api.server.check_assertions()
+
+    registry_path = tmp_path / "capabilities.json"
+    assert list(json.loads(registry_path.read_text())["capabilities"].keys()) == [
+        sonarr_api.secrets.version,
+    ]
+    registry = SonarrCapabilitiesRegistry(registry_path)
+    assert registry.find(sonarr_api.secrets.version) is None
+    assert registry.get(sonarr_api.secrets) == capabilities
+    assert len(sonarr_api.server.log) == 1
+
+
+def test_probe_failure(sonarr_api, caplog) -> None:
+    """
+    Check that failing to probe capabilities is not fatal.
+    """
+
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/languageprofile/schema",
+        method="GET",
+    ).respond_with_json({"message": "Internal Server Error"}, status=500)
+
+    assert get_capabilities(sonarr_api.secrets) is None
+    assert find_capabilities(sonarr_api.secrets) is None
+    assert "Unable to probe capabilities" in caplog.text
+
+
+def test_language_ids_from_capabilities(sonarr_api) -> None:
+    """
+    Check that language profiles use the languages from the capability registry,
+    instead of fetching the language profile schema.
+    """
+
+    _expect_probe(sonarr_api.server)
+    get_capabilities(sonarr_api.secrets)
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/languageprofile",
+        method="GET",
+    ).respond_with_json(
+        [
+            {
+                "id": 1,
+                "name": "Anime",
+                "upgradeAllowed": False,
+                "cutoff": {"id": 8, "name": "Japanese"},
+                "languages": [
+                    {"language": {"id": 8, "name": "Japanese"}, "allowed": True},
+                    {"language": {"id": 1, "name": "English"}, "allowed": False},
+                ],
+            },
+        ],
+    )
+
+    profiles = SonarrLanguageProfilesSettingsConfig.from_remote(sonarr_api.secrets)
+
+    assert profiles.definitions["Anime"].languages == [Language.japanese]
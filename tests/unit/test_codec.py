@@ -0,0 +1,111 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the JSON codecs used to encode and decode API requests and responses.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from buildarr_sonarr.api import get_initialize_js
+from buildarr_sonarr.codec import CODECS, get_codec
+from buildarr_sonarr.exceptions import SonarrError
+
+OBJ = {"id": 1, "name": "Série", "tags": [1, 2], "enable": True, "directory": None, "size": 1.5}
+
+
+@pytest.fixture(params=list(CODECS.keys()))
+def json_codec(request):
+    try:
+        return get_codec(request.param)
+    except SonarrError:
+        pytest.skip(f"JSON codec '{request.param}' is not available")
+
+
+def test_round_trip(json_codec) -> None:
+    """
+    Check that objects are encoded to UTF-8 JSON, and decoded back to the same object.
+    """
+
+    data = json_codec.dumps(OBJ)
+
+    assert isinstance(data, bytes)
+    assert json_codec.loads(data) == OBJ
+    assert json_codec.loads(data.decode("utf-8")) == OBJ
+
+
+def test_non_string_keys(json_codec) -> None:
+    """
+    Check that objects not supported by faster codecs are still encoded.
+    """
+
+    assert json_codec.loads(json_codec.dumps({1: "a"})) == {"1": "a"}
+
+
+def test_invalid(json_codec) -> None:
+    """
+    Check that invalid JSON raises a `ValueError`.
+    """
+
+    with pytest.raises(ValueError):
+        json_codec.loads(b"{'id': 1}")
+
+
+def test_unknown_codec() -> None:
+    """
+    Check that an error is raised for an unsupported codec.
+    """
+
+    with pytest.raises(SonarrError, match="Invalid JSON codec 'yaml'"):
+        get_codec("yaml")
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        '{"apiKey": "1a2b3c4d5e6f1a2b3c4d5e6f1a2b3c4d", "urlBase": ""}',
+        "{apiKey: '1a2b3c4d5e6f1a2b3c4d5e6f1a2b3c4d', urlBase: '',}",
+    ],
+)
+def test_initialize_js(httpserver, payload) -> None:
+    """
+    Check that `initialize.js` is parsed as JSON where possible,
+    falling back to JSON5 for JavaScript object syntax.
+    """
+
+    httpserver.expect_ordered_request("/initialize.js", method="GET").respond_with_data(
+        f"window.Sonarr = {payload};",
+    )
+
+    assert get_initialize_js(httpserver.url_for("").rstrip("/")) == {
+        "apiKey": "1a2b3c4d5e6f1a2b3c4d5e6f1a2b3c4d",
+        "urlBase": "",
+    }
+
+
+def test_initialize_js_skips_json5(httpserver, mocker) -> None:
+    """
+    Check that the JSON5 parser is not used when `initialize.js` contains valid JSON.
+    """
+
+    json5_loads = mocker.patch("buildarr_sonarr.api.json5.loads")
+    httpserver.expect_ordered_request("/initialize.js", method="GET").respond_with_data(
+        'window.Sonarr = {"apiKey": "1a2b3c4d5e6f1a2b3c4d5e6f1a2b3c4d"};',
+    )
+
+    get_initialize_js(httpserver.url_for("").rstrip("/"))
+
+    json5_loads.assert_not_called()
@@ -0,0 +1,102 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test setting run-wide plugin options using environment variables.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from buildarr_sonarr import api, config, secrets
+from buildarr_sonarr.environment import configure_from_environment
+from buildarr_sonarr.exceptions import SonarrError
+from buildarr_sonarr.journal import get_journal, set_journal_file
+from buildarr_sonarr.retry import RetryPolicy, get_retry_policy, set_retry_policy
+from buildarr_sonarr.sync_state import (
+    get_sync_state,
+    is_full_sync,
+    set_full_sync,
+    set_sync_state_file,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_options():
+    yield
+    api.set_session_pool_size(api.DEFAULT_SESSION_POOL_SIZE)
+    config.set_section_max_workers(config.DEFAULT_SECTION_MAX_WORKERS)
+    secrets.set_secrets_max_workers(secrets.DEFAULT_SECRETS_MAX_WORKERS)
+    set_retry_policy(RetryPolicy())
+    set_sync_state_file(None)
+    set_full_sync(False)
+    set_journal_file(None)
+
+
+def test_configure(tmp_path) -> None:
+    """
+    Check that options are set from the environment variables that are set.
+    """
+
+    configure_from_environment(
+        {
+            "BUILDARR_SONARR_SESSION_POOL_SIZE": "4",
+            "BUILDARR_SONARR_SECTION_MAX_WORKERS": "2",
+            "BUILDARR_SONARR_SECRETS_MAX_WORKERS": "3",
+            "BUILDARR_SONARR_API_MAX_RETRIES": "1",
+            "BUILDARR_SONARR_SYNC_STATE_FILE": str(tmp_path / "sync-state.json"),
+            "BUILDARR_SONARR_FULL_SYNC": "true",
+            "BUILDARR_SONARR_JOURNAL_FILE": str(tmp_path / "journal.jsonl"),
+        },
+    )
+
+    assert api._session_pool_size == 4  # noqa: PLR2004
+    assert config._section_max_workers == 2  # noqa: PLR2004
+    assert secrets._secrets_max_workers == 3  # noqa: PLR2004
+    assert get_retry_policy().max_retries == 1
+    assert get_retry_policy().backoff_factor == RetryPolicy.backoff_factor
+    assert get_sync_state() is not None
+    assert is_full_sync()
+    assert get_journal() is not None
+
+
+def test_unset_unchanged() -> None:
+    """
+    Check that options whose environment variables are not set are left unchanged.
+    """
+
+    set_full_sync(True)
+    configure_from_environment({"BUILDARR_SONARR_FULL_SYNC": ""})
+
+    assert is_full_sync()
+    assert api._session_pool_size == api.DEFAULT_SESSION_POOL_SIZE
+    assert get_sync_state() is None
+
+
+def test_invalid() -> None:
+    """
+    Check that an error naming the environment variable is raised for invalid values.
+    """
+
+    with pytest.raises(SonarrError, match="BUILDARR_SONARR_SECTION_MAX_WORKERS: many"):
+        configure_from_environment({"BUILDARR_SONARR_SECTION_MAX_WORKERS": "many"})
+
+    with pytest.raises(SonarrError, match="BUILDARR_SONARR_API_CASSETTE_MODE"):
+        configure_from_environment(
+            {
+                "BUILDARR_SONARR_API_CASSETTE": "cassette.json",
+                "BUILDARR_SONARR_API_CASSETTE_MODE": "replace",
+            },
+        )
@@ -0,0 +1,243 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test updating Sonarr instances in fleet mode.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+
+from buildarr_sonarr.config import SonarrInstanceConfig
+from buildarr_sonarr.config.import_lists import (
+    PlexWatchlistImportList,
+    SonarrImportList,
+    SonarrImportListsSettingsConfig,
+)
+from buildarr_sonarr.fleet import (
+    SonarrFleet,
+    SonarrFleetResult,
+    format_summary,
+    get_instance_dependencies,
+)
+
+# `sonarr-4k` imports from `sonarr-hd`, which imports from `sonarr-anime`.
+INSTANCE_NAMES = ["sonarr-anime", "sonarr-hd", "sonarr-4k", "sonarr-kids"]
+DEPENDENCIES = {"sonarr-hd": ["sonarr-anime"], "sonarr-4k": ["sonarr-hd"]}
+
+
+class FakeInstances:
+    def __init__(self, failed=(), changed=()) -> None:
+        self.failed = set(failed)
+        self.changed = set(changed)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, stage):
+        def _func(instance_name):
+            with self._lock:
+                self.calls.append((stage, instance_name))
+            if (stage, instance_name) in self.failed:
+                raise ValueError("connection refused")
+            return (stage, instance_name) in self.changed
+
+        return _func
+
+
+def _run(instances, max_workers=4):
+    return SonarrFleet(INSTANCE_NAMES, DEPENDENCIES, max_workers=max_workers).run(
+        connect=instances("connect"),
+        update=instances("update"),
+        delete=instances("delete"),
+    )
+
+
+def test_order() -> None:
+    """
+    Check that linked instances are updated after the instances they reference,
+    and that unused resources are deleted in the reverse order.
+    """
+
+    instances = FakeInstances(changed={("update", "sonarr-hd")})
+    results = _run(instances)
+
+    updates = [name for stage, name in instances.calls if stage == "update"]
+    deletes = [name for stage, name in instances.calls if stage == "delete"]
+    assert updates.index("sonarr-anime") < updates.index("sonarr-hd") < updates.index("sonarr-4k")
+    assert deletes.index("sonarr-4k") < deletes.index("sonarr-hd") < deletes.index("sonarr-anime")
+    assert {name: result.status for name, result in results.items()} == {
+        "sonarr-anime": "unchanged",
+        "sonarr-hd": "changed",
+        "sonarr-4k": "unchanged",
+        "sonarr-kids": "unchanged",
+    }
+
+
+def test_concurrent() -> None:
+    """
+    Check that instances that are not linked to each other are updated at the same time.
+    """
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    def _update(instance_name):
+        if instance_name in ("sonarr-anime", "sonarr-kids"):
+            barrier.wait()
+        return False
+
+    results = SonarrFleet(INSTANCE_NAMES, DEPENDENCIES, max_workers=2).run(
+        connect=lambda instance_name: None,
+        update=_update,
+        delete=lambda instance_name: False,
+    )
+
+    assert all(result.status == "unchanged" for result in results.values())
+
+
+def test_failure() -> None:
+    """
+    Check that a failed instance does not stop unrelated instances from being updated,
+    and that instances linked to it are skipped.
+    """
+
+    instances = FakeInstances(failed={("update", "sonarr-hd")})
+    results = _run(instances, max_workers=1)
+
+    assert ("update", "sonarr-4k") not in instances.calls
+    assert ("delete", "sonarr-hd") not in instances.calls
+    assert ("update", "sonarr-kids") in instances.calls
+    assert ("delete", "sonarr-kids") in instances.calls
+    assert results["sonarr-hd"].error == "update: connection refused"
+    assert results["sonarr-4k"].error == "update: skipped, as linked instance 'sonarr-hd' failed"
+    assert results["sonarr-kids"].status == "unchanged"
+
+
+def test_logs_buffered(caplog) -> None:
+    """
+    Check that log messages from each instance are output as a single block,
+    and attributed to the instance.
+    """
+
+    logger = logging.getLogger("buildarr_sonarr.test")
+    started = threading.Event()
+
+    def _update(instance_name):
+        logger.info("%s: started", instance_name)
+        if instance_name == "sonarr-anime":
+            assert started.wait(timeout=5)
+        else:
+            started.set()
+        logger.info("%s: finished", instance_name)
+        return False
+
+    with caplog.at_level(logging.INFO):
+        SonarrFleet(["sonarr-anime", "sonarr-kids"], {}, max_workers=2).run(
+            connect=lambda instance_name: None,
+            update=_update,
+            delete=lambda instance_name: False,
+        )
+
+    assert [record.getMessage() for record in caplog.records] == [
+        "sonarr-kids: started",
+        "sonarr-kids: finished",
+        "sonarr-anime: started",
+        "sonarr-anime: finished",
+    ]
+    assert caplog.records[0].instance == " (sonarr-kids)"
+
+
+def test_logs_handlers_unchanged(caplog) -> None:
+    """
+    Check that the root logger handlers are left in place during a fleet run,
+    and that the fleet log filters are removed from them once the run has finished.
+    """
+
+    root_logger = logging.getLogger()
+
+    with caplog.at_level(logging.INFO):
+        handlers = list(root_logger.handlers)
+        handler_filters = [list(handler.filters) for handler in handlers]
+
+        def _update(instance_name):
+            assert root_logger.handlers == handlers
+            logging.getLogger("buildarr_sonarr.test").info("%s: updated", instance_name)
+            return False
+
+        SonarrFleet(["sonarr-kids"], {}, max_workers=1).run(
+            connect=lambda instance_name: None,
+            update=_update,
+            delete=lambda instance_name: False,
+        )
+
+        assert [list(handler.filters) for handler in handlers] == handler_filters
+
+    assert [record.getMessage() for record in caplog.records] == ["sonarr-kids: updated"]
+
+
+def _instance_config(*instance_names):
+    # Instance configuration with a Sonarr import list referencing each given instance.
+    instance_config = SonarrInstanceConfig()
+    instance_config.settings.import_lists = SonarrImportListsSettingsConfig.model_construct(
+        definitions={
+            f"Import {instance_name}": SonarrImportList.model_construct(instance_name=instance_name)
+            for instance_name in instance_names
+        },
+    )
+    return instance_config
+
+
+def test_instance_dependencies() -> None:
+    """
+    Check that the instances each instance references using Sonarr import lists
+    are found from the instance configurations.
+    """
+
+    instance_configs = {
+        "sonarr-anime": _instance_config(),
+        "sonarr-hd": _instance_config("sonarr-anime"),
+        "sonarr-4k": _instance_config("sonarr-hd", "sonarr-anime"),
+        "sonarr-kids": _instance_config(),
+    }
+    instance_configs["sonarr-kids"].settings.import_lists.definitions["Plex"] = (
+        PlexWatchlistImportList.model_construct()
+    )
+
+    assert get_instance_dependencies(instance_configs) == {
+        "sonarr-anime": [],
+        "sonarr-hd": ["sonarr-anime"],
+        "sonarr-4k": ["sonarr-anime", "sonarr-hd"],
+        "sonarr-kids": [],
+    }
+
+
+def test_format_summary() -> None:
+    """
+    Check the summary table output at the end of a fleet run.
+    """
+
+    assert format_summary(
+        {
+            "sonarr-hd": SonarrFleetResult("sonarr-hd", changed=True, duration=1.25),
+            "sonarr-4k": SonarrFleetResult("sonarr-4k", duration=10),
+            "sonarr-anime": SonarrFleetResult("sonarr-anime", error="connect: timed out"),
+        },
+    ).splitlines() == [
+        "INSTANCE      STATUS     DURATION  ERROR",
+        "sonarr-hd     changed    1.2s",
+        "sonarr-4k     unchanged  10.0s",
+        "sonarr-anime  failed     0.0s      connect: timed out",
+        "1 changed, 1 unchanged, 1 failed",
+    ]
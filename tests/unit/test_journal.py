@@ -0,0 +1,192 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the checkpoint journal for resuming interrupted runs.
+"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from buildarr_sonarr.api import api_get, api_section, record_section_checkpoint
+from buildarr_sonarr.config import SonarrInstanceConfig, SonarrSettingsConfig
+from buildarr_sonarr.config.ui import SonarrUISettingsConfig as UISettings
+from buildarr_sonarr.journal import SonarrJournal, get_journal, set_journal_file
+from buildarr_sonarr.manager import SonarrManager
+from buildarr_sonarr.plan import get_digest
+from buildarr_sonarr.sync_state import SonarrSectionSync, get_config_hash, use_section_sync
+
+UI_CONFIG = {"id": 1, "firstDayOfWeek": 0}
+
+
+@pytest.fixture
+def journal_file(tmp_path):
+    set_journal_file(tmp_path / "journal.jsonl")
+    yield tmp_path / "journal.jsonl"
+    set_journal_file(None)
+
+
+def test_record(sonarr_api, journal_file) -> None:
+    """
+    Check that successful writes are appended to the journal,
+    and that a checkpoint is appended once a section has been updated.
+    """
+
+    for _ in range(2):
+        sonarr_api.server.expect_ordered_request(
+            "/api/v3/config/ui",
+            method="GET",
+        ).respond_with_json(UI_CONFIG)
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/config/ui/1",
+        method="PUT",
+    ).respond_with_json({**UI_CONFIG, "firstDayOfWeek": 1}, status=202)
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/config/ui",
+        method="GET",
+    ).respond_with_json({**UI_CONFIG, "firstDayOfWeek": 1})
+
+    local = SonarrSettingsConfig(ui=UISettings(first_day_of_week="monday"))
+    section_sync = SonarrSectionSync(
+        sonarr_api.secrets.host_url,
+        skipped={name: None for name in SonarrSettingsConfig.model_fields if name != "ui"},
+    )
+    with use_section_sync(section_sync):
+        with api_section("sonarr.settings.ui"):
+            api_get(sonarr_api.secrets, "/api/v3/config/ui")
+        assert local.update_remote(
+            tree="sonarr.settings",
+            secrets=sonarr_api.secrets,
+            remote=SonarrSettingsConfig(),
+        )
+
+    sonarr_api.server.check_assertions()
+    entries = [json.loads(line) for line in journal_file.read_text().splitlines()]
+    assert [{key: value for key, value in entry.items() if key != "time"} for entry in entries] == [
+        {
+            "type": "write",
+            "host_url": sonarr_api.secrets.host_url,
+            "section": "sonarr.settings.ui",
+            "definition": "",
+            "method": "PUT",
+            "api_url": "/api/v3/config/ui/1",
+            "resource_id": 1,
+        },
+        {
+            "type": "checkpoint",
+            "host_url": sonarr_api.secrets.host_url,
+            "version": sonarr_api.secrets.version,
+            "section": "ui",
+            "local": get_config_hash(local.ui, sonarr_api.secrets.api_key.get_secret_value()),
+            "remote": {"/api/v3/config/ui": get_digest({**UI_CONFIG, "firstDayOfWeek": 1})},
+        },
+    ]
+
+
+def test_checkpoint_reads(sonarr_api, journal_file) -> None:
+    """
+    Check that checkpoints reuse the digests of the resources read by the section,
+    and only read the resources the section wrote to again.
+    """
+
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/config/ui",
+        method="GET",
+    ).respond_with_json({**UI_CONFIG, "firstDayOfWeek": 1})
+
+    local = UISettings(first_day_of_week="monday")
+    section_sync = SonarrSectionSync(sonarr_api.secrets.host_url)
+    section_sync.record_read("sonarr.settings.ui", "/api/v3/config/ui", get_digest(UI_CONFIG))
+    section_sync.record_read("sonarr.settings.ui", "/api/v3/config/host", "0123456789abcdef")
+    section_sync.record_write("sonarr.settings.ui", "/api/v3/config/ui/1")
+    with use_section_sync(section_sync):
+        record_section_checkpoint(sonarr_api.secrets, "ui", local)
+
+    sonarr_api.server.check_assertions()
+    journal = get_journal()
+    assert journal is not None
+    assert journal.get_checkpoints(sonarr_api.secrets.host_url, sonarr_api.secrets.version) == {
+        "ui": {
+            "local": get_config_hash(local, sonarr_api.secrets.api_key.get_secret_value()),
+            "remote": {
+                "/api/v3/config/host": "0123456789abcdef",
+                "/api/v3/config/ui": get_digest({**UI_CONFIG, "firstDayOfWeek": 1}),
+            },
+        },
+    }
+
+
+@pytest.mark.parametrize(
+    ("remote_ui_config", "resumed"),
+    [(UI_CONFIG, True), ({**UI_CONFIG, "firstDayOfWeek": 1}, False)],
+)
+def test_resume(sonarr_api, journal_file, remote_ui_config, resumed) -> None:
+    """
+    Check that sections checkpointed in an interrupted run are not updated again
+    if their fingerprint is unchanged.
+    """
+
+    instance_config = SonarrInstanceConfig(settings={"ui": {"show_relative_dates": True}})
+    journal = get_journal()
+    assert journal is not None
+    journal.record_checkpoint(
+        sonarr_api.secrets.host_url,
+        sonarr_api.secrets.version,
+        "ui",
+        get_config_hash(
+            instance_config.settings.ui,
+            sonarr_api.secrets.api_key.get_secret_value(),
+        ),
+        {"/api/v3/config/ui": get_digest(UI_CONFIG)},
+    )
+
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/config/ui",
+        method="GET",
+    ).respond_with_json(remote_ui_config)
+    section_sync = SonarrManager()._get_section_sync(instance_config, sonarr_api.secrets)
+
+    sonarr_api.server.check_assertions()
+    assert section_sync is not None
+    assert ("ui" in section_sync.resumed) is resumed
+    assert not section_sync.skipped
+
+
+def test_complete(tmp_path) -> None:
+    """
+    Check that the entries for an instance are removed from the journal once a run completes,
+    and that partially written entries are ignored.
+    """
+
+    journal = SonarrJournal(tmp_path / "journal.jsonl")
+    for host_url in ("http://sonarr1:8989", "http://sonarr2:8989"):
+        journal.record_checkpoint(host_url, "4.0.0.0", "ui", "abc", {})
+    with journal.path.open("a") as f:
+        f.write('{"type": "write", "host_')
+
+    journal.record_checkpoint("http://sonarr2:8989", "4.0.0.0", "tags", "def", {})
+
+    journal.complete("http://sonarr1:8989")
+    assert journal.get_checkpoints("http://sonarr1:8989", "4.0.0.0") == {}
+    assert journal.get_checkpoints("http://sonarr2:8989", "4.0.0.0") == {
+        "ui": {"local": "abc", "remote": {}},
+        "tags": {"local": "def", "remote": {}},
+    }
+    assert journal.get_checkpoints("http://sonarr2:8989", "3.0.10.1567") == {}
+
+    journal.complete("http://sonarr2:8989")
+    assert not journal.path.exists()
@@ -0,0 +1,186 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the Sonarr plugin API request metrics.
+"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from buildarr_sonarr.api import api_get, api_put, api_section
+from buildarr_sonarr.manager import SonarrManager
+from buildarr_sonarr.metrics import (
+    SonarrMetrics,
+    configure_metrics_report,
+    get_endpoint,
+    get_metrics,
+    reset_metrics,
+    write_metrics_report,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    reset_metrics()
+    yield
+    reset_metrics()
+    configure_metrics_report()
+
+
+@pytest.mark.parametrize(
+    ("url", "endpoint"),
+    [
+        ("http://sonarr:8989/api/v3/tag", "GET /api/v3/tag"),
+        ("http://sonarr:8989/api/v3/indexer/12", "GET /api/v3/indexer/{id}"),
+        ("http://sonarr:8989/api/v3/config/host?id=1", "GET /api/v3/config/host"),
+        ("http://sonarr:8989/sonarr/api/v3/tag/1/detail", "GET /sonarr/api/v3/tag/{id}/detail"),
+    ],
+)
+def test_get_endpoint(url, endpoint) -> None:
+    """
+    Check that resource IDs and query strings are removed from endpoint names.
+    """
+
+    assert get_endpoint("GET", url) == endpoint
+
+
+def test_api_requests_recorded(sonarr_api) -> None:
+    """
+    Check that API requests are recorded against their endpoint and section.
+    """
+
+    sonarr_api.server.expect_ordered_request("/api/v3/indexer/1", method="GET").respond_with_json(
+        {"id": 1},
+    )
+    sonarr_api.server.expect_ordered_request("/api/v3/indexer/1", method="PUT").respond_with_json(
+        {"id": 1},
+        status=202,
+    )
+
+    with api_section("sonarr.settings.indexers"):
+        api_get(sonarr_api.secrets, "/api/v3/indexer/1")
+        api_put(sonarr_api.secrets, "/api/v3/indexer/1", {"id": 1})
+
+    metrics = get_metrics().to_dict()
+    assert metrics["endpoints"]["GET /api/v3/indexer/{id}"]["status_codes"] == {"200": 1}
+    assert metrics["endpoints"]["PUT /api/v3/indexer/{id}"]["status_codes"] == {"202": 1}
+    assert metrics["endpoints"]["PUT /api/v3/indexer/{id}"]["sent_bytes"] == len(b'{"id":1}')
+    section = metrics["sections"]["sonarr.settings.indexers"]
+    assert section["requests"] == 2  # noqa: PLR2004
+    assert section["received_bytes"] > 0
+
+
+def test_latency_histogram() -> None:
+    """
+    Check that request latencies are counted in the correct histogram buckets.
+    """
+
+    metrics = SonarrMetrics()
+    for latency in (0.001, 0.2, 0.25, 60):
+        metrics.record_request("", "GET", "http://sonarr:8989/api/v3/tag", 200, latency)
+
+    buckets = metrics.to_dict()["sections"][""]["latency_buckets"]
+    assert buckets["0.005"] == 1
+    assert buckets["0.25"] == 2  # noqa: PLR2004
+    assert sum(buckets.values()) == 3  # noqa: PLR2004
+
+
+def test_prometheus() -> None:
+    """
+    Check the generated Prometheus metrics, including cumulative histogram buckets
+    and escaping of label values.
+    """
+
+    metrics = SonarrMetrics()
+    metrics.record_request('a"b', "GET", "http://sonarr:8989/api/v3/tag", 200, 0.003)
+    metrics.record_request('a"b', "GET", "http://sonarr:8989/api/v3/tag", None, 20)
+    metrics.record_transfer('a"b', "GET", "http://sonarr:8989/api/v3/tag", 0, 42)
+
+    lines = metrics.to_prometheus().splitlines()
+    assert (
+        'buildarr_sonarr_api_requests_total{method="GET",endpoint="/api/v3/tag",status="200"} 1'
+    ) in lines
+    assert (
+        'buildarr_sonarr_api_requests_total{method="GET",endpoint="/api/v3/tag",status="error"} 1'
+    ) in lines
+    assert (
+        'buildarr_sonarr_section_request_duration_seconds_bucket{section="a\\"b",le="10"} 1'
+    ) in lines
+    assert (
+        'buildarr_sonarr_section_request_duration_seconds_bucket{section="a\\"b",le="+Inf"} 2'
+    ) in lines
+    assert 'buildarr_sonarr_section_received_bytes_total{section="a\\"b"} 42' in lines
+
+
+def test_write_metrics_report(tmp_path) -> None:
+    """
+    Check that the metrics report files are written when configured.
+    """
+
+    json_path = tmp_path / "metrics.json"
+    prometheus_path = tmp_path / "sonarr.prom"
+    get_metrics().record_request("", "GET", "http://sonarr:8989/api/v3/tag", 200, 0.1)
+
+    write_metrics_report()
+    assert not json_path.exists()
+
+    configure_metrics_report(json_path=json_path, prometheus_path=prometheus_path)
+    write_metrics_report()
+
+    assert json.loads(json_path.read_text())["endpoints"]["GET /api/v3/tag"]["requests"] == 1
+    assert "buildarr_sonarr_api_requests_total" in prometheus_path.read_text()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["metrics.json", "sonarr.prom"]
+
+
+def test_write_metrics_report_errors(tmp_path, caplog) -> None:
+    """
+    Check that missing parent directories are created, and that failing to write
+    a metrics report file is logged as a warning instead of raising an error.
+    """
+
+    (tmp_path / "file").touch()
+    configure_metrics_report(
+        json_path=tmp_path / "reports" / "metrics.json",
+        prometheus_path=tmp_path / "file" / "sonarr.prom",
+    )
+    write_metrics_report()
+
+    assert (tmp_path / "reports" / "metrics.json").is_file()
+    assert "Unable to write API metrics Prometheus textfile" in caplog.text
+
+
+def test_stage_save_errors(sonarr_api, mocker, caplog) -> None:
+    """
+    Check that failing to save the run files after a stage does not hide
+    the error the stage failed with, and is raised if the stage succeeded.
+    """
+
+    mocker.patch("buildarr_sonarr.manager.save_cassette", side_effect=OSError("disk full"))
+    write_profile = mocker.patch("buildarr_sonarr.manager.write_profile")
+    manager = SonarrManager()
+
+    with pytest.raises(ValueError, match="stage failed"):
+        with manager._stage("update_remote", sonarr_api.secrets):
+            raise ValueError("stage failed")
+    assert "update_remote: unable to save run files: disk full" in caplog.text
+    assert write_profile.call_count == 1
+
+    with pytest.raises(OSError, match="disk full"):
+        with manager._stage("update_remote", sonarr_api.secrets):
+            pass
+    assert write_profile.call_count == 2  # noqa: PLR2004
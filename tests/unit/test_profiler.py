@@ -0,0 +1,150 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the run profiler.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+
+import pytest
+
+from buildarr_sonarr.api import api_section
+from buildarr_sonarr.config.download_clients.remote_path_mappings import RemotePathMapping
+from buildarr_sonarr.profiler import (
+    SPEEDSCOPE_SCHEMA,
+    disable_profiling,
+    enable_profiling,
+    profile,
+    write_profile,
+)
+
+SECTION_TREE = "sonarr.settings.download_clients.remote_path_mappings"
+DEFINITION_TREE = f"{SECTION_TREE}.definitions[0]"
+
+
+@pytest.fixture
+def profile_file(tmp_path):
+    yield tmp_path / "profile.speedscope.json"
+    disable_profiling()
+
+
+def test_profile(sonarr_api, profile_file) -> None:
+    """
+    Check that the time spent and data transferred in stages, sections and definitions
+    is recorded, and written to the profile files.
+    """
+
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/remotepathmapping",
+        method="POST",
+    ).respond_with_json(
+        {"id": 1, "host": "sabnzbd", "remotePath": "/downloads/", "localPath": "/data/"},
+        status=201,
+    )
+
+    profiler = enable_profiling(profile_file)
+    with profile("update_remote"), api_section(SECTION_TREE):
+        RemotePathMapping(
+            host="sabnzbd",
+            remote_path="/downloads",
+            local_path="/data",
+        )._create_remote(tree=DEFINITION_TREE, secrets=sonarr_api.secrets)
+    write_profile()
+
+    sonarr_api.server.check_assertions()
+    assert list(profiler.stats.keys()) == ["update_remote", SECTION_TREE, DEFINITION_TREE]
+    for stats in profiler.stats.values():
+        assert stats.calls == 1
+        assert stats.requests == 1
+        assert stats.sent_bytes > 0
+        assert stats.received_bytes > 0
+        assert 0 < stats.http_time <= stats.wall_time
+
+    speedscope = json.loads(profile_file.read_text())
+    assert speedscope["$schema"] == SPEEDSCOPE_SCHEMA
+    assert [frame["name"] for frame in speedscope["shared"]["frames"]] == [
+        "update_remote",
+        SECTION_TREE,
+        DEFINITION_TREE,
+        "POST /api/v3/remotepathmapping",
+    ]
+    assert [(e["type"], e["frame"]) for e in speedscope["profiles"][0]["events"]] == [
+        ("O", 0),
+        ("O", 1),
+        ("O", 2),
+        ("O", 3),
+        ("C", 3),
+        ("C", 2),
+        ("C", 1),
+        ("C", 0),
+    ]
+    assert profile_file.with_suffix(".txt").read_text().startswith("TREE")
+
+
+def test_table(profile_file) -> None:
+    """
+    Check that the profiling statistics table is sorted by wall time,
+    and that re-entering a frame does not count its time twice.
+    """
+
+    now = [0.0]
+    profiler = enable_profiling()
+    profiler.clock = lambda: now[0]
+
+    with profile("from_remote"):
+        with profile("sonarr.settings.ui"):
+            now[0] += 1
+        with profile("sonarr.settings.indexers"), profile("sonarr.settings.indexers"):
+            now[0] += 3
+
+    assert profiler.stats["sonarr.settings.indexers"].calls == 1
+    assert [line.split()[:3] for line in profiler.to_table().splitlines()] == [
+        ["TREE", "CALLS", "WALL"],
+        ["from_remote", "1", "4.000s"],
+        ["sonarr.settings.indexers", "1", "3.000s"],
+        ["sonarr.settings.ui", "1", "1.000s"],
+    ]
+
+
+def test_threads(profile_file) -> None:
+    """
+    Check that threads with the same name are written as separate profiles.
+    """
+
+    profiler = enable_profiling(profile_file)
+    started = threading.Barrier(2, timeout=5)
+
+    def _run(name):
+        with profile(name):
+            started.wait()
+
+    threads = [
+        threading.Thread(target=_run, args=(name,), name="buildarr-sonarr-update_0")
+        for name in ("sonarr.settings.ui", "sonarr.settings.tags")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    profiles = profiler.to_speedscope()["profiles"]
+    assert [thread_profile["name"] for thread_profile in profiles] == [
+        "buildarr-sonarr-update_0",
+    ] * 2
+    for thread_profile in profiles:
+        assert [event["type"] for event in thread_profile["events"]] == ["O", "C"]
@@ -0,0 +1,216 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the dependency graph scheduler, and its use for settings sections.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+
+import pytest
+
+from buildarr_sonarr import config
+from buildarr_sonarr.config import (
+    SECTION_DELETE_ORDER,
+    SECTION_DEPENDENCIES,
+    SECTION_UPDATE_ORDER,
+    SonarrSettingsConfig,
+)
+from buildarr_sonarr.exceptions import SonarrError
+from buildarr_sonarr.scheduler import reverse_dependencies, run_graph
+
+DEPENDENCIES = {"a": (), "b": ("a",), "c": ("a",), "d": ("b", "c")}
+
+
+def _recording_tasks(order, names=("a", "b", "c", "d")):
+    lock = threading.Lock()
+
+    def _task(name):
+        def _run():
+            with lock:
+                order.append(name)
+            return name.upper()
+
+        return _run
+
+    return {name: _task(name) for name in names}
+
+
+def test_run_graph_serial() -> None:
+    """
+    Check that tasks run one at a time in definition order when only one worker is used.
+    """
+
+    order = []
+
+    results = run_graph(_recording_tasks(order, names=("c", "b", "d", "a")), DEPENDENCIES)
+
+    assert order == ["a", "c", "b", "d"]
+    assert results == {"a": "A", "b": "B", "c": "C", "d": "D"}
+
+
+def test_run_graph_parallel() -> None:
+    """
+    Check that independent tasks run concurrently, and dependencies are respected.
+    """
+
+    barrier = threading.Barrier(2, timeout=5)
+    order = []
+
+    def _wait(name):
+        def _run():
+            # Both tasks must be running at the same time to pass the barrier.
+            barrier.wait()
+            order.append(name)
+            return name
+
+        return _run
+
+    tasks = _recording_tasks(order)
+    tasks["b"] = _wait("b")
+    tasks["c"] = _wait("c")
+
+    run_graph(tasks, DEPENDENCIES, max_workers=4)
+
+    assert order[0] == "a"
+    assert sorted(order[1:3]) == ["b", "c"]
+    assert order[3] == "d"
+
+
+def test_run_graph_context() -> None:
+    """
+    Check that tasks run with a copy of the caller's context.
+    """
+
+    var: contextvars.ContextVar[str] = contextvars.ContextVar("var", default="unset")
+    var.set("set")
+
+    assert run_graph({"a": var.get, "b": var.get}, {}, max_workers=2) == {"a": "set", "b": "set"}
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_run_graph_error(max_workers) -> None:
+    """
+    Check that a failed task stops dependent tasks from running, and the error is raised.
+    """
+
+    order = []
+    tasks = _recording_tasks(order)
+
+    def _fail():
+        raise SonarrError("failed")
+
+    tasks["a"] = _fail
+
+    with pytest.raises(SonarrError, match="failed"):
+        run_graph(tasks, DEPENDENCIES, max_workers=max_workers)
+
+    assert order == []
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_run_graph_cycle(max_workers) -> None:
+    """
+    Check that dependency cycles are detected.
+    """
+
+    with pytest.raises(SonarrError, match="Dependency cycle between tasks: b, c"):
+        run_graph(
+            _recording_tasks([], names=("a", "b", "c")),
+            {"b": ("c",), "c": ("b",)},
+            max_workers=max_workers,
+        )
+
+
+def test_reverse_dependencies() -> None:
+    """
+    Check that reversing a dependency graph makes tasks depend on their dependents.
+    """
+
+    assert reverse_dependencies(DEPENDENCIES) == {
+        "a": ("b", "c"),
+        "b": ("d",),
+        "c": ("d",),
+        "d": (),
+    }
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+@pytest.mark.parametrize("method", ["update_remote", "delete_remote"])
+def test_settings_sections(mocker, max_workers, method) -> None:
+    """
+    Check that settings sections are run in an order that satisfies their dependencies.
+    """
+
+    mocker.patch.object(config, "_section_max_workers", max_workers)
+    lock = threading.Lock()
+    order = []
+
+    for section_name, field in SonarrSettingsConfig.model_fields.items():
+
+        def _section_method(*args, section_name=section_name, **kwargs):
+            with lock:
+                order.append(section_name)
+            return section_name == "ui"
+
+        mocker.patch.object(field.annotation, method, _section_method)
+
+    settings = SonarrSettingsConfig()
+    assert getattr(settings, method)("sonarr.settings", mocker.Mock(), SonarrSettingsConfig())
+
+    if method == "update_remote":
+        dependencies = SECTION_DEPENDENCIES
+        if max_workers == 1:
+            assert tuple(order) == SECTION_UPDATE_ORDER
+    else:
+        dependencies = reverse_dependencies(SECTION_DEPENDENCIES)
+        assert sorted(order) == sorted(SECTION_DELETE_ORDER)
+    for section_name, section_dependencies in dependencies.items():
+        for dependency in section_dependencies:
+            assert order.index(dependency) < order.index(section_name)
+
+
+def test_import_lists_after_root_folders(mocker) -> None:
+    """
+    Check that import lists are not updated until root folders have been created,
+    even when other sections finish before them.
+    """
+
+    mocker.patch.object(config, "_section_max_workers", 4)
+    root_folders_created = threading.Event()
+    import_lists_updated = []
+
+    for section_name, field in SonarrSettingsConfig.model_fields.items():
+
+        def _update_remote(*args, section_name=section_name, **kwargs):
+            if section_name == "media_management":
+                time.sleep(0.2)
+                root_folders_created.set()
+            elif section_name == "import_lists":
+                import_lists_updated.append(root_folders_created.is_set())
+            return False
+
+        mocker.patch.object(field.annotation, "update_remote", _update_remote)
+
+    SonarrSettingsConfig().update_remote(
+        "sonarr.settings",
+        mocker.Mock(),
+        SonarrSettingsConfig(),
+    )
+
+    assert import_lists_updated == [True]
@@ -0,0 +1,261 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test fetching secrets for Sonarr instances.
+"""
+
+from __future__ import annotations
+
+import re
+
+from urllib.parse import urlparse
+
+import pytest
+
+from buildarr.state import state
+from werkzeug import Response
+
+from buildarr_sonarr.config import SonarrInstanceConfig
+from buildarr_sonarr.exceptions import SonarrSecretsError, SonarrSecretsUnauthorizedError
+from buildarr_sonarr.secrets import (
+    SonarrConfigXml,
+    SonarrSecrets,
+    _prefetched_secrets,
+    read_config_xml,
+)
+
+
+@pytest.fixture
+def instance_configs(httpserver, api_key):
+    # Respond to system status requests from instances with the correct API key,
+    # and reject the others.
+    def _system_status(request):
+        if request.headers.get("X-Api-Key") == api_key:
+            return Response('{"version": "3.0.10.1567"}', content_type="application/json")
+        return Response('{"message": "Unauthorized"}', status=401)
+
+    httpserver.expect_request(
+        re.compile(r"^(/sonarr2)?/api/v3/system/status$"),
+    ).respond_with_handler(_system_status)
+    port = urlparse(httpserver.url_for("")).port
+
+    def _instance_config(url_base, valid=True):
+        return SonarrInstanceConfig(
+            hostname="localhost",
+            port=port,
+            url_base=url_base,
+            api_key=api_key if valid else "0" * 32,
+        )
+
+    return _instance_config
+
+
+def test_get_all(instance_configs) -> None:
+    """
+    Check that secrets are fetched for all instances.
+    """
+
+    secrets = SonarrSecrets.get_all(
+        {"sonarr1": instance_configs(None), "sonarr2": instance_configs(None)},
+        max_workers=2,
+    )
+
+    assert sorted(secrets.keys()) == ["sonarr1", "sonarr2"]
+    assert all(s.version == "3.0.10.1567" for s in secrets.values())
+
+
+def test_get_all_errors(instance_configs) -> None:
+    """
+    Check that failures for all instances are reported together.
+    """
+
+    with pytest.raises(SonarrSecretsError) as exc_info:
+        SonarrSecrets.get_all(
+            {
+                "sonarr1": instance_configs(None, valid=False),
+                "sonarr2": instance_configs(None),
+                "sonarr3": instance_configs(None, valid=False),
+            },
+        )
+
+    assert "Unable to fetch secrets for 2 instances" in str(exc_info.value)
+    assert "sonarr1: Incorrect API key" in str(exc_info.value)
+    assert "sonarr3: Incorrect API key" in str(exc_info.value)
+
+
+def test_get_all_single_error(instance_configs) -> None:
+    """
+    Check that a failure for a single instance is raised as-is.
+    """
+
+    with pytest.raises(SonarrSecretsUnauthorizedError):
+        SonarrSecrets.get_all(
+            {"sonarr1": instance_configs(None, valid=False), "sonarr2": instance_configs(None)},
+        )
+
+
+def test_get_prefetch(instance_configs, httpserver, mocker) -> None:
+    """
+    Check that the secrets for all instances in the run are fetched on the first call,
+    and that later calls are served from the results.
+    """
+
+    configs = {"sonarr1": instance_configs(None), "sonarr2": instance_configs("/sonarr2")}
+    mocker.patch.object(state, "instance_configs", {"sonarr": configs})
+
+    secrets1 = SonarrSecrets.get(configs["sonarr1"])
+    assert len(httpserver.log) == 2  # noqa: PLR2004
+    assert _prefetched_secrets.get() is not None
+
+    secrets2 = SonarrSecrets.get(configs["sonarr2"])
+    assert len(httpserver.log) == 2  # noqa: PLR2004
+    assert _prefetched_secrets.get() is None
+    assert secrets1.url_base is None
+    assert secrets2.url_base == "/sonarr2"
+
+    # Secrets are fetched again in the next run.
+    SonarrSecrets.get(configs["sonarr2"])
+    assert len(httpserver.log) == 4  # noqa: PLR2004
+
+
+CONFIG_XML = """<Config>
+  <BindAddress>*</BindAddress>
+  <Port>{port}</Port>
+  <SslPort>9898</SslPort>
+  <EnableSsl>False</EnableSsl>
+  <ApiKey>{api_key}</ApiKey>
+  <AuthenticationMethod>Forms</AuthenticationMethod>
+  <UrlBase>{url_base}</UrlBase>
+</Config>
+"""
+
+
+def test_read_config_xml(tmp_path) -> None:
+    """
+    Check that the API key, port and URL base are read from a Sonarr configuration file.
+    """
+
+    path = tmp_path / "config.xml"
+    path.write_text(CONFIG_XML.format(port=8990, api_key="abc", url_base="sonarr/"))
+
+    assert read_config_xml(path) == SonarrConfigXml(api_key="abc", port=8990, url_base="/sonarr")
+
+
+@pytest.mark.parametrize(
+    ("content", "match"),
+    [
+        ("<Config>", "Unable to read"),
+        ("<Config><Port>8989</Port></Config>", "No API key found"),
+        ("<Config><ApiKey>abc</ApiKey><Port>x</Port></Config>", "Invalid port"),
+    ],
+)
+def test_read_config_xml_invalid(tmp_path, content, match) -> None:
+    """
+    Check that invalid Sonarr configuration files raise an error.
+    """
+
+    path = tmp_path / "config.xml"
+    path.write_text(content)
+
+    with pytest.raises(SonarrSecretsError, match=match):
+        read_config_xml(path)
+
+
+def test_get_config_xml(httpserver, api_key, tmp_path) -> None:
+    """
+    Check that the API key, port and URL base are taken from the configuration file,
+    instead of retrieving the API key from the instance.
+    """
+
+    port = urlparse(httpserver.url_for("")).port
+    path = tmp_path / "config.xml"
+    path.write_text(CONFIG_XML.format(port=port, api_key=api_key, url_base="/sonarr"))
+    httpserver.expect_ordered_request(
+        "/sonarr/api/v3/system/status",
+        method="GET",
+        headers={"X-Api-Key": api_key},
+    ).respond_with_json({"version": "3.0.10.1567"})
+
+    secrets = SonarrSecrets.get(SonarrInstanceConfig(hostname="localhost", config_xml=path))
+
+    assert secrets.port == port
+    assert secrets.url_base == "/sonarr"
+    assert secrets.api_key.get_secret_value() == api_key
+    httpserver.check_assertions()
+
+
+def test_get_from_url_config_xml(httpserver, api_key, tmp_path) -> None:
+    """
+    Check that the port and URL base are also taken from the configuration file
+    when fetching secrets from a URL, unless they are explicitly set.
+    """
+
+    port = urlparse(httpserver.url_for("")).port
+    path = tmp_path / "config.xml"
+    path.write_text(CONFIG_XML.format(port=port, api_key=api_key, url_base="/sonarr"))
+    for _ in range(2):
+        httpserver.expect_ordered_request(
+            "/sonarr/api/v3/system/status",
+            method="GET",
+            headers={"X-Api-Key": api_key},
+        ).respond_with_json({"version": "3.0.10.1567"})
+
+    secrets = SonarrSecrets.get_from_url(
+        hostname="localhost",
+        port=None,
+        protocol="http",
+        config_xml=path,
+    )
+    assert secrets.port == port
+    assert secrets.url_base == "/sonarr"
+    assert secrets.api_key.get_secret_value() == api_key
+
+    path.write_text(CONFIG_XML.format(port=1, api_key=api_key, url_base="/other"))
+    secrets = SonarrSecrets.get_from_url(
+        hostname="localhost",
+        port=port,
+        protocol="http",
+        url_base="/sonarr",
+        config_xml=path,
+    )
+    assert secrets.port == port
+    assert secrets.url_base == "/sonarr"
+    httpserver.check_assertions()
+
+
+def test_get_config_xml_fallback(httpserver, api_key, tmp_path, caplog) -> None:
+    """
+    Check that the API key is retrieved from the instance if the configuration file
+    could not be read.
+    """
+
+    httpserver.expect_ordered_request("/initialize.js", method="GET").respond_with_data(
+        f"window.Sonarr = {{apiKey: '{api_key}', urlBase: ''}};",
+    )
+    httpserver.expect_ordered_request(
+        "/api/v3/system/status",
+        method="GET",
+        headers={"X-Api-Key": api_key},
+    ).respond_with_json({"version": "3.0.10.1567"})
+
+    secrets = SonarrSecrets.get_from_url(
+        hostname="localhost",
+        port=urlparse(httpserver.url_for("")).port,
+        protocol="http",
+        config_xml=tmp_path / "missing.xml",
+    )
+
+    assert secrets.api_key.get_secret_value() == api_key
+    assert "falling back" in caplog.text
@@ -0,0 +1,175 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the Sonarr plugin persistent secrets cache.
+"""
+
+from __future__ import annotations
+
+import stat
+
+from urllib.parse import urlparse
+
+import pytest
+
+from buildarr_sonarr.api import api_get
+from buildarr_sonarr.config import SonarrInstanceConfig
+from buildarr_sonarr.exceptions import SonarrAPIError
+from buildarr_sonarr.secrets import SonarrSecrets
+from buildarr_sonarr.secrets_cache import SonarrSecretsCache, configure_secrets_cache
+
+HOST_URL = "http://sonarr:8989"
+
+
+@pytest.fixture
+def secrets_cache(tmp_path):
+    yield configure_secrets_cache(ttl=3600, path=tmp_path / "cache" / "secrets.json")
+    configure_secrets_cache(ttl=0)
+
+
+def test_cache_file_permissions(secrets_cache) -> None:
+    """
+    Check that the cache file is only accessible by the owner, and persists between runs.
+    """
+
+    secrets_cache.set(HOST_URL, api_key="abc", version="3.0.10.1567")
+
+    assert stat.S_IMODE(secrets_cache.path.stat().st_mode) == 0o600  # noqa: PLR2004
+    assert stat.S_IMODE(secrets_cache.path.parent.stat().st_mode) == 0o700  # noqa: PLR2004
+    assert SonarrSecretsCache(secrets_cache.path, ttl=3600).get(HOST_URL) == {
+        "api_key": "abc",
+        "version": "3.0.10.1567",
+    }
+
+
+def test_cache_expired(secrets_cache, mocker) -> None:
+    """
+    Check that cached secrets are discarded once the TTL expires.
+    """
+
+    time = mocker.patch("buildarr_sonarr.secrets_cache.time.time", return_value=1000.0)
+    secrets_cache.set(HOST_URL, api_key="abc", version="3.0.10.1567")
+
+    time.return_value = 4599.0
+    assert secrets_cache.get(HOST_URL) is not None
+    time.return_value = 4600.0
+    assert secrets_cache.get(HOST_URL) is None
+
+
+@pytest.mark.parametrize(
+    ("api_key", "version"),
+    [("def", None), (None, "4.0.0.700")],
+)
+def test_cache_mismatch(secrets_cache, api_key, version) -> None:
+    """
+    Check that cached secrets are invalidated when the configured API key
+    or expected version does not match.
+    """
+
+    secrets_cache.set(HOST_URL, api_key="abc", version="3.0.10.1567")
+
+    assert secrets_cache.get(HOST_URL, api_key=api_key, version=version) is None
+    assert secrets_cache.get(HOST_URL) is None
+
+
+def test_cache_invalid_file(secrets_cache) -> None:
+    """
+    Check that an invalid cache file is treated as an empty cache.
+    """
+
+    secrets_cache.path.parent.mkdir()
+    secrets_cache.path.write_text("not json")
+
+    assert secrets_cache.get(HOST_URL) is None
+
+
+def test_secrets_get_cached(secrets_cache, sonarr_api, api_key) -> None:
+    """
+    Check that the API key is only fetched from the instance when not already cached,
+    and that the current instance version is still fetched on every run.
+    """
+
+    config = SonarrInstanceConfig(
+        hostname="localhost",
+        port=urlparse(sonarr_api.server.url_for("")).port,
+    )
+    sonarr_api.server.expect_ordered_request("/initialize.js", method="GET").respond_with_data(
+        f"window.Sonarr = {{apiKey: '{api_key}', urlBase: ''}};",
+    )
+    for version in ("3.0.10.1567", "4.0.0.0"):
+        sonarr_api.server.expect_ordered_request(
+            "/api/v3/system/status",
+            method="GET",
+            headers={"X-Api-Key": api_key},
+        ).respond_with_json({"version": version})
+
+    assert SonarrSecrets.get(config).version == "3.0.10.1567"
+    secrets = SonarrSecrets.get(config)
+
+    sonarr_api.server.check_assertions()
+    assert secrets.api_key.get_secret_value() == api_key
+    assert secrets.version == "4.0.0.0"
+    assert secrets_cache.get(secrets.host_url) == {"api_key": api_key, "version": "4.0.0.0"}
+
+
+def test_secrets_get_cached_rejected(secrets_cache, sonarr_api, api_key) -> None:
+    """
+    Check that the API key is fetched from the instance again
+    if the cached API key is rejected.
+    """
+
+    config = SonarrInstanceConfig(
+        hostname="localhost",
+        port=urlparse(sonarr_api.server.url_for("")).port,
+    )
+    host_url = SonarrSecrets._get_host_url("http", "localhost", config.port, None)
+    secrets_cache.set(host_url, api_key="abc", version="3.0.10.1567")
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/system/status",
+        method="GET",
+        headers={"X-Api-Key": "abc"},
+    ).respond_with_json({"message": "Unauthorized"}, status=401)
+    sonarr_api.server.expect_ordered_request("/initialize.js", method="GET").respond_with_data(
+        f"window.Sonarr = {{apiKey: '{api_key}', urlBase: ''}};",
+    )
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/system/status",
+        method="GET",
+        headers={"X-Api-Key": api_key},
+    ).respond_with_json({"version": "4.0.0.0"})
+
+    secrets = SonarrSecrets.get(config)
+
+    sonarr_api.server.check_assertions()
+    assert secrets.api_key.get_secret_value() == api_key
+    assert secrets_cache.get(host_url) == {"api_key": api_key, "version": "4.0.0.0"}
+
+
+def test_unauthorized_invalidates(secrets_cache, sonarr_api) -> None:
+    """
+    Check that an unauthorized response invalidates the cached secrets for the instance.
+    """
+
+    host_url = sonarr_api.secrets.host_url
+    secrets_cache.set(host_url, api_key="abc", version="3.0.10.1567")
+    sonarr_api.server.expect_ordered_request("/api/v3/tag", method="GET").respond_with_json(
+        {"message": "Unauthorized"},
+        status=401,
+    )
+
+    with pytest.raises(SonarrAPIError):
+        api_get(sonarr_api.secrets, "/api/v3/tag")
+
+    assert secrets_cache.get(host_url) is None
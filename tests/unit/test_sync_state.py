@@ -0,0 +1,255 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test incremental sync of settings sections.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from buildarr.state import state
+
+from buildarr_sonarr.api import api_get, api_section, get_read_digest
+from buildarr_sonarr.config import SonarrInstanceConfig, SonarrSettingsConfig
+from buildarr_sonarr.config.general import SonarrGeneralSettingsConfig as GeneralSettings
+from buildarr_sonarr.config.ui import FirstDayOfWeek, SonarrUISettingsConfig as UISettings
+from buildarr_sonarr.manager import SonarrManager
+from buildarr_sonarr.plan import get_digest
+from buildarr_sonarr.sync_state import (
+    SonarrSectionSync,
+    SonarrSyncState,
+    get_config_hash,
+    get_sync_state,
+    set_full_sync,
+    set_sync_state_file,
+    use_section_sync,
+)
+
+from .config.settings.ui.util import UI_CONFIG_DEFAULTS
+
+UI_CONFIG = {"id": 1, "firstDayOfWeek": 0}
+
+
+@pytest.fixture
+def sync_state_file(tmp_path):
+    set_sync_state_file(tmp_path / "sync-state.json")
+    yield tmp_path / "sync-state.json"
+    set_sync_state_file(None)
+    set_full_sync(False)
+
+
+def test_config_hash() -> None:
+    """
+    Check that the configuration hash only changes when the managed configuration changes,
+    including secret values, and is keyed by the instance.
+    """
+
+    assert get_config_hash(UISettings(), "key") == get_config_hash(UISettings(), "key")
+    assert get_config_hash(UISettings(), "key") != get_config_hash(
+        UISettings(show_relative_dates=True),
+        "key",
+    )
+    assert get_config_hash(
+        GeneralSettings(**{"security": {"password": "password1"}}),
+        "key",
+    ) != get_config_hash(GeneralSettings(**{"security": {"password": "password2"}}), "key")
+    assert get_config_hash(UISettings(), "key1") != get_config_hash(UISettings(), "key2")
+
+
+def test_state_version_mismatch(tmp_path) -> None:
+    """
+    Check that the saved section states are discarded when the Sonarr version changes.
+    """
+
+    SonarrSyncState(tmp_path / "sync-state.json").set_sections(
+        "http://sonarr:8989",
+        "3.0.10.1567",
+        {"ui": {"local": "abc", "remote": {}}},
+    )
+
+    sync_state = SonarrSyncState(tmp_path / "sync-state.json")
+    assert sync_state.get_sections("http://sonarr:8989", "3.0.10.1567") == {
+        "ui": {"local": "abc", "remote": {}},
+    }
+    assert sync_state.get_sections("http://sonarr:8989", "4.0.0.0") == {}
+
+
+def test_section_reads_and_skips(sonarr_api) -> None:
+    """
+    Check that the resources read by each section are recorded,
+    that skipped sections are not updated, and that the sections
+    that made changes are recorded.
+    """
+
+    for _ in range(2):
+        sonarr_api.server.expect_ordered_request(
+            "/api/v3/config/ui",
+            method="GET",
+        ).respond_with_json(UI_CONFIG)
+    sonarr_api.server.expect_ordered_request(
+        "/api/v3/config/ui/1",
+        method="PUT",
+    ).respond_with_json(UI_CONFIG, status=202)
+
+    section_sync = SonarrSectionSync(
+        sonarr_api.secrets.host_url,
+        skipped={name: None for name in SonarrSettingsConfig.model_fields if name != "ui"},
+    )
+    with use_section_sync(section_sync):
+        with api_section("sonarr.settings.ui"):
+            api_get(sonarr_api.secrets, "/api/v3/config/ui")
+        assert SonarrSettingsConfig(ui=UISettings(show_relative_dates=False)).update_remote(
+            tree="sonarr.settings",
+            secrets=sonarr_api.secrets,
+            remote=SonarrSettingsConfig(),
+        )
+
+    sonarr_api.server.check_assertions()
+    assert section_sync.reads == {"ui": {"/api/v3/config/ui": get_digest(UI_CONFIG)}}
+    assert section_sync.changed == {"ui"}
+
+
+def test_from_remote_skipped(sonarr_api) -> None:
+    """
+    Check that the sections not skipped are read from the instance,
+    and that the local configuration of skipped sections is used for the rest.
+    """
+
+    sonarr_api.server.expect_request("/api/v3/config/ui", method="GET").respond_with_json(
+        {**UI_CONFIG_DEFAULTS, "firstDayOfWeek": 1},
+    )
+    sonarr_api.server.expect_request("/api/v3/tag", method="GET").respond_with_json(
+        [{"id": 1, "label": "shows"}],
+    )
+
+    general = GeneralSettings(**{"host": {"port": 8990}})
+    skipped = {
+        name: getattr(SonarrSettingsConfig(), name) if name != "general" else general
+        for name in SonarrSettingsConfig.model_fields
+        if name not in ("ui", "tags")
+    }
+    with use_section_sync(SonarrSectionSync(sonarr_api.secrets.host_url, skipped=skipped)):
+        remote = SonarrSettingsConfig.from_remote(sonarr_api.secrets)
+
+    sonarr_api.server.check_assertions()
+    assert remote.ui.first_day_of_week == FirstDayOfWeek.monday
+    assert remote.tags.definitions == {"shows"}
+    assert remote.general == general
+
+
+def test_other_instance_reads(sonarr_api, monkeypatch) -> None:
+    """
+    Check that resources read from another instance (e.g. by import lists)
+    are recorded by their full URL, and read again from that instance when checked.
+    """
+
+    for _ in range(2):
+        sonarr_api.server.expect_ordered_request(
+            "/api/v3/qualityprofile",
+            method="GET",
+        ).respond_with_json([{"id": 1, "name": "Any"}])
+    monkeypatch.setattr(state, "instance_secrets", {"sonarr": {"other": sonarr_api.secrets}})
+    api_url = f"{sonarr_api.secrets.host_url}/api/v3/qualityprofile"
+
+    section_sync = SonarrSectionSync("http://sonarr.example.com:8989")
+    with use_section_sync(section_sync), api_section("sonarr.settings.import_lists"):
+        api_get(sonarr_api.secrets, "/api/v3/qualityprofile")
+
+    sonarr_api.server.check_assertions()
+    assert section_sync.reads == {
+        "import_lists": {api_url: get_digest([{"id": 1, "name": "Any"}])},
+    }
+    assert get_read_digest(sonarr_api.secrets, api_url) == get_digest([{"id": 1, "name": "Any"}])
+    assert get_read_digest(sonarr_api.secrets, "http://unknown:8989/api/v3/tag") is None
+
+
+@pytest.mark.parametrize(
+    ("remote_ui_config", "full_sync", "skipped"),
+    [
+        (UI_CONFIG, False, True),
+        ({**UI_CONFIG, "firstDayOfWeek": 1}, False, False),
+        (UI_CONFIG, True, False),
+    ],
+)
+def test_skip_unchanged(
+    sonarr_api,
+    sync_state_file,
+    remote_ui_config,
+    full_sync,
+    skipped,
+) -> None:
+    """
+    Check that a section is skipped on the next run if both its local configuration
+    and the remote resources it read are unchanged, unless a full sync is forced.
+    """
+
+    instance_config = SonarrInstanceConfig(settings={"ui": {"show_relative_dates": True}})
+
+    manager = SonarrManager()
+    section_sync = SonarrSectionSync(sonarr_api.secrets.host_url)
+    section_sync.record_read("sonarr.settings.ui", "/api/v3/config/ui", get_digest(UI_CONFIG))
+    manager._section_syncs[sonarr_api.secrets.host_url] = section_sync
+    manager._save_section_sync(instance_config, sonarr_api.secrets)
+    assert sync_state_file.is_file()
+
+    if not full_sync:
+        sonarr_api.server.expect_ordered_request(
+            "/api/v3/config/ui",
+            method="GET",
+        ).respond_with_json(remote_ui_config)
+    set_full_sync(full_sync)
+    section_sync = SonarrManager()._get_section_sync(instance_config, sonarr_api.secrets)
+
+    sonarr_api.server.check_assertions()
+    assert section_sync is not None
+    assert ("ui" in section_sync.skipped) is skipped
+
+
+def test_paused(sonarr_api, sync_state_file) -> None:
+    """
+    Check that all sections on a paused instance are skipped without being checked.
+    """
+
+    sync_state = get_sync_state()
+    sync_state.paused = {sonarr_api.secrets.host_url}
+
+    section_sync = SonarrManager()._get_section_sync(SonarrInstanceConfig(), sonarr_api.secrets)
+
+    assert section_sync is not None
+    assert section_sync.skipped.keys() == SonarrSettingsConfig.model_fields.keys()
+    assert sonarr_api.secrets.host_url not in sync_state.drifted
+
+
+def test_drifted(sonarr_api, sync_state_file) -> None:
+    """
+    Check that only the sections that made changes are reported as drifted,
+    and that the state of the other sections checked in full is saved.
+    """
+
+    manager = SonarrManager()
+    section_sync = SonarrSectionSync(sonarr_api.secrets.host_url)
+    for section_name in ("ui", "tags"):
+        section_sync.record_read(f"sonarr.settings.{section_name}", "/api/v3/tag", "abc")
+    section_sync.record_changed({"ui": True, "tags": False})
+    manager._section_syncs[sonarr_api.secrets.host_url] = section_sync
+    manager._save_section_sync(SonarrInstanceConfig(), sonarr_api.secrets)
+
+    sync_state = get_sync_state()
+    assert sync_state.drifted == {sonarr_api.secrets.host_url: {"ui"}}
+    assert sync_state.get_sections(
+        sonarr_api.secrets.host_url,
+        sonarr_api.secrets.version,
+    ).keys() == {"tags"}
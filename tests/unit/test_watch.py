@@ -0,0 +1,94 @@
+# Copyright (C) 2024 Callum Dickinson
+#
+# Buildarr is free software: you can redistribute it and/or modify it under the terms of the
+# GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+#
+# Buildarr is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with Buildarr.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Test the drift-watch daemon polling schedule.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from buildarr_sonarr.sync_state import get_sync_state, set_sync_state_file
+from buildarr_sonarr.watch import SonarrWatcher
+
+
+@pytest.fixture(autouse=True)
+def sync_state_file(tmp_path):
+    set_sync_state_file(tmp_path / "sync-state.json")
+    yield
+    set_sync_state_file(None)
+
+
+class FakeRun:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.drifted = {"http://sonarr1:8989": set(), "http://sonarr2:8989": set()}
+        self.paused = []
+
+    def __call__(self) -> None:
+        sync_state = get_sync_state()
+        self.paused.append(set(sync_state.paused))
+        sync_state.drifted = {
+            host_url: sections
+            for host_url, sections in self.drifted.items()
+            if host_url not in sync_state.paused
+        }
+
+
+def test_backoff() -> None:
+    """
+    Check that polling intervals back off while instances are unchanged,
+    reset when drift is detected, and that instances not due are paused.
+    """
+
+    run = FakeRun()
+    watcher = SonarrWatcher(run, min_interval=10, max_interval=40, clock=lambda: run.now)
+
+    assert watcher.poll() == set()
+    assert watcher.intervals == {"http://sonarr1:8989": 20, "http://sonarr2:8989": 20}
+
+    run.now = 5
+    assert watcher.poll() is None
+
+    run.now = 20
+    run.drifted["http://sonarr2:8989"] = {"indexers"}
+    assert watcher.poll() == {"http://sonarr2:8989"}
+    assert watcher.intervals == {"http://sonarr1:8989": 40, "http://sonarr2:8989": 10}
+    assert watcher.get_wait_time() == 10  # noqa: PLR2004
+
+    run.now = 30
+    run.drifted["http://sonarr2:8989"] = set()
+    assert watcher.poll() == set()
+    assert run.paused == [set(), set(), {"http://sonarr1:8989"}]
+    assert watcher.intervals == {"http://sonarr1:8989": 40, "http://sonarr2:8989": 20}
+    assert get_sync_state().paused == set()
+
+
+def test_error() -> None:
+    """
+    Check that instances polled in a failed cycle are retried at the minimum interval.
+    """
+
+    run = FakeRun()
+    watcher = SonarrWatcher(run, min_interval=10, max_interval=40, clock=lambda: run.now)
+    watcher.poll()
+
+    def _fail() -> None:
+        raise ValueError("failed")
+
+    watcher.run = _fail
+    run.now = 20
+    assert watcher.poll() == set()
+    assert watcher.intervals == {"http://sonarr1:8989": 10, "http://sonarr2:8989": 10}